@@ -3,134 +3,86 @@
 Christmas Disco Visualizer - Full Android Version
 Mit YouTube-Streaming und echter Audio-Analyse
 """
-from kivy.app import App
-from kivy.uix.boxlayout import BoxLayout
-from kivy.uix.button import Button
-from kivy.uix.label import Label
-from kivy.uix.spinner import Spinner
-from kivy.uix.widget import Widget
-from kivy.graphics import Color, Ellipse, Line, Rectangle
-from kivy.clock import Clock
-from kivy.core.window import Window
-from kivy.core.audio import SoundLoader
-from kivy.utils import platform
+from startup_timing import TIMER
+
+with TIMER.section('import kivy'):
+    from kivy.app import App
+    from kivy.uix.boxlayout import BoxLayout
+    from kivy.uix.button import Button
+    from kivy.uix.label import Label
+    from kivy.uix.spinner import Spinner
+    from kivy.uix.widget import Widget
+    from kivy.graphics import Color, Rectangle
+    from kivy.graphics.texture import Texture
+    from kivy.clock import Clock
+    from kivy.core.window import Window
+    from kivy.core.audio import SoundLoader
+    from kivy.utils import platform
 
-import threading
 import time
-import random
 import math
-import numpy as np
 import os
 import tempfile
 
-# YouTube-Streaming für Android
-try:
-    from android.permissions import request_permissions, Permission
-    request_permissions([Permission.INTERNET, Permission.WRITE_EXTERNAL_STORAGE])
-    ANDROID = True
-except ImportError:
-    ANDROID = False
+# Android-Berechtigungen werden erst in on_start angefragt
+ANDROID = platform == 'android'
 
-# Für YouTube-Audio-Extraktion
-import yt_dlp
+# Leichte Module direkt; yt_dlp, numpy und die Analyse werden erst bei Bedarf geladen
+with TIMER.section('import app modules'):
+    from metrics import METRICS, MetricsLog
+    from frame_scheduler import FrameScheduler
+    from effects import FrameContext
+    from analysis_state import BeatCursor, ANALYSIS_SAMPLE_RATE, ANALYSIS_WINDOW, ANALYSIS_HOP
+    from audio_cache import AudioCache, video_id_from_url
+    from progressive import ProgressiveDownload
+    from metadata_cache import MetadataCache, Extractor
+    from prefetch import Prefetcher, PrefetchCancelled, DOWNLOADING, DONE, FAILED
+    from playlist import PlayQueue
+    from library import LocalLibrary, LIBRARY_DB_NAME, default_folders, is_local
+    from tasks import TaskManager, CancelToken, TaskCancelled
 
-class AudioAnalyzer:
-    """Analysiert Audio in Echtzeit."""
-    def __init__(self):
-        self.bass_level = 0
-        self.mid_level = 0
-        self.treble_level = 0
-        self.overall_level = 0
-        self.beat_detected = False
-        self.running = True
-        
-        # Audio-Buffer
-        self.audio_buffer = []
-        self.sample_rate = 44100
-        
-        # Beat-Detection
-        self.beat_history = []
-        self.beat_threshold = 1.5
-        
-    def analyze_chunk(self, audio_data):
-        """Analysiert einen Audio-Chunk."""
-        if len(audio_data) < 512:
-            return
-        
-        try:
-            # Konvertiere zu numpy array
-            if isinstance(audio_data, bytes):
-                audio_array = np.frombuffer(audio_data, dtype=np.int16).astype(np.float32)
-            else:
-                audio_array = np.array(audio_data, dtype=np.float32)
-            
-            # FFT für Frequenzanalyse
-            fft = np.abs(np.fft.rfft(audio_array))
-            freqs = np.fft.rfftfreq(len(audio_array), 1.0 / self.sample_rate)
-            
-            # Frequenzbänder definieren
-            bass_mask = freqs < 200  # Bass: 0-200 Hz
-            mid_mask = (freqs >= 200) & (freqs < 2000)  # Mid: 200-2000 Hz
-            treble_mask = freqs >= 2000  # Treble: 2000+ Hz
-            
-            # Durchschnittliche Energie pro Band
-            self.bass_level = np.mean(fft[bass_mask]) if np.any(bass_mask) else 0
-            self.mid_level = np.mean(fft[mid_mask]) if np.any(mid_mask) else 0
-            self.treble_level = np.mean(fft[treble_mask]) if np.any(treble_mask) else 0
-            
-            # Normalisiere auf 0-1
-            max_val = max(self.bass_level, self.mid_level, self.treble_level, 1)
-            self.bass_level = min(1.0, self.bass_level / max_val)
-            self.mid_level = min(1.0, self.mid_level / max_val)
-            self.treble_level = min(1.0, self.treble_level / max_val)
-            
-            # Overall Level (RMS)
-            self.overall_level = np.sqrt(np.mean(audio_array**2)) / 32768.0
-            self.overall_level = min(1.0, self.overall_level * 3)
-            
-            # Beat Detection (einfache Methode: Bass-Spitzen)
-            self.beat_history.append(self.bass_level)
-            if len(self.beat_history) > 10:
-                self.beat_history.pop(0)
-            
-            avg_bass = np.mean(self.beat_history)
-            self.beat_detected = self.bass_level > (avg_bass * self.beat_threshold)
-            
-        except Exception as e:
-            print(f"Audio analysis error: {e}")
-    
-    def simulate_analysis(self):
-        """Simuliert Audio-Analyse wenn keine echten Daten verfügbar."""
-        # Zeitbasierte Simulation mit pseudo-realistischen Werten
-        t = time.time()
-        
-        # Simuliere Beat (120-140 BPM)
-        beat_freq = 2.2  # ~132 BPM
-        beat_phase = (t * beat_freq) % 1.0
-        
-        if beat_phase < 0.1:
-            self.bass_level = 0.9 + random.uniform(0, 0.1)
-            self.beat_detected = True
-        elif beat_phase < 0.3:
-            self.bass_level = 0.9 - (beat_phase - 0.1) * 4
-            self.beat_detected = False
-        else:
-            self.bass_level = random.uniform(0.2, 0.4)
-            self.beat_detected = False
-        
-        # Mid und Treble variieren zufällig aber plausibel
-        self.mid_level = random.uniform(0.3, 0.6) + self.bass_level * 0.2
-        self.treble_level = random.uniform(0.2, 0.5) + self.mid_level * 0.1
-        
-        self.overall_level = (self.bass_level + self.mid_level + self.treble_level) / 3
+# Analyse-Parameter: 512er Hop bei 22.05 kHz = ~23 ms Latenz
+
+# Cache-Limit für heruntergeladene Songs
+CACHE_MAX_BYTES = 500 * 1024 * 1024
+
+# Streaming: Wiedergabe startet nach einem kurzen Anfangspuffer
+PROGRESSIVE_PLAYBACK = True
+PROGRESSIVE_INITIAL_BYTES = 96 * 1024
+PROGRESSIVE_RESUME_MARGIN = 5.0  # Sekunden Puffer nach einem Aussetzer
+
+# Beat-Vorhersage: ab dieser Tempo-Sicherheit, Vorlauf in Sekunden
+BEAT_LOCK_CONFIDENCE = 0.3
+BEAT_LEAD = 0.03
+
+# Renderer läuft so viel hinter dem neuesten Snapshot, um interpolieren zu können
+RENDER_DELAY = 0.02
+
+# 'canvas': Effekte als Kivy-Instruktionen; 'shader': Kreis, Wellen und Schnee in
+# einem Fragment-Shader (GPU), Rückfall auf 'canvas' wenn er nicht kompiliert
+RENDERER = os.environ.get('XMAS_RENDERER', 'canvas')
+
+# Analyse-Snapshots + Effekt-Seed in diese Datei aufnehmen (session_replay.py)
+RECORD_PATH = os.environ.get('XMAS_RECORD')
+
+# Transkodieren (ffmpeg): einmal pro Cache-Song Mono-PCM für die Analyse (memmap)
+# und eine schnell ladbare Wiedergabe-Datei
+TRANSCODE_CACHE = True
+TRANSCODE_PLAYBACK_FORMAT = 'ogg' if ANDROID else 'wav'
+
+# Playlist: Überblendung am Songende (0 = lückenloser Übergang)
+CROSSFADE_SECONDS = 3.0
+TRACK_WATCH_INTERVAL = 0.1
+
+# Metriken (XMAS_METRICS=1): Overlay im Layout + JSON-Log alle N Sekunden
+METRICS_OVERLAY = True
+METRICS_INTERVAL = 1.0
 
 class DiscoVisualizer(Widget):
     """Hauptvisualisierungs-Widget."""
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         self.analyzer = None
-        self.particles = []
-        self.snowflakes = []
         self.colors = [
             (1, 0, 0),      # Rot
             (0, 1, 0),      # Grün
@@ -144,153 +96,129 @@ class DiscoVisualizer(Widget):
         with self.canvas:
             self.bg_color = Color(0, 0, 0, 1)
             self.bg_rect = Rectangle(pos=self.pos, size=self.size)
-            
-            # Bass-Kreis
-            self.bass_color = Color(1, 0, 0, 0.8)
-            self.bass_circle = Ellipse(pos=(0, 0), size=(100, 100))
-            
-            # Beat-Wellen
-            self.beat_waves = []
-            for i in range(3):
-                color = Color(1, 0, 0, 0)
-                line = Line(circle=(0, 0, 0), width=3)
-                self.beat_waves.append({'color': color, 'line': line, 'size': 0})
+        
+        # Effekte (Kreis, Ring, Wellen, Schnee, Partikel) werden erst in start() angelegt
+        self.compositor = None
+        self.snowflakes = None
+        self.particles = None
+        self.effect_seed = None
+        self.renderer = None
         
         # Bind size update
         self.bind(pos=self.update_rect, size=self.update_rect)
         
-        # Erstelle Schneeflocken
-        self.create_snowflakes(50)
+        # Animation (adaptive Qualität, Leerlauf-Rate ohne Musik) startet mit start()
+        self.last_predicted_beat = 0.0
+        self.beat_cursor = BeatCursor()
+        self.render_delay = RENDER_DELAY  # 0 beim Offline-Rendern (kein Interpolieren)
+        self.clock = time.perf_counter    # Zeitquelle für Snapshots/Beats (Replay: virtuelle Zeit)
+        self.scheduler = FrameScheduler(self.update, Clock, on_tier=self.apply_quality)
+    
+    def start(self):
+        """Legt die Effekte an und startet die Animation (einmalig)."""
+        if self.compositor is not None:
+            return
+        with TIMER.section('init visual effects'):
+            self.create_effects()
+        self.scheduler.start()
+    
+    def create_effects(self, seed=None, renderer=None):
+        """Legt den Compositor mit den Standard-Effekten an (Zeichenreihenfolge)."""
+        from particles import disc_pixels
+        from effects import (Compositor, BassCircleEffect, SpectrumRingEffect,
+                             BeatWavesEffect, SnowEffect, ParticleEffect)
         
-        # Starte Animation
-        Clock.schedule_interval(self.update, 1/30.0)  # 30 FPS
+        # Immer ein fester Seed, damit Aufnahmen den Lauf reproduzieren können
+        if seed is None:
+            seed = int.from_bytes(os.urandom(4), 'little')
+        self.effect_seed = seed
+        self.sprite_texture = self.create_sprite_texture(disc_pixels(32))
+        self.compositor = Compositor(self)
+        renderer = renderer or RENDERER
+        scene = None
+        if renderer == 'shader':
+            from shader_effects import ShaderSceneEffect
+            scene = ShaderSceneEffect()
+            if not scene.compiled:
+                print("Shader nicht kompiliert, verwende Canvas-Renderer")
+                scene = None
+        if scene is not None:
+            effects = (scene, SpectrumRingEffect(), ParticleEffect())
+        else:
+            effects = (BassCircleEffect(), SpectrumRingEffect(), BeatWavesEffect(),
+                       SnowEffect(), ParticleEffect())
+        self.renderer = 'shader' if scene is not None else 'canvas'
+        for effect in effects:
+            self.compositor.add(effect)
+        snow = self.compositor.get('snow')
+        self.snowflakes = snow.field if snow is not None else None
+        self.particles = self.compositor.get('particles').field
     
     def update_rect(self, *args):
         self.bg_rect.pos = self.pos
         self.bg_rect.size = self.size
     
-    def create_snowflakes(self, count):
-        """Erstellt Schneeflocken."""
-        for _ in range(count):
-            with self.canvas:
-                color = Color(1, 1, 1, random.uniform(0.5, 1.0))
-                size = random.uniform(3, 8)
-                x = random.uniform(0, self.width) if self.width > 0 else random.uniform(0, 400)
-                y = random.uniform(0, self.height) if self.height > 0 else random.uniform(0, 800)
-                ellipse = Ellipse(pos=(x, y), size=(size, size))
-                
-                self.snowflakes.append({
-                    'color': color,
-                    'ellipse': ellipse,
-                    'x': x,
-                    'y': y,
-                    'size': size,
-                    'speed': random.uniform(1, 3),
-                    'sway': random.uniform(-0.5, 0.5)
-                })
+    def create_sprite_texture(self, pixels):
+        """Weiche Kreisscheibe als Textur für alle Sprites."""
+        texture = Texture.create(size=pixels.shape[1::-1], colorfmt='rgba')
+        texture.blit_buffer(pixels.tobytes(), colorfmt='rgba', bufferfmt='ubyte')
+        return texture
+    
+    def apply_quality(self, tier):
+        """
+        Übernimmt Partikel-Limit, Schneeflocken- und Wellen-Anzahl einer Qualitätsstufe.
+        Innerhalb der Stufe regelt der Compositor einzelne Effekte nach ihren Kosten.
+        """
+        self.compositor.apply_tier(tier)
+        self.compositor.budget = self.scheduler.budget_ratio / tier['fps']
+        METRICS.gauge('quality', tier['name'])
+    
+    def set_playing(self, playing):
+        """Volle Frame-Rate nur während der Wiedergabe."""
+        self.start()
+        self.scheduler.set_active(playing)
+    
+    def predict_beat(self, detected, dt):
+        """
+        Bei stabilem Tempo kommen Beats aus der Phasen-Vorhersage: Effekte starten
+        einen Frame vor dem Beat und verdecken so die Analyse-Latenz.
+        """
+        tracker = getattr(self.analyzer, 'beat_tracker', None)
+        if tracker is None or not tracker.locked or tracker.confidence < BEAT_LOCK_CONFIDENCE:
+            return detected
+        
+        # Gleicher (verzögerter) Zeitpunkt wie die Pegel aus state.sample()
+        now = self.clock() - self.render_delay
+        next_beat = tracker.next_beat_clock(now)
+        if next_beat - now <= dt + BEAT_LEAD and next_beat - self.last_predicted_beat > tracker.period * 0.5:
+            self.last_predicted_beat = next_beat
+            return True
+        return False
     
     def update(self, dt):
         """Update-Funktion für Animation."""
         if not self.analyzer:
             return
         
-        # Hole Audio-Levels
-        bass = self.analyzer.bass_level
-        mid = self.analyzer.mid_level
-        treble = self.analyzer.treble_level
-        overall = self.analyzer.overall_level
-        beat = self.analyzer.beat_detected
-        
-        # Update Bass-Kreis
-        center_x = self.center_x
-        center_y = self.center_y
-        radius = 80 + bass * 200
-        
-        self.bass_circle.pos = (center_x - radius, center_y - radius)
-        self.bass_circle.size = (radius * 2, radius * 2)
-        
-        # Farbe basierend auf Bass
-        color_idx = int(bass * (len(self.colors) - 1))
-        r, g, b = self.colors[color_idx]
-        self.bass_color.rgb = (r, g, b)
-        self.bass_color.a = 0.6 + bass * 0.4
-        
-        # Update Beat-Wellen
-        for wave in self.beat_waves:
-            if beat and wave['size'] == 0:
-                wave['size'] = radius
-            
-            if wave['size'] > 0:
-                wave['size'] += 15
-                alpha = 1 - (wave['size'] / 600)
-                
-                if alpha > 0:
-                    wave['color'].rgba = (1, 0, 0, alpha)
-                    wave['line'].circle = (center_x, center_y, wave['size'])
-                else:
-                    wave['size'] = 0
-                    wave['color'].a = 0
-        
-        # Update Schneeflocken
-        for flake in self.snowflakes:
-            # Bewegung
-            flake['y'] -= flake['speed'] * (1 + mid * 2)
-            flake['x'] += flake['sway'] * mid * 5
-            
-            # Wrap around
-            if flake['y'] < 0:
-                flake['y'] = self.height
-                flake['x'] = random.uniform(0, self.width)
-            
-            if flake['x'] < 0:
-                flake['x'] = self.width
-            elif flake['x'] > self.width:
-                flake['x'] = 0
-            
-            # Größe pulsiert mit Musik
-            pulse_size = flake['size'] * (1 + overall * 0.5)
-            
-            flake['ellipse'].pos = (flake['x'], flake['y'])
-            flake['ellipse'].size = (pulse_size, pulse_size)
+        # Hole Audio-Levels (ein konsistenter Snapshot, zwischen zwei Analyse-Schritten interpoliert)
+        now = self.clock()
+        snapshot = self.analyzer.state.sample(now, delay=self.render_delay)
         
-        # Erstelle Partikel bei Beat
-        if beat and random.random() > 0.5:
-            self.create_beat_particles(center_x, center_y, 8)
+        if METRICS.enabled:
+            METRICS.observe('snapshot_age_ms', (now - snapshot.timestamp) * 1000)
         
-        # Update Partikel
-        for particle in self.particles[:]:
-            particle['life'] -= dt
-            
-            if particle['life'] <= 0:
-                self.canvas.remove(particle['color'])
-                self.canvas.remove(particle['ellipse'])
-                self.particles.remove(particle)
-            else:
-                particle['x'] += particle['vx'] * dt * 60
-                particle['y'] += particle['vy'] * dt * 60
-                particle['ellipse'].pos = (particle['x'], particle['y'])
-                particle['color'].a = particle['life']
-    
-    def create_beat_particles(self, x, y, count):
-        """Erstellt Partikel bei Beat."""
-        for _ in range(count):
-            angle = random.uniform(0, 2 * math.pi)
-            speed = random.uniform(50, 150)
-            
-            with self.canvas:
-                color = Color(*random.choice(self.colors), 1)
-                size = random.uniform(5, 12)
-                ellipse = Ellipse(pos=(x, y), size=(size, size))
-                
-                self.particles.append({
-                    'color': color,
-                    'ellipse': ellipse,
-                    'x': x,
-                    'y': y,
-                    'vx': math.cos(angle) * speed,
-                    'vy': math.sin(angle) * speed,
-                    'life': 1.0
-                })
+        # Alle Beats seit dem letzten Frame zählen, auch kurze Pulse
+        beat = self.predict_beat(self.beat_cursor.consume(snapshot) > 0, dt)
+        
+        # Alle Effekte mit demselben Frame-Kontext (Kosten werden pro Effekt gemessen)
+        self.compositor.update(FrameContext(
+            snapshot, dt, beat, self.center_x, self.center_y, self.width, self.height
+        ))
+        
+        if METRICS.enabled:
+            METRICS.gauge('particles', self.particles.count)
+            if self.snowflakes is not None:
+                METRICS.gauge('snowflakes', self.snowflakes.count)
 
 class ChristmasDiscoApp(App):
     def build(self):
@@ -335,7 +263,7 @@ class ChristmasDiscoApp(App):
             text='▶️ Play',
             background_color=(0.77, 0.12, 0.23, 1),
             font_size='18sp',
-            size_hint=(0.5, None),
+            size_hint=(0.35, None),
             height=50
         )
         self.play_btn.bind(on_press=self.play_song)
@@ -344,13 +272,43 @@ class ChristmasDiscoApp(App):
             text='⏹️ Stop',
             background_color=(0.3, 0.3, 0.3, 1),
             font_size='18sp',
-            size_hint=(0.5, None),
+            size_hint=(0.25, None),
             height=50
         )
         self.stop_btn.bind(on_press=self.stop_song)
         
+        self.next_btn = Button(
+            text='⏭️',
+            background_color=(0.1, 0.3, 0.1, 1),
+            font_size='18sp',
+            size_hint=(0.2, None),
+            height=50
+        )
+        self.next_btn.bind(on_press=self.skip_track)
+        
+        self.shuffle_btn = Button(
+            text='🔀 Aus',
+            background_color=(0.3, 0.3, 0.3, 1),
+            font_size='16sp',
+            size_hint=(0.2, None),
+            height=50
+        )
+        self.shuffle_btn.bind(on_press=self.toggle_shuffle)
+        
+        self.party_btn = Button(
+            text='🎉 Aus',
+            background_color=(0.3, 0.3, 0.3, 1),
+            font_size='16sp',
+            size_hint=(0.2, None),
+            height=50
+        )
+        self.party_btn.bind(on_press=self.toggle_party)
+        
         control_layout.add_widget(self.play_btn)
         control_layout.add_widget(self.stop_btn)
+        control_layout.add_widget(self.next_btn)
+        control_layout.add_widget(self.shuffle_btn)
+        control_layout.add_widget(self.party_btn)
         
         # Info
         self.info_label = Label(
@@ -361,85 +319,314 @@ class ChristmasDiscoApp(App):
             font_size='14sp'
         )
         
+        # Metrik-Overlay (nur wenn Metriken eingeschaltet sind)
+        self.metrics_label = None
+        if METRICS.enabled and METRICS_OVERLAY:
+            self.metrics_label = Label(
+                text='',
+                size_hint=(1, None),
+                height=90,
+                color=(0.6, 1, 0.6, 1),
+                font_size='11sp',
+                halign='left',
+                valign='top'
+            )
+            self.metrics_label.bind(size=lambda label, size: setattr(label, 'text_size', size))
+        
         # Zusammenbauen
         self.root_layout.add_widget(title)
+        if self.metrics_label:
+            self.root_layout.add_widget(self.metrics_label)
         self.root_layout.add_widget(self.song_spinner)
         self.root_layout.add_widget(self.visualizer)
         self.root_layout.add_widget(control_layout)
         self.root_layout.add_widget(self.info_label)
         
-        # Audio-Player
+        # Audio-Player (Analyzer wird beim ersten Abspielen geladen)
         self.sound = None
-        self.analyzer = AudioAnalyzer()
-        self.visualizer.analyzer = self.analyzer
+        self.analyzer = None
         
-        # Starte Analyse-Simulation
-        self.analysis_thread = None
+        # Alle Hintergrund-Aufgaben (Laden, Vorladen, Analyse, Index) auf einem Pool;
+        # ein Neustart pro Gruppe bricht die vorherige Generation ab
+        self.tasks = TaskManager()
+        self.decoder = None
+        self.indexing = set()
+        self.playing_video_id = None
+        self.progressive = None
+        self.progressive_info = {}
+        self.buffering = False
+        self.buffer_pos = 0
         self.selected_song_name = None
+        self.play_requested_at = None
+        
+        # Playlist: Warteschlange, vorgeladener nächster Titel, laufende Überblendung
+        self.queue = PlayQueue(list(self.songs))
+        self.next_track = None          # (Name, Pfad, Sound) - fertig dekodiert und analysiert
+        self.fading = None              # (alter Sound, Startzeitpunkt)
+        self.track_started_at = 0
+        
+        # Party-Modus: 'off', 'host' (sendet Snapshots) oder 'guest' (empfängt nur)
+        self.party_mode = 'off'
+        self.party = None
+        
+        # Sitzungs-Aufnahme (XMAS_RECORD)
+        self.recorder = None
         
         # Cache-Verzeichnis
-        self.cache_dir = tempfile.gettempdir() + '\\christmas_disco_cache\\'
+        base_dir = self.user_data_dir if ANDROID else tempfile.gettempdir()
+        self.cache_dir = os.path.join(base_dir, 'christmas_disco_cache')
         os.makedirs(self.cache_dir, exist_ok=True)
+        self.cache = AudioCache(self.cache_dir, max_bytes=CACHE_MAX_BYTES)
+        
+        # yt_dlp-Metadaten (Format, Stream-URL, Dauer) mit TTL + eine Extractor-Instanz
+        self.extractor = Extractor(MetadataCache(self.cache_dir))
+        
+        # Lokale Bibliothek: Liste sofort aus der Datenbank, Ordner-Abgleich erst in on_start
+        self.remote_songs = dict(self.songs)
+        self.library = LocalLibrary(os.path.join(self.user_data_dir, LIBRARY_DB_NAME))
+        self.update_library(self.library.tracks())
+        
+        # Prefetch: Katalog im Hintergrund laden (max. 2 Downloads parallel)
+        self.prefetcher = Prefetcher(self.download_audio, max_workers=2,
+                                     on_progress=self.on_prefetch_progress)
         
         return self.root_layout
     
+    def on_start(self):
+        """Startet den Prefetch kurz nach dem ersten Frame."""
+        TIMER.mark('on_start')
+        if ANDROID:
+            from android.permissions import request_permissions, Permission
+            request_permissions([Permission.INTERNET, Permission.WRITE_EXTERNAL_STORAGE,
+                                 Permission.READ_EXTERNAL_STORAGE])
+        Clock.schedule_once(self.report_startup, 0)
+        if METRICS.enabled:
+            self.metrics_log = MetricsLog(os.path.join(self.user_data_dir, 'metrics.jsonl'))
+            Clock.schedule_interval(self.flush_metrics, METRICS_INTERVAL)
+        Clock.schedule_once(lambda dt: self.prefetcher.enqueue(self.remote_songs, self.selected_song_name), 1.0)
+        self.library.start(default_folders(ANDROID),
+                           on_change=lambda: Clock.schedule_once(self.refresh_library))
+    
+    def update_library(self, tracks):
+        """Hängt die Bibliotheks-Titel (Name -> Dateipfad) an den YouTube-Katalog an."""
+        songs = dict(self.remote_songs)
+        for track in tracks:
+            name = track['title']
+            if track['artist']:
+                name = f"{track['artist']} - {name}"
+            name = f'📁 {name}'
+            unique, n = name, 2
+            while unique in songs:
+                unique, n = f'{name} ({n})', n + 1
+            songs[unique] = track['path']
+        self.songs = songs
+        self.song_spinner.values = list(songs)
+        self.queue.set_names(list(songs))
+    
+    def refresh_library(self, dt=None):
+        """Bibliothek hat sich geändert (Abgleich/Überwachung im Hintergrund)."""
+        self.update_library(self.library.tracks())
+        if self.sound and not self.fading and (not self.next_track or self.next_track[0] != self.queue.peek_next()):
+            self.preload_next()
+    
+    def is_cache_file(self, path):
+        """Nur Dateien im eigenen Cache dürfen gelöscht oder mit Index-Dateien versehen werden."""
+        return is_local(path) and os.path.abspath(path).startswith(os.path.abspath(self.cache_dir) + os.sep)
+    
+    def report_startup(self, dt):
+        """Startzeit-Bericht nach dem ersten Frame."""
+        TIMER.mark('first frame')
+        TIMER.report(os.path.join(self.user_data_dir, 'startup_report.json'))
+    
+    def flush_metrics(self, dt=None):
+        """Aktualisiert das Overlay und hängt einen Snapshot an das Metrik-Log an."""
+        if self.metrics_label:
+            self.metrics_label.text = METRICS.overlay_text()
+        self.metrics_log.write(METRICS.snapshot())
+    
+    def ensure_analyzer(self):
+        """Lädt numpy + Analyse erst beim ersten Abspielen."""
+        if self.analyzer is None:
+            with TIMER.section('init analyzer (numpy)'):
+                from audio_analysis import StreamingAnalyzer
+                self.analyzer = StreamingAnalyzer(ANALYSIS_WINDOW, ANALYSIS_SAMPLE_RATE)
+            self.visualizer.start()
+            self.analyzer.seed(self.visualizer.effect_seed)
+            if self.party_mode != 'guest':
+                self.visualizer.analyzer = self.analyzer
+            if RECORD_PATH:
+                self.start_recording(RECORD_PATH)
+        return self.analyzer
+    
+    def start_recording(self, path):
+        """Nimmt alle Snapshots des Analyzers auf (für session_replay.py)."""
+        from session_replay import SessionRecorder
+        try:
+            self.recorder = SessionRecorder(
+                path, seed=self.visualizer.effect_seed, size=self.visualizer.size,
+                get_tracker=lambda: getattr(self.analyzer, 'beat_tracker', None)
+            ).attach(self.analyzer.state)
+            print(f"Aufnahme: {path} (Seed {self.visualizer.effect_seed})")
+        except OSError as e:
+            print(f"Aufnahme nicht möglich: {e}")
+    
+    def stop_recording(self):
+        if self.recorder is not None:
+            self.recorder.close()
+            self.recorder = None
+    
+    def set_publish_callback(self, callback):
+        """Callback für neue Snapshots (Party-Host); bei laufender Aufnahme hinter dem Recorder."""
+        if self.recorder is not None:
+            self.recorder.forward = callback
+        else:
+            self.analyzer.state.on_publish = callback
+    
     def on_song_selected(self, spinner, text):
         """Wird aufgerufen wenn ein Song ausgewählt wird."""
         if text != 'Wähle einen Song':
             self.selected_song_name = text
             self.info_label.text = f'✅ Ausgewählt: {text[:40]}...'
             self.info_label.color = (0, 1, 0, 1)
+            self.prefetcher.prioritize(list(self.songs), text)
+            self.visualizer.start()
     
-    def get_audio_url(self, youtube_url, song_name):
-        """Lädt Audio herunter und gibt lokalen Pfad zurück."""
+    def on_prefetch_progress(self, item):
+        """Zeigt den Prefetch-Fortschritt des ausgewählten Songs an (Worker-Thread)."""
+        if item.name != self.selected_song_name or self.sound:
+            return
+        if item.state == DOWNLOADING:
+            text = f'⏬ Vorladen: {int(item.progress * 100)}%'
+        elif item.state == DONE:
+            text = f'✅ Bereit: {item.name[:40]}'
+        elif item.state == FAILED:
+            text = '⚠️ Vorladen fehlgeschlagen'
+        else:
+            return
+        Clock.schedule_once(lambda dt: setattr(self.info_label, 'text', text))
+    
+    def download_audio(self, youtube_url, progress=None, cancel_event=None):
+        """Lädt Audio in den Cache herunter und gibt den lokalen Pfad zurück."""
+        video_id = video_id_from_url(youtube_url)
+        cached = self.cache.get(video_id) if video_id else None
+        if cached:
+            return cached
+        
+        # Schneller Weg: aufgelöste Stream-URL direkt laden (kein zweites extract_info)
+        try:
+            stream = self.extractor.resolve(youtube_url)
+            if stream:
+                path = self.download_direct(stream, progress, cancel_event)
+                if path:
+                    return path
+                self.extractor.metadata.invalidate(stream['id'])
+        except PrefetchCancelled:
+            raise
+        except Exception as e:
+            print(f"Direct download error: {e}")
+        if cancel_event is not None and cancel_event.is_set():
+            return None
+        
+        def hook(d):
+            if cancel_event is not None and cancel_event.is_set():
+                raise PrefetchCancelled(youtube_url)
+            if progress and d.get('status') == 'downloading':
+                total = d.get('total_bytes') or d.get('total_bytes_estimate')
+                if total:
+                    progress(d.get('downloaded_bytes', 0) / total)
+        
+        # Versuche erst ohne FFmpeg (direkter Download)
+        ydl_opts = {
+            'format': 'bestaudio[ext=m4a]/bestaudio/best',
+            'outtmpl': self.cache.staging_template(),
+            'quiet': True,  # Zeige keine Fehler
+            'no_warnings': True,
+            "logger": None,
+            'socket_timeout': 60,
+            'retries': 3,
+            'fragment_retries': 3,
+            'progress_hooks': [hook],
+        }
+        
+        print(f"Downloading from: {youtube_url}")
+        
+        import yt_dlp
+        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+            info = ydl.extract_info(youtube_url, download=True)
+            staged_path = ydl.prepare_filename(info)
+            print(f"Download info: {info.get('title', 'Unknown')}")
+        
+        if os.path.exists(staged_path) and os.path.getsize(staged_path) > 1:
+            path = self.cache.put(info.get('id') or video_id, staged_path, info)
+            print(f"Success! File size: {os.path.getsize(path)} bytes")
+            return path
+        return None
+    
+    def download_direct(self, stream, progress=None, cancel_event=None):
+        """Lädt eine bereits aufgelöste Stream-URL in den Cache."""
+        path = os.path.join(self.cache.staging_dir, f"{stream['id']}.{stream['ext'] or 'm4a'}")
+        download = ProgressiveDownload(stream['url'], path).start()
+        
+        while not download.complete.wait(0.5):
+            if cancel_event is not None and cancel_event.is_set():
+                download.cancel()
+                raise PrefetchCancelled(stream['id'])
+            if progress:
+                progress(download.fraction())
+        
+        if not download.ok:
+            return None
+        return self.cache.put(stream['id'], path, stream)
+    
+    def get_audio_url(self, youtube_url, song_name, token=None):
+        """Lädt Audio herunter und gibt lokalen Pfad zurück (TaskCancelled bei Abbruch)."""
+        token = token or CancelToken()
+        if is_local(youtube_url):
+            # Titel aus der lokalen Bibliothek: direkt abspielen, kein Netz nötig
+            return youtube_url if os.path.exists(youtube_url) else None
         try:
             # Prüfe ob Song schon gecached ist
-            cache_filename = song_name.replace(' ', '_').replace('-', '').replace('!', '').replace(':', '') + '.mp3'
-            cache_path = os.path.join(self.cache_dir, cache_filename)
+            video_id = video_id_from_url(youtube_url)
+            cache_path = self.cache.get(video_id) if video_id else None
             
-            if os.path.exists(cache_path) and os.path.getsize(cache_path) > 1:  # Mindestens 1B
+            if cache_path:
                 Clock.schedule_once(lambda dt: setattr(
                     self.info_label, 'text', '✅ Aus Cache geladen!'
                 ))
                 return cache_path
             
-            Clock.schedule_once(lambda dt: setattr(
-                self.info_label, 'text', '⏬ Lade Song herunter... (kann 30-60 Sek dauern)'
-            ))
+            # Noch nicht vorgeladen: streamen statt auf den Download zu warten
+            item = self.prefetcher.get(song_name)
+            if PROGRESSIVE_PLAYBACK and not (item and item.state == DONE):
+                stream_path = self.start_progressive(youtube_url, song_name, token)
+                if stream_path:
+                    return stream_path
             
-            # Versuche erst ohne FFmpeg (direkter Download)
-            ydl_opts = {
-                'format': 'bestaudio[ext=m4a]/bestaudio/best',
-                'outtmpl': os.path.join(self.cache_dir, '%(title)s.%(ext)s'),
-                'quiet': True,  # Zeige keine Fehler
-                'no_warnings': True,
-                "logger": None,
-                'socket_timeout': 60,
-                'retries': 3,
-                'fragment_retries': 3,
-            }
-            
-            print(f"Downloading from: {youtube_url}")
-            print(f"Saving to: {cache_path}")
-            
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                info = ydl.extract_info(youtube_url, download=True)
-                print(f"Download info: {info.get('title', 'Unknown')}")
+            # Über die Prefetch-Queue laden (läuft evtl. schon im Hintergrund)
+            item = self.prefetcher.request(song_name, youtube_url)
+            if item.state != DONE:
+                Clock.schedule_once(lambda dt: setattr(
+                    self.info_label, 'text', '⏬ Lade Song herunter...'
+                ))
+            # Stop/Songwechsel bricht auch den Download ab
+            abort = token.on_cancel(lambda: self.prefetcher.cancel(song_name))
+            token.wait_for(item.done)
+            token.discard(abort)
+            token.check()
             
             # Prüfe ob Download erfolgreich
-            try:
-                os.path.exists(cache_path) and os.path.getsize(cache_path) > 1
+            if item.state == DONE and item.path:
                 Clock.schedule_once(lambda dt: setattr(
                     self.info_label, 'text', '✅ Download komplett!'
                 ))
-                print(f"Success! File size: {os.path.getsize(cache_path)} bytes")
-                return cache_path
-            except Exception as e:
-                
-                print(f"Download verification error: {e}")
-                # Versuche direkten Stream-Link
-                return self.get_direct_stream_url(youtube_url)
+                return item.path
+            
+            print(f"Download verification error: {item.error}")
+            # Versuche direkten Stream-Link
+            return self.get_direct_stream_url(youtube_url)
                 
+        except TaskCancelled:
+            raise
         except Exception as e:
             print(f"Download error: {e}")
             import traceback
@@ -450,38 +637,20 @@ class ChristmasDiscoApp(App):
             # Fallback: Direkter Stream
             return self.get_direct_stream_url(youtube_url)
     
+    def resolve_stream(self, youtube_url):
+        """Ermittelt direkte Stream-URL, Endung, Dauer und ID ohne Download (gecacht)."""
+        return self.extractor.resolve(youtube_url)
+    
     def get_direct_stream_url(self, youtube_url):
         """Holt direkten Stream-Link als Fallback."""
         try:
             print("Trying direct stream method...")
-            ydl_opts = {
-                'format': 'bestaudio[ext=m4a]/bestaudio/best',
-                'quiet': False,
-                'no_warnings': False,
-            }
-            
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                info = ydl.extract_info(youtube_url, download=False)
-                
-                # Hole direkte URL
-                if 'url' in info:
-                    print(f"Found direct URL")
-                    Clock.schedule_once(lambda dt: setattr(
-                        self.info_label, 'text', '🔗 Verwende direkten Stream'
-                    ))
-                    return info['url']
-                
-                # Suche in formats
-                formats = info.get('formats', [])
-                for fmt in formats:
-                    if fmt.get('acodec') != 'none':
-                        url = fmt.get('url')
-                        if url:
-                            print(f"Found stream URL in format: {fmt.get('format_id')}")
-                            Clock.schedule_once(lambda dt: setattr(
-                                self.info_label, 'text', '🔗 Verwende direkten Stream'
-                            ))
-                            return url
+            stream = self.resolve_stream(youtube_url)
+            if stream:
+                Clock.schedule_once(lambda dt: setattr(
+                    self.info_label, 'text', '🔗 Verwende direkten Stream'
+                ))
+                return stream['url']
             
             return None
                 
@@ -491,18 +660,147 @@ class ChristmasDiscoApp(App):
             traceback.print_exc()
             return None
     
+    def start_progressive(self, youtube_url, song_name, token):
+        """Startet den Streaming-Download und gibt den Pfad nach dem Anfangspuffer zurück."""
+        try:
+            stream = self.resolve_stream(youtube_url)
+        except Exception as e:
+            print(f"Stream error: {e}")
+            return None
+        if not stream:
+            return None
+        
+        # Kein paralleler Prefetch desselben Songs
+        self.prefetcher.cancel(song_name)
+        
+        path = os.path.join(self.cache.staging_dir, f"{stream['id']}.{stream['ext'] or 'm4a'}")
+        download = ProgressiveDownload(stream['url'], path, initial_bytes=PROGRESSIVE_INITIAL_BYTES)
+        token.check()
+        self.progressive = download
+        self.progressive_info = stream
+        
+        Clock.schedule_once(lambda dt: setattr(
+            self.info_label, 'text', '⏬ Puffere Stream...'
+        ))
+        download.start()
+        abort = token.on_cancel(download.cancel)
+        if not download.wait_ready(timeout=30):
+            download.cancel()
+            if self.progressive is download:
+                self.progressive = None
+            token.check()
+            return None
+        # Ab hier gehört der Download der Wiedergabe (stop_progressive bricht ihn ab)
+        token.discard(abort)
+        print(f"Stream-Puffer bereit nach {download.time_to_ready:.2f}s")
+        
+        # Fertige Datei in den Cache übernehmen
+        def finalize(task_token):
+            if not task_token.wait_for(download.complete) or not download.ok:
+                return
+            try:
+                cached = download.promote(lambda staged: self.cache.put(stream['id'], staged, stream))
+                self.prepare_track_async(cached)
+            except OSError as e:
+                print(f"Cache put error: {e}")
+        
+        self.tasks.submit(finalize)
+        return path
+    
+    def check_buffer(self, dt):
+        """Erkennt Aussetzer beim Streaming und pausiert, bis genug Daten da sind."""
+        download = self.progressive
+        if not download or not self.sound:
+            return False
+        
+        duration = self.progressive_info.get('duration') or self.sound.length
+        if self.buffering:
+            if download.has_data_for(self.buffer_pos, duration, margin=PROGRESSIVE_RESUME_MARGIN):
+                self.buffering = False
+                self.sound.play()
+                self.sound.seek(self.buffer_pos)
+                self.info_label.text = f'▶️ Spiele: {self.selected_song_name[:30]}... (Aussetzer: {download.underruns})'
+            return True
+        
+        pos = self.sound.get_pos()
+        stalled = self.sound.state == 'stop' and not download.complete.is_set()
+        if stalled or not download.has_data_for(pos, duration, margin=0.5):
+            download.underruns += 1
+            self.buffering = True
+            self.buffer_pos = pos if pos > 0 else self.buffer_pos
+            self.sound.stop()
+            self.info_label.text = f'⏸️ Puffern... {int(download.fraction() * 100)}% (Aussetzer: {download.underruns})'
+            return True
+        
+        self.buffer_pos = pos
+        if download.complete.is_set():
+            print(f"Stream komplett, Aussetzer: {download.underruns}")
+            return False
+        return True
+    
+    def start_loaded_song(self, token, sound, audio_path, song_name, youtube_url):
+        """
+        Startet einen fertig geladenen Song (Main-Thread). Ist die Lade-Aufgabe
+        inzwischen überholt (Stop/Skip), wird der Sound verworfen statt über dem
+        neuen Song zu spielen.
+        """
+        if not self.tasks.is_current(token):
+            sound.unload()
+            return
+        try:
+            self.sound = sound
+            self.info_label.text = f'▶️ Spiele: {song_name[:30]}...'
+            self.info_label.color = (0, 1, 0, 1)
+            
+            # Spiele Sound
+            self.sound.volume = 1.0
+            self.sound.play()
+            print("Playing audio...")
+            if self.play_requested_at is not None:
+                METRICS.gauge('time_to_first_sound', time.perf_counter() - self.play_requested_at)
+                self.play_requested_at = None
+            
+            # Laufenden Song vor Cache-Verdrängung schützen
+            self.playing_video_id = video_id_from_url(youtube_url)
+            self.cache.pin(self.playing_video_id)
+            self.set_playing(True)
+            
+            # Starte Audio-Analyse (beim Streaming aus der wachsenden Datei)
+            download = self.progressive if self.progressive and self.progressive.path == audio_path else None
+            if download:
+                self.buffering = False
+                self.buffer_pos = 0
+                Clock.schedule_interval(self.check_buffer, 0.25)
+            self.start_analysis(audio_path, reader=download.reader() if download else None)
+            self.on_track_started(song_name)
+        except Exception as e:
+            print(f"Playback error: {e}")
+            import traceback
+            traceback.print_exc()
+            self.info_label.text = f'❌ Playback-Fehler: {str(e)[:30]}'
+            self.info_label.color = (1, 0, 0, 1)
+    
     def play_song(self, instance):
         """Spielt ausgewählten Song ab."""
+        if self.party_mode == 'guest':
+            self.info_label.text = '🎉 Gast-Modus: der Host spielt die Musik'
+            return
         if not self.selected_song_name or self.selected_song_name == 'Wähle einen Song':
             self.info_label.text = '⚠️ Bitte Song auswählen!'
             self.info_label.color = (1, 0.5, 0, 1)
             return
         
-        youtube_url = self.songs[self.selected_song_name]
+        song_name = self.selected_song_name
+        youtube_url = self.songs[song_name]
         
-        # Starte Audio-Extraktion in Thread
-        def load_and_play():
-            audio_path = self.get_audio_url(youtube_url, self.selected_song_name)
+        # Songwechsel: laufenden Song samt Analyse, Stream und Vorladen beenden
+        if self.sound:
+            self.stop_song(None)
+        
+        # Starte Audio-Extraktion als Aufgabe (bricht ein noch laufendes Laden ab)
+        def load_and_play(token):
+            audio_path = self.get_audio_url(youtube_url, song_name, token)
+            token.check()
             
             if not audio_path:
                 Clock.schedule_once(lambda dt: setattr(
@@ -520,32 +818,29 @@ class ChristmasDiscoApp(App):
                 ))
                 
                 print(f"Loading audio from: {audio_path}")
-                self.sound = SoundLoader.load(audio_path)
-                print(f"SoundLoader result: {self.sound}")
+                from transcode import playable_path
+                sound = SoundLoader.load(playable_path(audio_path))
+                print(f"SoundLoader result: {sound}")
+                if not self.tasks.is_current(token):
+                    # Stop/Songwechsel während des Ladens: Ergebnis verwerfen, Speicher freigeben
+                    if sound:
+                        sound.unload()
+                    return
                 
-                if self.sound:
+                if sound:
                     # Prüfe ob Sound geladen wurde
-                    if self.sound.length > 0:
-                        Clock.schedule_once(lambda dt: setattr(
-                            self.info_label, 'text', f'▶️ Spiele: {self.selected_song_name[:30]}...'
-                        ))
-                        Clock.schedule_once(lambda dt: setattr(
-                            self.info_label, 'color', (0, 1, 0, 1)
-                        ))
-                        
-                        # Spiele Sound
-                        self.sound.volume = 1.0
-                        self.sound.play()
-                        print("Playing audio...")
-                        
-                        # Starte Audio-Analyse
-                        self.start_analysis()
+                    if sound.length > 0:
+                        # Starten auf dem Main-Thread, wie stop_song/play_song: zwischen
+                        # Generations-Prüfung und play() kann kein Songwechsel mehr liegen
+                        Clock.schedule_once(lambda dt: self.start_loaded_song(
+                            token, sound, audio_path, song_name, youtube_url))
                     else:
+                        sound.unload()
                         Clock.schedule_once(lambda dt: setattr(
                             self.info_label, 'text', '❌ Audio-Datei leer oder beschädigt'
                         ))
-                        if os.path.exists(audio_path) and not audio_path.startswith('http'):
-                            os.remove(audio_path)
+                        if self.is_cache_file(audio_path):
+                            self.cache.remove_path(audio_path)
                 else:
                     Clock.schedule_once(lambda dt: setattr(
                         self.info_label, 'text', '❌ Kivy konnte Audio nicht laden. Versuche anderen Song!'
@@ -553,8 +848,8 @@ class ChristmasDiscoApp(App):
                     Clock.schedule_once(lambda dt: setattr(
                         self.info_label, 'color', (1, 0.5, 0, 1)
                     ))
-                    if os.path.exists(audio_path) and not audio_path.startswith('http'):
-                        os.remove(audio_path)
+                    if self.is_cache_file(audio_path):
+                        self.cache.remove_path(audio_path)
                     
             except Exception as e:
                 print(f"Playback error: {e}")
@@ -567,52 +862,430 @@ class ChristmasDiscoApp(App):
                     self.info_label, 'color', (1, 0, 0, 1)
                 ))
         
+        self.play_requested_at = time.perf_counter()
+        
         # Disable Play-Button während des Ladens
         self.play_btn.disabled = True
         self.play_btn.text = '⏳ Lädt...'
         
-        # Starte in Thread
-        def run_and_enable():
-            load_and_play()
-            Clock.schedule_once(lambda dt: setattr(self.play_btn, 'disabled', False))
-            Clock.schedule_once(lambda dt: setattr(self.play_btn, 'text', '▶️ Play'))
+        # Abgebrochene Aufgaben geben den Button nicht frei (macht stop_song)
+        def run_and_enable(token):
+            try:
+                load_and_play(token)
+            finally:
+                if self.tasks.is_current(token):
+                    Clock.schedule_once(lambda dt: setattr(self.play_btn, 'disabled', False))
+                    Clock.schedule_once(lambda dt: setattr(self.play_btn, 'text', '▶️ Play'))
         
-        threading.Thread(target=run_and_enable, daemon=True).start()
+        self.tasks.start('playback', run_and_enable)
+    
+    def on_track_started(self, name):
+        """Neuer Titel läuft: Position merken, Songende beobachten, Nachfolger vorladen."""
+        self.queue.jump_to(name)
+        self.track_started_at = time.time()
+        Clock.unschedule(self.watch_track)
+        Clock.schedule_interval(self.watch_track, TRACK_WATCH_INTERVAL)
+        if not self.next_track or self.next_track[0] != self.queue.peek_next():
+            self.preload_next()
     
-    def start_analysis(self):
-        """Startet Audio-Analyse."""
-        if self.analysis_thread and self.analysis_thread.is_alive():
+    def preload_next(self):
+        """Lädt, analysiert (Feature-Index) und dekodiert den nächsten Titel im Hintergrund."""
+        self.discard_next_track()
+        name = self.queue.peek_next()
+        if not name or name == self.queue.current:
             return
+        youtube_url = self.songs[name]
         
-        def analyze_loop():
-            while self.analyzer.running:
+        def run(token):
+            if is_local(youtube_url):
+                path = youtube_url
+            else:
+                item = self.prefetcher.request(name, youtube_url)
+                if not token.wait_for(item.done) or item.state != DONE or not item.path:
+                    return
+                path = item.path
+            
+            # Transkodieren + Analyse vorab, damit der Wechsel nur noch Index-Lookups braucht
+            from feature_index import FeatureIndex
+            from audio_stream import PCMDecoder
+            from transcode import playable_path
+            if self.is_cache_file(path) and not FeatureIndex.is_fresh(path) and PCMDecoder.available():
+                self.prepare_track(path, token.event)
+            
+            token.check()
+            sound = SoundLoader.load(playable_path(path))
+            if not sound or sound.length <= 0:
+                print(f"Vorladen fehlgeschlagen: {name}")
+                return
+            if not self.tasks.is_current(token):
+                sound.unload()
+                return
+            self.cache.pin(video_id_from_url(youtube_url))
+            self.next_track = (name, path, sound)
+            print(f"Nächster Titel vorgeladen: {name}")
+        
+        self.tasks.start('preload', run)
+    
+    def discard_next_track(self):
+        """Verwirft den vorgeladenen (oder noch ladenden) Nachfolger."""
+        self.tasks.cancel('preload')
+        if self.next_track:
+            name, path, sound = self.next_track
+            self.next_track = None
+            sound.unload()
+            video_id = video_id_from_url(self.songs.get(name, path))
+            if video_id != self.playing_video_id:
+                self.cache.unpin(video_id)
+    
+    def watch_track(self, dt):
+        """Startet kurz vor dem Songende die Überblendung bzw. schaltet weiter."""
+        sound = self.sound
+        if not sound or self.buffering or self.fading:
+            return
+        pos = sound.get_pos()
+        if pos <= 0:
+            pos = time.time() - self.track_started_at
+        remaining = sound.length - pos
+        
+        if self.next_track and remaining <= max(CROSSFADE_SECONDS, TRACK_WATCH_INTERVAL):
+            self.start_crossfade()
+        elif sound.state == 'stop' and not (self.progressive and not self.progressive.complete.is_set()):
+            # Ende ohne fertigen Nachfolger: normal laden
+            self.advance_track()
+    
+    def start_crossfade(self):
+        """Startet den vorgeladenen Titel und blendet vom laufenden über."""
+        name, path, sound = self.next_track
+        self.next_track = None
+        old = self.sound
+        
+        sound.volume = 0.0 if CROSSFADE_SECONDS > 0 else 1.0
+        sound.play()
+        self.sound = sound
+        
+        # Alter Stream darf zu Ende laden (landet im Cache), nur nicht mehr überwachen
+        Clock.unschedule(self.check_buffer)
+        self.progressive = None
+        self.buffering = False
+        
+        self.cache.unpin(self.playing_video_id)
+        self.playing_video_id = video_id_from_url(self.songs.get(name, path))
+        self.song_spinner.text = name
+        self.selected_song_name = name
+        self.info_label.text = f'▶️ Spiele: {name[:30]}...'
+        self.info_label.color = (0, 1, 0, 1)
+        
+        # Analyse wechselt sofort (Index ist vorberechnet), Visualizer läuft ohne Pause weiter
+        self.start_analysis(path)
+        if old:
+            self.fading = (old, time.perf_counter())
+            Clock.schedule_interval(self.update_crossfade, 1 / 30.)
+        self.on_track_started(name)
+    
+    def update_crossfade(self, dt):
+        """Equal-Power-Überblendung zwischen altem und neuem Sound."""
+        old, start = self.fading
+        t = 1.0 if CROSSFADE_SECONDS <= 0 else min(1.0, (time.perf_counter() - start) / CROSSFADE_SECONDS)
+        if self.sound:
+            self.sound.volume = math.sin(t * math.pi / 2)
+        old.volume = math.cos(t * math.pi / 2)
+        if t >= 1.0:
+            old.stop()
+            old.unload()
+            self.fading = None
+            return False
+    
+    def advance_track(self):
+        """Nächster Titel über den normalen Lade-Weg (ohne vorgeladenen Nachfolger)."""
+        Clock.unschedule(self.watch_track)
+        name = self.queue.advance()
+        if not name:
+            self.stop_song(None)
+            return
+        self.cache.unpin(self.playing_video_id)
+        self.song_spinner.text = name
+        self.selected_song_name = name
+        self.play_song(None)
+    
+    def skip_track(self, instance):
+        """⏭️: mit vorgeladenem Nachfolger sofort überblenden, sonst stoppen und laden."""
+        if self.sound and self.next_track and not self.fading:
+            self.start_crossfade()
+            return
+        if self.sound:
+            self.stop_song(None)
+        self.advance_track()
+    
+    def toggle_shuffle(self, instance):
+        self.queue.set_shuffle(not self.queue.shuffle)
+        self.shuffle_btn.text = '🔀 An' if self.queue.shuffle else '🔀 Aus'
+        if self.sound:
+            self.preload_next()
+    
+    def toggle_party(self, instance):
+        """🎉: Aus -> Host -> Gast -> Aus."""
+        modes = ('off', 'host', 'guest')
+        self.set_party_mode(modes[(modes.index(self.party_mode) + 1) % len(modes)])
+    
+    def set_party_mode(self, mode):
+        """
+        Host: jeder Analyse-Snapshot geht zusätzlich per Multicast ins LAN.
+        Gast: keine eigene Wiedergabe/Analyse, der Visualizer liest die Snapshots
+        des Hosts. Beide rendern mit derselben Verzögerung, damit alle Geräte
+        denselben Zeitpunkt zeigen.
+        """
+        from party import PartyHost, PartyClient, PARTY_RENDER_DELAY
+        self.stop_party()
+        self.party_mode = mode
+        
+        if mode == 'host':
+            self.ensure_analyzer()
+            self.party = PartyHost(get_tracker=lambda: getattr(self.analyzer, 'beat_tracker', None)).start()
+            self.set_publish_callback(self.party.send)
+            self.party.set_playing(bool(self.sound))
+            self.visualizer.render_delay = PARTY_RENDER_DELAY
+            self.party_btn.text = '🎉 Host'
+            self.info_label.text = '🎉 Party-Host: Gäste im WLAN zeigen diesen Song mit'
+        elif mode == 'guest':
+            if self.sound:
+                self.stop_song(None)
+            try:
+                self.party = PartyClient(on_playing=self.on_party_playing).start()
+            except OSError as e:
+                print(f"Party error: {e}")
+                self.party_mode = 'off'
+                self.info_label.text = '❌ Party-Modus nicht verfügbar'
+                return
+            self.visualizer.analyzer = self.party
+            self.visualizer.render_delay = PARTY_RENDER_DELAY
+            self.visualizer.start()
+            self.play_btn.disabled = True
+            self.next_btn.disabled = True
+            self.party_btn.text = '🎉 Gast'
+            self.info_label.text = '🎉 Warte auf Party-Host...'
+        else:
+            self.party_btn.text = '🎉 Aus'
+            self.info_label.text = '🎉 Party-Modus aus'
+    
+    def on_party_playing(self, playing):
+        """Gast: Host spielt / pausiert (Empfangs-Thread)."""
+        def apply(dt):
+            if self.party_mode != 'guest':
+                return
+            self.visualizer.set_playing(playing)
+            self.info_label.text = '🎉 Synchron mit Party-Host' if playing else '🎉 Warte auf Party-Host...'
+        Clock.schedule_once(apply)
+    
+    def stop_party(self):
+        """Beendet Host/Gast und stellt den normalen Visualizer-Betrieb wieder her."""
+        if self.party is None:
+            return
+        self.party.stop()
+        if self.party_mode == 'host' and self.analyzer:
+            self.set_publish_callback(None)
+        if self.party_mode == 'guest':
+            self.visualizer.analyzer = self.analyzer
+            self.visualizer.set_playing(bool(self.sound))
+            self.play_btn.disabled = False
+            self.next_btn.disabled = False
+        self.visualizer.render_delay = RENDER_DELAY
+        self.party = None
+        self.party_mode = 'off'
+    
+    def start_analysis(self, audio_path=None, reader=None):
+        """Startet Audio-Analyse (echte PCM-Daten, sonst Simulation)."""
+        self.stop_analysis()
+        
+        import numpy as np
+        from audio_stream import PCMDecoder
+        from feature_index import FeatureIndex
+        from transcode import PCMFile
+        from beat_tracking import BeatTracker
+        self.ensure_analyzer()
+        
+        # Neues Tempo und frischer Snapshot-Zustand pro Song
+        self.analyzer.attach_beat_tracker(BeatTracker(ANALYSIS_SAMPLE_RATE / ANALYSIS_HOP))
+        self.analyzer.state.reset()
+        
+        # Vorberechneter Feature-Index: nur Lookups, keine FFT
+        feature_index = FeatureIndex.open_for(audio_path)
+        
+        # Sonst transkodiertes PCM: Fenster sind memmap-Slices, kein Dekodieren
+        pcm = PCMFile.open_for(audio_path, ANALYSIS_SAMPLE_RATE) if feature_index is None else None
+        
+        decoder = None
+        if feature_index is None and pcm is None and audio_path and PCMDecoder.available():
+            try:
+                decoder = PCMDecoder(audio_path, sample_rate=ANALYSIS_SAMPLE_RATE, reader=reader)
+                decoder.start()
+            except Exception as e:
+                print(f"PCM decoder error: {e}")
+                decoder = None
+            
+            # Transkodieren + Index für das nächste Abspielen im Hintergrund
+            if decoder and reader is None and self.is_cache_file(audio_path):
+                self.prepare_track_async(audio_path)
+        elif feature_index is None and pcm is None:
+            print("Kein PCM-Decoder verfügbar - nutze Simulation")
+        self.decoder = decoder
+        
+        sound = self.sound
+        
+        def analyze_loop(token):
+            hop_time = ANALYSIS_HOP / ANALYSIS_SAMPLE_RATE
+            window = np.zeros(ANALYSIS_WINDOW, dtype=np.int16)
+            play_start = time.time()
+            next_end = None
+            max_catchup = ANALYSIS_SAMPLE_RATE  # höchstens 1 s nachholen
+            
+            while self.analyzer.running and not token.cancelled:
                 try:
-                    # Simuliere Analyse (echte Analyse benötigt Zugriff auf Audio-Buffer)
-                    self.analyzer.simulate_analysis()
-                    time.sleep(0.05)  # ~20Hz Update
+                    if feature_index is None and pcm is None and (decoder is None or decoder.error):
+                        # Simuliere Analyse (kein Zugriff auf Audio-Daten)
+                        self.analyzer.simulate_analysis(time.time() - play_start)
+                        time.sleep(0.05)  # ~20Hz Update
+                        continue
+                    
+                    # Wiedergabeposition bestimmen (manche Provider liefern immer 0)
+                    pos = sound.get_pos() if sound else 0
+                    if pos <= 0:
+                        pos = time.time() - play_start
+                    
+                    if feature_index is not None:
+                        with METRICS.timer('analysis_ms'):
+                            feature_index.apply(self.analyzer, pos)
+                        time.sleep(hop_time)
+                        continue
+                    
+                    # Jeden Hop zwischen letzter Analyse und Wiedergabeposition genau
+                    # einmal analysieren; Sprünge (Seek, Hänger) setzen neu auf
+                    target = int(pos * ANALYSIS_SAMPLE_RATE) + ANALYSIS_HOP
+                    if next_end is None or abs(target - next_end) > max_catchup:
+                        next_end = max(target, ANALYSIS_WINDOW)
+                    
+                    finished = False
+                    while next_end <= target:
+                        if pcm is not None:
+                            chunk = pcm.window(next_end, ANALYSIS_WINDOW)
+                            if chunk is None:
+                                finished = next_end > len(pcm)
+                                break
+                        elif decoder.ring.read_window(next_end, ANALYSIS_WINDOW, window) is not None:
+                            chunk = window
+                        else:
+                            finished = next_end - ANALYSIS_WINDOW > decoder.ring.write_pos and decoder.finished
+                            break
+                        with METRICS.timer('analysis_ms'):
+                            self.analyzer.analyze_chunk(chunk, next_end / ANALYSIS_SAMPLE_RATE)
+                        next_end += ANALYSIS_HOP
+                    if finished:
+                        break
+                    
+                    time.sleep(hop_time)
                     
                 except Exception as e:
                     print(f"Analysis error: {e}")
                     break
         
         self.analyzer.running = True
-        self.analysis_thread = threading.Thread(target=analyze_loop, daemon=True)
-        self.analysis_thread.start()
+        self.tasks.start('analysis', analyze_loop)
+    
+    def prepare_track(self, audio_path, cancel_event=None):
+        """
+        Einmal pro Cache-Datei: transkodieren (Analyse-PCM + Wiedergabe-Datei),
+        dann den Feature-Index aus dem PCM bauen - nur ein Dekodier-Durchgang.
+        """
+        import transcode
+        from feature_index import FeatureIndex, build_feature_index
+        if audio_path in self.indexing:
+            return
+        self.indexing.add(audio_path)
+        try:
+            if (TRANSCODE_CACHE and transcode.available()
+                    and not transcode.is_fresh(transcode.pcm_path_for(audio_path), audio_path)):
+                transcode.transcode(audio_path, ANALYSIS_SAMPLE_RATE, TRANSCODE_PLAYBACK_FORMAT, cancel_event)
+            if not FeatureIndex.is_fresh(audio_path) and not (cancel_event and cancel_event.is_set()):
+                build_feature_index(audio_path, sample_rate=ANALYSIS_SAMPLE_RATE,
+                                    window=ANALYSIS_WINDOW, hop=ANALYSIS_HOP)
+        except Exception as e:
+            print(f"Feature-Index error: {e}")
+        finally:
+            self.indexing.discard(audio_path)
+            self.cache.update_sidecars(audio_path)
+    
+    def prepare_track_async(self, audio_path):
+        """prepare_track im Hintergrund (abgebrochen nur beim Beenden)."""
+        if audio_path not in self.indexing:
+            self.tasks.submit(lambda token: self.prepare_track(audio_path, token.event))
+    
+    def stop_analysis(self):
+        """Beendet Analyse-Thread und PCM-Decoder."""
+        if self.analyzer:
+            self.analyzer.running = False
+        if self.decoder:
+            self.decoder.stop()
+            self.decoder = None
+        task = self.tasks.cancel('analysis')
+        if task:
+            task.wait(timeout=1.0)
+    
+    def set_playing(self, playing):
+        """Wiedergabe läuft/endet: Visualizer-Rate und (als Party-Host) die Gäste."""
+        self.visualizer.set_playing(playing)
+        if self.party_mode == 'host' and self.party is not None:
+            self.party.set_playing(playing, self.analyzer.state.latest() if self.analyzer else None)
     
     def stop_song(self, instance):
         """Stoppt Wiedergabe."""
+        # Laufendes Laden/Herunterladen sofort abbrechen, Ergebnis wird verworfen
+        self.tasks.cancel('playback')
+        self.play_btn.disabled = False
+        self.play_btn.text = '▶️ Play'
         if self.sound:
             self.sound.stop()
             self.sound = None
+        self.stop_playlist()
         
-        self.analyzer.running = False
+        self.stop_analysis()
+        self.stop_progressive()
+        self.set_playing(False)
+        self.cache.unpin(self.playing_video_id)
         self.info_label.text = '⏹️ Gestoppt'
     
+    def stop_playlist(self):
+        """Beendet Songende-Überwachung, Überblendung und Vorladen."""
+        Clock.unschedule(self.watch_track)
+        Clock.unschedule(self.update_crossfade)
+        if self.fading:
+            self.fading[0].stop()
+            self.fading = None
+        self.discard_next_track()
+    
+    def stop_progressive(self):
+        """Bricht einen unvollständigen Streaming-Download ab."""
+        Clock.unschedule(self.check_buffer)
+        if self.progressive and not self.progressive.complete.is_set():
+            self.progressive.cancel()
+        self.progressive = None
+        self.buffering = False
+    
     def on_stop(self):
         """Cleanup beim Beenden."""
         if self.sound:
             self.sound.stop()
-        self.analyzer.running = False
+        self.stop_playlist()
+        self.stop_analysis()
+        self.stop_progressive()
+        self.stop_party()
+        self.stop_recording()
+        self.library.stop()
+        self.tasks.shutdown()
+        self.prefetcher.shutdown()
+        self.cache.flush()
+        self.extractor.close()
+        if METRICS.enabled:
+            self.flush_metrics()
 
 if __name__ == '__main__':
+    TIMER.mark('module loaded')
     ChristmasDiscoApp().run()
\ No newline at end of file
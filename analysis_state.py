@@ -0,0 +1,131 @@
+"""
+Geteilter Analyse-Zustand zwischen Analyse-Thread und Render-Loop.
+Der Analyse-Thread veröffentlicht unveränderliche Snapshots per einfacher
+Referenz-Zuweisung (atomar unter dem GIL, kein Lock). Ein Beat-Zähler sorgt
+dafür, dass kein Beat zwischen zwei Frames verloren geht. Die letzten
+Snapshots bleiben mit Zeitstempel erhalten: der Renderer sieht den Zustand
+zum Zeitpunkt `jetzt - Verzögerung` (Pegel interpoliert, Beats verzögert),
+auch wenn die Verzögerung mehrere Analyse-Schritte umfasst (Party-Modus).
+"""
+import time
+from collections import namedtuple
+
+AnalysisSnapshot = namedtuple('AnalysisSnapshot', [
+    'seq',           # Laufende Nummer
+    'timestamp',     # perf_counter() beim Veröffentlichen
+    'stream_time',   # Position im Song (Sekunden) oder None
+    'bass',
+    'mid',
+    'treble',
+    'overall',
+    'beat',          # Beat in genau diesem Analyse-Schritt
+    'beat_count',    # Anzahl aller Beats seit Start
+    'bpm',
+    'bands',         # Spektrum-Bänder 0..1 (numpy-Array, nicht verändern) oder None
+], defaults=(None,))
+
+EMPTY_SNAPSHOT = AnalysisSnapshot(0, 0.0, None, 0.0, 0.0, 0.0, 0.0, False, 0, 0.0)
+
+# Analyse-Parameter für Live-Analyse, Feature-Index und Batch-Analyse
+ANALYSIS_SAMPLE_RATE = 22050
+ANALYSIS_WINDOW = 1024
+ANALYSIS_HOP = 512
+
+# Gehaltene Snapshots: ~0.7 s bei 23 ms Hop, deutlich mehr als jede Render-Verzögerung
+HISTORY_SIZE = 32
+
+
+class SharedAnalysisState:
+    """Ein Schreiber (Analyse-Thread), beliebig viele Leser."""
+    def __init__(self, history_size=HISTORY_SIZE):
+        self.history_size = history_size
+        # Letzte Snapshots, älteste zuerst - wird immer als Ganzes ersetzt
+        self.history = (EMPTY_SNAPSHOT,)
+        self.last_beat = False
+        self.on_publish = None   # optional: Callback(snapshot), z.B. Party-Host
+
+    def _append(self, snapshot):
+        self.history = (self.history + (snapshot,))[-self.history_size:]
+
+    def publish(self, bass, mid, treble, overall, beat, bpm=0.0, stream_time=None, bands=None):
+        prev = self.history[-1]
+        # Nur steigende Flanken zählen (ein Beat über mehrere Schritte = ein Beat)
+        new_beat = bool(beat) and not self.last_beat
+        self.last_beat = bool(beat)
+        snapshot = AnalysisSnapshot(
+            prev.seq + 1, time.perf_counter(), stream_time,
+            float(bass), float(mid), float(treble), float(overall),
+            new_beat, prev.beat_count + (1 if new_beat else 0), float(bpm), bands,
+        )
+        self._append(snapshot)
+        if self.on_publish is not None:
+            self.on_publish(snapshot)
+        return snapshot
+
+    def push(self, snapshot):
+        """Übernimmt einen fertigen Snapshot (z.B. aus dem Netz), Beat-Zähler inklusive."""
+        # Verspätete Pakete (älter als der neueste Snapshot) nicht einsortieren
+        if snapshot.timestamp < self.history[-1].timestamp:
+            return snapshot
+        self._append(snapshot)
+        self.last_beat = snapshot.beat
+        return snapshot
+
+    def latest(self):
+        return self.history[-1]
+
+    def sample(self, now=None, delay=0.0):
+        """
+        Zustand zum Zeitpunkt `now - delay`: neuester Snapshot, der dann schon
+        veröffentlicht war (auch Beat-Felder), die Pegel linear zum nächsten
+        interpoliert. Liegt der Zeitpunkt vor allen gehaltenen Snapshots, kommt
+        der älteste zurück.
+        """
+        history = self.history
+        if history[-1].seq == 0 or len(history) < 2:
+            return history[-1]
+        now = time.perf_counter() if now is None else now
+        target = now - delay
+        i = len(history) - 1
+        while i > 0 and history[i].timestamp > target:
+            i -= 1
+        prev = history[i]
+        if i == len(history) - 1 or prev.timestamp > target:
+            return prev
+        cur = history[i + 1]
+        span = cur.timestamp - prev.timestamp
+        if span <= 0 or prev.seq == 0:
+            return prev
+        alpha = min(1.0, max(0.0, (target - prev.timestamp) / span))
+
+        def mix(a, b):
+            return a + (b - a) * alpha
+
+        bands = prev.bands
+        if bands is not None and cur.bands is not None and len(cur.bands) == len(bands):
+            bands = mix(bands, cur.bands)
+        return prev._replace(
+            bass=mix(prev.bass, cur.bass),
+            mid=mix(prev.mid, cur.mid),
+            treble=mix(prev.treble, cur.treble),
+            overall=mix(prev.overall, cur.overall),
+            bands=bands,
+        )
+
+    def reset(self):
+        self.history = (EMPTY_SNAPSHOT,)
+        self.last_beat = False
+
+
+class BeatCursor:
+    """Leser-Seite: zählt, wie viele Beats seit dem letzten Aufruf neu sind."""
+    def __init__(self):
+        self.seen = 0
+
+    def consume(self, snapshot):
+        new = snapshot.beat_count - self.seen
+        if new < 0:
+            # Zustand wurde zurückgesetzt (neuer Song)
+            new = snapshot.beat_count
+        self.seen = snapshot.beat_count
+        return new
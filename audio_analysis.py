@@ -0,0 +1,307 @@
+"""
+Audio-Analyse für den Christmas Disco Visualizer.
+Reines numpy, damit die Analyse auch ohne Kivy-Fenster läuft.
+"""
+import time
+import random
+import math
+
+import numpy as np
+
+from analysis_state import SharedAnalysisState
+from filterbank import log_filterbank, BandSmoother, DEFAULT_BANDS
+
+class AudioAnalyzer:
+    """Analysiert Audio in Echtzeit."""
+    def __init__(self):
+        self.bass_level = 0
+        self.mid_level = 0
+        self.treble_level = 0
+        self.overall_level = 0
+        self.beat_detected = False
+        self.band_levels = None   # Spektrum-Bänder 0..1 (nur StreamingAnalyzer/Index)
+        self.running = True
+        
+        # Audio-Buffer
+        self.audio_buffer = []
+        self.sample_rate = 44100
+        
+        # Beat-Detection
+        self.beat_history = []
+        self.beat_threshold = 1.5
+        
+        # Snapshots für den Render-Loop
+        self.state = SharedAnalysisState()
+        
+        # Zufall der Simulation (seed() für reproduzierbare Läufe)
+        self.rng = random.Random()
+        
+    def seed(self, seed):
+        self.rng.seed(seed)
+        
+    def publish(self, stream_time=None):
+        """Veröffentlicht die aktuellen Werte als konsistenten Snapshot."""
+        return self.state.publish(
+            self.bass_level, self.mid_level, self.treble_level, self.overall_level,
+            self.beat_detected, getattr(self, 'bpm', 0.0), stream_time,
+            None if self.band_levels is None else self.band_levels.copy()
+        )
+        
+    def analyze_chunk(self, audio_data):
+        """Analysiert einen Audio-Chunk."""
+        if len(audio_data) < 512:
+            return
+        
+        try:
+            # Konvertiere zu numpy array
+            if isinstance(audio_data, bytes):
+                audio_array = np.frombuffer(audio_data, dtype=np.int16).astype(np.float32)
+            else:
+                audio_array = np.array(audio_data, dtype=np.float32)
+            
+            # FFT für Frequenzanalyse
+            fft = np.abs(np.fft.rfft(audio_array))
+            freqs = np.fft.rfftfreq(len(audio_array), 1.0 / self.sample_rate)
+            
+            # Frequenzbänder definieren
+            bass_mask = freqs < 200  # Bass: 0-200 Hz
+            mid_mask = (freqs >= 200) & (freqs < 2000)  # Mid: 200-2000 Hz
+            treble_mask = freqs >= 2000  # Treble: 2000+ Hz
+            
+            # Durchschnittliche Energie pro Band
+            self.bass_level = np.mean(fft[bass_mask]) if np.any(bass_mask) else 0
+            self.mid_level = np.mean(fft[mid_mask]) if np.any(mid_mask) else 0
+            self.treble_level = np.mean(fft[treble_mask]) if np.any(treble_mask) else 0
+            
+            # Normalisiere auf 0-1
+            max_val = max(self.bass_level, self.mid_level, self.treble_level, 1)
+            self.bass_level = min(1.0, self.bass_level / max_val)
+            self.mid_level = min(1.0, self.mid_level / max_val)
+            self.treble_level = min(1.0, self.treble_level / max_val)
+            
+            # Overall Level (RMS)
+            self.overall_level = np.sqrt(np.mean(audio_array**2)) / 32768.0
+            self.overall_level = min(1.0, self.overall_level * 3)
+            
+            # Beat Detection (einfache Methode: Bass-Spitzen)
+            self.beat_history.append(self.bass_level)
+            if len(self.beat_history) > 10:
+                self.beat_history.pop(0)
+            
+            avg_bass = np.mean(self.beat_history)
+            self.beat_detected = self.bass_level > (avg_bass * self.beat_threshold)
+            self.publish()
+            
+        except Exception as e:
+            print(f"Audio analysis error: {e}")
+    
+    def simulate_analysis(self, t=None):
+        """
+        Simuliert Audio-Analyse wenn keine echten Daten verfügbar.
+        `t`: Zeit in Sekunden (z.B. seit Songstart); ohne Angabe die Uhrzeit.
+        """
+        # Zeitbasierte Simulation mit pseudo-realistischen Werten
+        if t is None:
+            t = time.time()
+        
+        # Simuliere Beat (120-140 BPM)
+        beat_freq = 2.2  # ~132 BPM
+        beat_phase = (t * beat_freq) % 1.0
+        
+        if beat_phase < 0.1:
+            self.bass_level = 0.9 + self.rng.uniform(0, 0.1)
+            self.beat_detected = True
+        elif beat_phase < 0.3:
+            self.bass_level = 0.9 - (beat_phase - 0.1) * 4
+            self.beat_detected = False
+        else:
+            self.bass_level = self.rng.uniform(0.2, 0.4)
+            self.beat_detected = False
+        
+        # Mid und Treble variieren zufällig aber plausibel
+        self.mid_level = self.rng.uniform(0.3, 0.6) + self.bass_level * 0.2
+        self.treble_level = self.rng.uniform(0.2, 0.5) + self.mid_level * 0.1
+        
+        self.overall_level = (self.bass_level + self.mid_level + self.treble_level) / 3
+        self.publish()
+
+class StreamingAnalyzer(AudioAnalyzer):
+    """
+    Vektorisierte Variante von AudioAnalyzer.
+    Wird einmal pro (Chunk-Größe, Sample-Rate) eingerichtet: Band-Grenzen,
+    Filterbank, Puffer und Beat-Historie werden wiederverwendet statt pro Chunk
+    neu gebaut. Zusätzlich zu bass/mid/treble liefert `band_levels` `bands`
+    log-verteilte, geglättete Spektrum-Bänder (0 = aus).
+    """
+    BASS_LIMIT = 200     # Hz
+    MID_LIMIT = 2000     # Hz
+    HISTORY_SIZE = 10
+
+    def __init__(self, chunk_size=1024, sample_rate=44100, window=None, bands=DEFAULT_BANDS):
+        super().__init__()
+        self.window_type = window
+        self.bands = bands
+        self.beat_tracker = None
+        self.bpm = 0.0
+        self.band_frames = None
+        self.configure(chunk_size, sample_rate)
+
+    def attach_beat_tracker(self, tracker):
+        """Ersetzt die Bass-Schwellwert-Erkennung durch Onsets eines BeatTracker."""
+        self.beat_tracker = tracker
+
+    def configure(self, chunk_size, sample_rate):
+        """Berechnet Band-Bins und Puffer für eine Chunk-Größe / Sample-Rate vor."""
+        self.chunk_size = int(chunk_size)
+        self.sample_rate = sample_rate
+
+        freqs = np.fft.rfftfreq(self.chunk_size, 1.0 / sample_rate)
+        self.bass_end = int(np.searchsorted(freqs, self.BASS_LIMIT, 'left'))
+        self.mid_end = int(np.searchsorted(freqs, self.MID_LIMIT, 'left'))
+
+        # Eine Matrix für alles: Log-Filterbank + Mittelwert-Zeilen für bass/mid/treble.
+        # Pro Frame genügt damit ein Matrix-Produkt statt drei Slice-Mittelwerten.
+        bins = len(freqs)
+        means = np.zeros((3, bins), dtype=np.float64)
+        for row, (start, end) in enumerate(((0, self.bass_end), (self.bass_end, self.mid_end),
+                                            (self.mid_end, bins))):
+            if end > start:
+                means[row, start:end] = 1.0 / (end - start)
+        if self.bands:
+            self.band_matrix = np.vstack((log_filterbank(self.chunk_size, sample_rate, self.bands), means))
+            # Frame-Rate bei Hop = Chunk / 2
+            self.smoother = BandSmoother(self.bands, sample_rate / max(1, self.chunk_size // 2))
+        else:
+            self.band_matrix = means
+            self.smoother = None
+        self.band_levels = None
+
+        # Wiederverwendete Puffer
+        self.frame_buf = np.zeros(self.chunk_size, dtype=np.float32)
+        self.window = np.hanning(self.chunk_size).astype(np.float32) if self.window_type == 'hann' else None
+
+        # Beat-Historie als Ringpuffer
+        self.history = np.zeros(self.HISTORY_SIZE, dtype=np.float64)
+        self.history_pos = 0
+        self.history_count = 0
+
+    def analyze_frames(self, frames, times=None):
+        """
+        Analysiert mehrere Frames auf einmal (2-D Array, eine Zeile pro Frame).
+        Gibt ein (n, 5)-Array mit bass, mid, treble, overall, beat zurück und
+        setzt die Attribute auf die Werte des letzten Frames. Die Spektrum-Bänder
+        aller Frames liegen danach in `band_frames` (n, bands).
+        `times` (Stream-Zeit pro Frame) wird nur mit BeatTracker gebraucht.
+        """
+        frames = np.asarray(frames, dtype=np.float32)
+        if frames.ndim == 1:
+            frames = frames[np.newaxis, :]
+        if frames.shape[1] != self.chunk_size:
+            self.configure(frames.shape[1], self.sample_rate)
+
+        windowed = frames * self.window if self.window is not None else frames
+        spectrum = np.abs(np.fft.rfft(windowed, axis=1))
+
+        energies = spectrum @ self.band_matrix.T
+        bass, mid, treble = energies[:, -3], energies[:, -2], energies[:, -1]
+
+        # Normalisiere auf 0-1 (pro Frame)
+        max_val = np.maximum(np.maximum(bass, mid), np.maximum(treble, 1.0))
+        result = np.empty((len(frames), 5), dtype=np.float32)
+        np.minimum(bass / max_val, 1.0, out=result[:, 0])
+        np.minimum(mid / max_val, 1.0, out=result[:, 1])
+        np.minimum(treble / max_val, 1.0, out=result[:, 2])
+
+        # Overall Level (RMS)
+        rms = np.sqrt(np.einsum('ij,ij->i', frames, frames) / self.chunk_size) / 32768.0
+        np.minimum(rms * 3, 1.0, out=result[:, 3])
+
+        # Beat Detection: gleitender Mittelwert über die letzten HISTORY_SIZE Bass-Werte
+        beats = self._detect_beats(result[:, 0].astype(np.float64))
+        if self.beat_tracker is not None:
+            if times is None:
+                times = np.full(len(frames), time.perf_counter())
+            beats = self.beat_tracker.process_batch(spectrum, times)
+            self.bpm = self.beat_tracker.bpm
+        result[:, 4] = beats
+
+        if self.smoother is not None:
+            self.band_frames = self.smoother.update_batch(energies[:, :-3])
+            self.band_levels = self.smoother.levels
+
+        self.bass_level, self.mid_level, self.treble_level, self.overall_level = (
+            float(v) for v in result[-1, :4]
+        )
+        self.beat_detected = bool(result[-1, 4])
+        self.publish(float(times[-1]) if times is not None else None)
+        return result
+
+    def _detect_beats(self, bass):
+        size = self.HISTORY_SIZE
+        k = self.history_count
+        # Historie in zeitlicher Reihenfolge + neue Werte
+        order = (self.history_pos - k + np.arange(k)) % size
+        ext = np.concatenate((self.history[order], bass))
+
+        csum = np.concatenate(([0.0], np.cumsum(ext)))
+        idx = np.arange(k, len(ext))
+        start = np.maximum(0, idx - size + 1)
+        avg = (csum[idx + 1] - csum[start]) / (idx + 1 - start)
+        beats = bass > avg * self.beat_threshold
+
+        # Ringpuffer aktualisieren
+        tail = ext[-size:]
+        self.history[:len(tail)] = tail
+        self.history_count = len(tail)
+        self.history_pos = len(tail) % size
+        return beats
+
+    def analyze_chunk(self, audio_data, t=None):
+        """
+        Analysiert einen Audio-Chunk (gleiche Ergebnisse wie AudioAnalyzer).
+        `t` ist die Stream-Zeit des Chunks (für den BeatTracker).
+        """
+        if len(audio_data) < 512:
+            return
+
+        try:
+            if isinstance(audio_data, bytes):
+                audio_data = np.frombuffer(audio_data, dtype=np.int16)
+            if len(audio_data) != self.chunk_size:
+                self.configure(len(audio_data), self.sample_rate)
+            buf = self.frame_buf
+            np.copyto(buf, audio_data, casting='unsafe')
+            if self.window is not None:
+                buf *= self.window
+            
+            # Einzel-Frame: Skalar-Pfad, ohne Batch-Overhead
+            spectrum = np.abs(np.fft.rfft(buf))
+            energies = self.band_matrix @ spectrum
+            bass, mid, treble = energies[-3:]
+            
+            max_val = max(bass, mid, treble, 1)
+            self.bass_level = min(1.0, float(bass / max_val))
+            self.mid_level = min(1.0, float(mid / max_val))
+            self.treble_level = min(1.0, float(treble / max_val))
+            
+            if self.smoother is not None:
+                self.band_levels = self.smoother.update(energies[:-3])
+            
+            np.copyto(buf, audio_data, casting='unsafe')
+            rms = math.sqrt(float(np.dot(buf, buf)) / self.chunk_size) / 32768.0
+            self.overall_level = min(1.0, rms * 3)
+            
+            # Beat-Historie (Ringpuffer)
+            self.history[self.history_pos] = self.bass_level
+            self.history_pos = (self.history_pos + 1) % self.HISTORY_SIZE
+            self.history_count = min(self.history_count + 1, self.HISTORY_SIZE)
+            avg_bass = self.history.sum() / self.history_count
+            self.beat_detected = self.bass_level > avg_bass * self.beat_threshold
+            
+            # Onset-Erkennung (Spectral Flux) statt Bass-Schwellwert
+            if self.beat_tracker is not None:
+                self.beat_detected = self.beat_tracker.process(spectrum, t)
+                self.bpm = self.beat_tracker.bpm
+            self.publish(t)
+        except Exception as e:
+            print(f"Audio analysis error: {e}")
@@ -0,0 +1,258 @@
+"""
+Audio-Cache, adressiert über die YouTube-Video-ID.
+Ein JSON-Manifest hält Format, Dauer, Größe, Prüfsumme und letzten Zugriff
+jedes Eintrags; bei Überschreiten des Byte-Limits werden die am längsten
+nicht gespielten Songs (LRU) entfernt. Zugriffe ändern nur den Speicher;
+das Manifest wird bei put/remove/Verdrängung bzw. mit flush() geschrieben.
+"""
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+from urllib.parse import parse_qs, urlparse
+
+from metrics import METRICS
+
+MANIFEST_NAME = 'manifest.json'
+MANIFEST_VERSION = 1
+STAGING_DIR = 'staging'
+
+
+def video_id_from_url(url):
+    """Extrahiert die Video-ID aus einer YouTube-URL (watch?v=, youtu.be/, shorts/)."""
+    parsed = urlparse(url)
+    if parsed.hostname and parsed.hostname.endswith('youtu.be'):
+        return parsed.path.lstrip('/') or None
+    query = parse_qs(parsed.query)
+    if 'v' in query:
+        return query['v'][0]
+    parts = [p for p in parsed.path.split('/') if p]
+    if len(parts) >= 2 and parts[0] in ('shorts', 'embed', 'v'):
+        return parts[1]
+    return None
+
+
+def file_checksum(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(chunk_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class AudioCache:
+    """Größenbegrenzter Audio-Cache mit Manifest und LRU-Verdrängung."""
+    def __init__(self, cache_dir, max_bytes=500 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.manifest_path = os.path.join(cache_dir, MANIFEST_NAME)
+        self.staging_dir = os.path.join(cache_dir, STAGING_DIR)
+        self.lock = threading.RLock()
+        self.pinned = set()
+        self.dirty = False      # last_access geändert, Manifest noch nicht geschrieben
+        os.makedirs(self.staging_dir, exist_ok=True)
+        self.entries = self._load_manifest()
+        self._drop_missing()
+
+    def _load_manifest(self):
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') == MANIFEST_VERSION:
+                return data.get('entries', {})
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"Cache manifest error: {e}")
+        return {}
+
+    def _save_manifest(self):
+        tmp_path = self.manifest_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': MANIFEST_VERSION, 'entries': self.entries}, f, indent=1)
+        os.replace(tmp_path, self.manifest_path)
+        self.dirty = False
+
+    def flush(self):
+        """Schreibt ausstehende Zugriffszeiten (z.B. beim Beenden)."""
+        with self.lock:
+            if self.dirty:
+                self._save_manifest()
+
+    def _drop_missing(self):
+        with self.lock:
+            missing = [vid for vid, entry in self.entries.items()
+                       if not os.path.exists(self.path_of(entry))]
+            for vid in missing:
+                del self.entries[vid]
+            if missing:
+                self._save_manifest()
+
+    def path_of(self, entry):
+        return os.path.join(self.cache_dir, entry['file'])
+
+    @staticmethod
+    def bytes_of(entry):
+        """Audio-Datei plus Nebendateien (Index, PCM, Wiedergabe-Datei)."""
+        return entry['size'] + entry.get('sidecar_bytes', 0)
+
+    @property
+    def total_bytes(self):
+        with self.lock:
+            return sum(self.bytes_of(entry) for entry in self.entries.values())
+
+    def staging_template(self):
+        """yt_dlp-outtmpl für Downloads (erst in den Staging-Ordner, dann atomar rein)."""
+        return os.path.join(self.staging_dir, '%(id)s.%(ext)s')
+
+    def get(self, video_id, verify=False):
+        """Pfad des gecachten Songs oder None. Prüft Größe (und optional Prüfsumme)."""
+        with self.lock:
+            entry = self.entries.get(video_id)
+            if entry is None:
+                METRICS.count('cache.miss')
+                return None
+            path = self.path_of(entry)
+            try:
+                ok = os.path.getsize(path) == entry['size']
+                if ok and verify:
+                    ok = file_checksum(path) == entry['sha256']
+            except OSError:
+                ok = False
+            if not ok:
+                print(f"Cache-Eintrag beschädigt, entferne: {video_id}")
+                self.remove(video_id)
+                METRICS.count('cache.miss')
+                return None
+
+            METRICS.count('cache.hit')
+            # Nur im Speicher: ein Treffer soll keine Manifest-Datei schreiben
+            entry['last_access'] = time.time()
+            self.dirty = True
+            return path
+
+    def put(self, video_id, source_path, info=None):
+        """Übernimmt eine fertig geladene Datei atomar in den Cache."""
+        info = info or {}
+        size = os.path.getsize(source_path)
+        if size <= 1:
+            raise ValueError(f"Leere Audio-Datei: {source_path}")
+
+        ext = os.path.splitext(source_path)[1].lstrip('.') or info.get('ext', 'bin')
+        filename = f"{video_id}.{ext}"
+        checksum = file_checksum(source_path)
+
+        with self.lock:
+            old = self.entries.get(video_id)
+            if old and old['file'] != filename:
+                self._remove_files(old)
+            self._move_into(source_path, os.path.join(self.cache_dir, filename))
+            now = time.time()
+            self.entries[video_id] = {
+                'file': filename,
+                'format': info.get('format_id') or ext,
+                'ext': ext,
+                'title': info.get('title'),
+                'duration': info.get('duration'),
+                'size': size,
+                'sha256': checksum,
+                'created': now,
+                'last_access': now,
+            }
+            self.evict(keep=video_id)
+            self._save_manifest()
+            return os.path.join(self.cache_dir, filename)
+
+    @staticmethod
+    def _move_into(source_path, target_path):
+        """os.replace; unter Windows kopieren, solange die Quelle noch geöffnet ist (Wiedergabe)."""
+        try:
+            os.replace(source_path, target_path)
+        except PermissionError:
+            tmp_path = target_path + '.tmp'
+            shutil.copyfile(source_path, tmp_path)
+            os.replace(tmp_path, target_path)
+            try:
+                os.remove(source_path)
+            except OSError:
+                pass    # bleibt im Staging-Ordner und wird beim nächsten Download überschrieben
+
+    def remove(self, video_id):
+        with self.lock:
+            entry = self.entries.pop(video_id, None)
+            if entry:
+                self._remove_files(entry)
+                self._save_manifest()
+
+    def remove_path(self, path):
+        """Entfernt den Eintrag zu einer Cache-Datei (z.B. wenn sie nicht abspielbar ist)."""
+        with self.lock:
+            name = os.path.basename(path)
+            for vid, entry in list(self.entries.items()):
+                if entry['file'] == name:
+                    self.remove(vid)
+                    return
+        if os.path.exists(path):
+            os.remove(path)
+
+    def update_sidecars(self, path):
+        """Zählt die Nebendateien einer Cache-Datei zum Eintrag (für das Byte-Limit)."""
+        name = os.path.basename(path)
+        with self.lock:
+            for vid, entry in self.entries.items():
+                if entry['file'] != name:
+                    continue
+                size = 0
+                for other in os.listdir(self.cache_dir):
+                    if other.startswith(name + '.'):
+                        try:
+                            size += os.path.getsize(os.path.join(self.cache_dir, other))
+                        except OSError:
+                            pass
+                if entry.get('sidecar_bytes') != size:
+                    entry['sidecar_bytes'] = size
+                    self.evict(keep=vid)
+                    self._save_manifest()
+                return size
+        return 0
+
+    def _remove_files(self, entry):
+        # Audio-Datei + Nebendateien (z.B. Feature-Index "<datei>.xmf")
+        prefix = entry['file']
+        for name in os.listdir(self.cache_dir):
+            if name == prefix or name.startswith(prefix + '.'):
+                try:
+                    os.remove(os.path.join(self.cache_dir, name))
+                except OSError as e:
+                    print(f"Cache remove error: {e}")
+
+    def pin(self, video_id):
+        """Schützt einen Eintrag (z.B. den laufenden Song) vor Verdrängung."""
+        self.pinned.add(video_id)
+
+    def unpin(self, video_id):
+        self.pinned.discard(video_id)
+
+    def evict(self, keep=None):
+        """Entfernt LRU-Einträge, bis das Byte-Limit eingehalten wird."""
+        with self.lock:
+            total = self.total_bytes
+            if total <= self.max_bytes:
+                return []
+            evicted = []
+            candidates = sorted(
+                (vid for vid in self.entries if vid != keep and vid not in self.pinned),
+                key=lambda vid: self.entries[vid]['last_access']
+            )
+            for vid in candidates:
+                if total <= self.max_bytes:
+                    break
+                total -= self.bytes_of(self.entries[vid])
+                self._remove_files(self.entries.pop(vid))
+                evicted.append(vid)
+            if evicted:
+                print(f"Cache: {len(evicted)} Song(s) verdrängt")
+                self._save_manifest()
+            return evicted
@@ -0,0 +1,168 @@
+"""
+PCM-Abgriff für die Echtzeit-Analyse.
+Dekodiert die gecachte Datei (oder den direkten Stream) häppchenweise
+in einen begrenzten Ringpuffer, ohne den ganzen Song im Speicher zu halten.
+"""
+import shutil
+import subprocess
+import threading
+
+import numpy as np
+
+
+def ffmpeg_pcm_command(source, sample_rate):
+    """ffmpeg-Aufruf, der `source` als Mono-s16le nach stdout dekodiert."""
+    return [
+        'ffmpeg', '-nostdin', '-loglevel', 'error',
+        '-i', source,
+        '-f', 's16le', '-acodec', 'pcm_s16le',
+        '-ac', '1', '-ar', str(sample_rate),
+        '-',
+    ]
+
+
+class PCMRingBuffer:
+    """Begrenzter Ringpuffer für Mono-int16-Samples mit absoluten Positionen."""
+    def __init__(self, capacity):
+        self.capacity = int(capacity)
+        self.data = np.zeros(self.capacity, dtype=np.int16)
+        self.write_pos = 0   # Absolute Sample-Position hinter dem letzten Sample
+        self.read_pos = 0    # Alles davor darf überschrieben werden
+        self.closed = False
+        self.cond = threading.Condition()
+
+    def write(self, samples):
+        """Schreibt Samples, blockiert solange der Puffer voll ist."""
+        offset = 0
+        total = len(samples)
+        while offset < total:
+            with self.cond:
+                while not self.closed and self.write_pos - self.read_pos >= self.capacity:
+                    self.cond.wait(0.1)
+                if self.closed:
+                    return False
+
+                free = self.capacity - (self.write_pos - self.read_pos)
+                n = min(free, total - offset)
+                start = self.write_pos % self.capacity
+                first = min(n, self.capacity - start)
+                self.data[start:start + first] = samples[offset:offset + first]
+                if n > first:
+                    self.data[:n - first] = samples[offset + first:offset + n]
+
+                self.write_pos += n
+                offset += n
+                self.cond.notify_all()
+        return True
+
+    def read_window(self, end_pos, size, out=None):
+        """
+        Kopiert die `size` Samples vor `end_pos` nach `out`.
+        Gibt None zurück, wenn das Fenster (noch) nicht im Puffer liegt.
+        """
+        if out is None:
+            out = np.empty(size, dtype=np.int16)
+
+        with self.cond:
+            start_pos = end_pos - size
+            if end_pos > self.write_pos or start_pos < self.write_pos - self.capacity or start_pos < 0:
+                return None
+
+            start = start_pos % self.capacity
+            first = min(size, self.capacity - start)
+            out[:first] = self.data[start:start + first]
+            if size > first:
+                out[first:] = self.data[:size - first]
+
+            # Älteres wird nicht mehr gebraucht -> Platz für den Decoder
+            if start_pos > self.read_pos:
+                self.read_pos = start_pos
+                self.cond.notify_all()
+        return out
+
+    def seek(self, pos):
+        """Verwirft alles vor `pos` (z.B. wenn die Wiedergabe vorausgelaufen ist)."""
+        with self.cond:
+            self.read_pos = max(self.read_pos, min(pos, self.write_pos))
+            self.cond.notify_all()
+
+    def close(self):
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
+
+
+class PCMDecoder:
+    """
+    Streamt PCM-Frames via ffmpeg in einen PCMRingBuffer.
+    Der Decoder läuft nur so weit voraus, wie der Puffer Platz hat.
+    Mit `reader` (Iterator über Bytes, z.B. eine noch wachsende Datei) wird
+    ffmpeg über stdin gefüttert statt `source` selbst zu öffnen.
+    """
+    def __init__(self, source, sample_rate=22050, buffer_seconds=2.0, chunk_samples=2048, reader=None):
+        self.source = source
+        self.reader = reader
+        self.sample_rate = sample_rate
+        self.chunk_samples = chunk_samples
+        self.ring = PCMRingBuffer(int(sample_rate * buffer_seconds))
+        self.process = None
+        self.thread = None
+        self.finished = False
+        self.error = None
+
+    @staticmethod
+    def available():
+        """Prüft ob ein ffmpeg-Binary zum Dekodieren vorhanden ist."""
+        return shutil.which('ffmpeg') is not None
+
+    def start(self):
+        source = 'pipe:0' if self.reader is not None else self.source
+        cmd = ffmpeg_pcm_command(source, self.sample_rate)
+        self.process = subprocess.Popen(
+            cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+            stdin=subprocess.PIPE if self.reader is not None else subprocess.DEVNULL
+        )
+        if self.reader is not None:
+            threading.Thread(target=self._feed_loop, daemon=True).start()
+        self.thread = threading.Thread(target=self._decode_loop, daemon=True)
+        self.thread.start()
+    
+    def _feed_loop(self):
+        try:
+            for block in self.reader:
+                if self.ring.closed:
+                    break
+                self.process.stdin.write(block)
+        except (BrokenPipeError, OSError, ValueError):
+            pass
+        finally:
+            try:
+                self.process.stdin.close()
+            except OSError:
+                pass
+
+    def _decode_loop(self):
+        chunk_bytes = self.chunk_samples * 2
+        try:
+            while True:
+                raw = self.process.stdout.read(chunk_bytes)
+                if not raw:
+                    break
+                if len(raw) % 2:
+                    raw = raw[:-1]
+                if not self.ring.write(np.frombuffer(raw, dtype=np.int16)):
+                    break
+        except Exception as e:
+            self.error = e
+            print(f"PCM decode error: {e}")
+        finally:
+            self.finished = True
+
+    def stop(self):
+        self.ring.close()
+        if self.process and self.process.poll() is None:
+            self.process.kill()
+        if self.thread:
+            self.thread.join(timeout=1.0)
+        if self.process:
+            self.process.wait()
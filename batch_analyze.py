@@ -0,0 +1,178 @@
+"""
+Batch-Analyse eines ganzen Ordners (z.B. des Audio-Caches) auf allen Kernen.
+Schreibt pro Song den Feature-Index (.xmf) und sammelt Tempo/Dauer in
+analysis.json im Ordner. Unveränderte Songs (Größe + mtime, Index aktuell)
+werden übersprungen, damit die komplette Party-Playlist vorab am Desktop
+analysiert werden kann.
+
+Aufruf: python batch_analyze.py [ordner] [--jobs N] [--transcode] [--force]
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+from analysis_state import ANALYSIS_SAMPLE_RATE, ANALYSIS_WINDOW, ANALYSIS_HOP
+from audio_cache import MANIFEST_NAME, STAGING_DIR
+
+# Ein Prozess pro Kern: numpy/BLAS in den Workern nicht zusätzlich parallelisieren
+for _var in ('OMP_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'MKL_NUM_THREADS'):
+    os.environ.setdefault(_var, '1')
+
+RESULTS_NAME = 'analysis.json'
+RESULTS_VERSION = 1
+DEFAULT_CACHE_DIR = os.path.join(tempfile.gettempdir(), 'christmas_disco_cache')
+
+
+def load_results(folder):
+    try:
+        with open(os.path.join(folder, RESULTS_NAME), 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        if data.get('version') == RESULTS_VERSION:
+            return data.get('tracks', {})
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        print(f"Ergebnis-Datei fehlerhaft, wird neu geschrieben: {e}")
+    return {}
+
+
+def save_results(folder, tracks):
+    path = os.path.join(folder, RESULTS_NAME)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({'version': RESULTS_VERSION, 'tracks': tracks}, f, indent=1)
+    os.replace(tmp_path, path)
+
+
+def find_tracks(folder):
+    """
+    (relativer Pfad, stat) aller Audio-Dateien, ohne erzeugte Nebendateien.
+    Im Audio-Cache bleibt staging/ außen vor: dort liegen unvollständige
+    Downloads, deren Index nach dem Übernehmen sowieso veraltet wäre.
+    """
+    from library import iter_audio_files
+    from transcode import is_sidecar
+    staging = None
+    if os.path.exists(os.path.join(folder, MANIFEST_NAME)):
+        staging = STAGING_DIR + os.sep
+    tracks = []
+    for path, st in iter_audio_files(folder):
+        rel = os.path.relpath(path, folder)
+        if not is_sidecar(path) and not (staging and rel.startswith(staging)):
+            tracks.append((rel, st))
+    return tracks
+
+
+def is_unchanged(entry, st, audio_path):
+    from feature_index import FeatureIndex
+    return (entry is not None and entry.get('size') == st.st_size
+            and entry.get('mtime') == st.st_mtime and FeatureIndex.is_fresh(audio_path))
+
+
+def analyze_track(audio_path, transcode_format=None):
+    """Worker: transkodiert optional und baut den Feature-Index. Gibt ein Ergebnis-dict zurück."""
+    from feature_index import build_feature_index
+    started = time.perf_counter()
+    result = {'ok': False}
+    try:
+        if transcode_format:
+            import transcode
+            if transcode.available():
+                transcode.transcode(audio_path, ANALYSIS_SAMPLE_RATE, transcode_format)
+        info = {}
+        if build_feature_index(audio_path, sample_rate=ANALYSIS_SAMPLE_RATE,
+                               window=ANALYSIS_WINDOW, hop=ANALYSIS_HOP, info=info):
+            result.update(info, ok=True)
+        else:
+            result['error'] = 'zu kurz oder nicht dekodierbar'
+    except Exception as e:
+        result['error'] = str(e)[:200]
+    result['seconds'] = time.perf_counter() - started
+    return result
+
+
+def run(folder, jobs=None, transcode_format=None, force=False):
+    """Analysiert alle geänderten Songs in `folder` parallel; gibt die Statistik zurück."""
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+
+    results = load_results(folder)
+    tracks = find_tracks(folder)
+    todo = [(rel, st) for rel, st in tracks
+            if force or not is_unchanged(results.get(rel), st, os.path.join(folder, rel))]
+    # Große Dateien zuerst: gleichmäßigere Auslastung am Ende
+    todo.sort(key=lambda item: -item[1].st_size)
+
+    # Einträge verschwundener Dateien entfernen
+    present = {rel for rel, _ in tracks}
+    for rel in [rel for rel in results if rel not in present]:
+        del results[rel]
+
+    stats = {'tracks': len(tracks), 'skipped': len(tracks) - len(todo), 'analyzed': 0,
+             'failed': 0, 'audio_seconds': 0.0, 'cpu_seconds': 0.0, 'bytes': 0, 'wall_seconds': 0.0}
+    if not todo:
+        save_results(folder, results)
+        return stats
+
+    jobs = jobs or os.cpu_count() or 1
+    print(f"Analysiere {len(todo)} von {len(tracks)} Songs mit {jobs} Prozessen...")
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        futures = {pool.submit(analyze_track, os.path.join(folder, rel), transcode_format): (rel, st)
+                   for rel, st in todo}
+        for done, future in enumerate(as_completed(futures), 1):
+            rel, st = futures[future]
+            result = future.result()
+            stats['cpu_seconds'] += result['seconds']
+            if not result.pop('ok'):
+                stats['failed'] += 1
+                print(f"  [{done}/{len(todo)}] ❌ {rel}: {result.get('error')}")
+                continue
+            result.update(size=st.st_size, mtime=st.st_mtime, analyzed_at=time.time())
+            results[rel] = result
+            stats['analyzed'] += 1
+            stats['audio_seconds'] += result['duration']
+            stats['bytes'] += st.st_size
+            print(f"  [{done}/{len(todo)}] {rel}: {result['bpm']:.1f} BPM "
+                  f"(Sicherheit {result['confidence']:.2f}), {result['duration']:.0f}s in {result['seconds']:.1f}s")
+            # Zwischenstand sichern: ein Abbruch verliert keine fertigen Songs
+            if done % 20 == 0:
+                save_results(folder, results)
+    stats['wall_seconds'] = time.perf_counter() - started
+    save_results(folder, results)
+    return stats
+
+
+def report(stats):
+    wall = stats['wall_seconds']
+    print(f"Songs: {stats['tracks']} gesamt, {stats['analyzed']} analysiert, "
+          f"{stats['skipped']} übersprungen (unverändert), {stats['failed']} fehlgeschlagen")
+    if wall > 0 and stats['analyzed']:
+        print(f"Zeit: {wall:.1f}s Wand, {stats['cpu_seconds']:.1f}s Worker "
+              f"(Worker/Wand {stats['cpu_seconds'] / wall:.1f}x)")
+        print(f"Durchsatz: {stats['analyzed'] / wall:.2f} Songs/s, "
+              f"{stats['audio_seconds'] / wall:.0f}x Echtzeit, "
+              f"{stats['bytes'] / wall / 1e6:.1f} MB/s")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Analysiert alle Songs eines Ordners parallel.')
+    parser.add_argument('folder', nargs='?', default=DEFAULT_CACHE_DIR,
+                        help='Ordner mit Audio-Dateien (Standard: App-Cache)')
+    parser.add_argument('--jobs', '-j', type=int, default=None, help='Prozesse (Standard: alle Kerne)')
+    parser.add_argument('--transcode', choices=('wav', 'ogg'), default=None,
+                        help='Vorher transkodieren (Analyse-PCM + Wiedergabe-Datei)')
+    parser.add_argument('--force', action='store_true', help='Auch unveränderte Songs neu analysieren')
+    args = parser.parse_args(argv)
+
+    if not os.path.isdir(args.folder):
+        print(f"❌ Ordner nicht gefunden: {args.folder}")
+        return 1
+    report(run(args.folder, args.jobs, args.transcode, args.force))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
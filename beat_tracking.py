@@ -0,0 +1,221 @@
+"""
+Onset- und Tempo-Erkennung.
+Spectral Flux als Onset-Funktion, BPM per Autokorrelation über ein
+gleitendes Fenster und eine Beat-Phasen-Vorhersage, damit der Visualizer
+Effekte schon kurz vor dem Beat starten kann.
+
+Tempo: die Onset-Hüllkurve wird geglättet und vom lokalen Mittel befreit,
+dann bekommt jedes Kandidaten-Tempo (feines BPM-Raster, gebrochene Lags)
+die Summe der Autokorrelation bei 1-4 Perioden (Kamm) plus etwas halbe
+Periode. Halbe Tempi treffen weniger und spätere Spitzen, 3:2-Raster
+(Achtel-Hi-Hats) weder die Kicks noch die Achtel dazwischen.
+Ist ein 3:2-Nachbar fast so gut oder springt das Tempo noch, bleibt die
+Sicherheit niedrig, damit der Visualizer nicht auf ein falsches Raster einrastet.
+"""
+import math
+import time
+
+import numpy as np
+
+TEMPO_HARMONICS = 4
+SUBDIVISION_WEIGHT = 0.25
+
+
+class BeatTracker:
+    """Verarbeitet pro Analyse-Frame ein Betragsspektrum."""
+    def __init__(self, frame_rate, history_seconds=8.0, min_bpm=60, max_bpm=180,
+                 sensitivity=1.5, tempo_interval=0.5):
+        self.frame_rate = frame_rate
+        self.min_bpm = min_bpm
+        self.max_bpm = max_bpm
+        self.sensitivity = sensitivity
+
+        # Onset-Hüllkurve als Ringpuffer
+        self.size = int(history_seconds * frame_rate)
+        self.envelope = np.zeros(self.size, dtype=np.float64)
+        self.frames = 0
+        self.prev_spectrum = None
+        self.log_spectrum = None
+
+        self.threshold_frames = max(4, int(1.0 * frame_rate))
+        self.min_gap = max(1, int(0.1 * frame_rate))
+        self.last_onset = -self.min_gap
+        self.onset = False
+
+        self.tempo_every = max(1, int(tempo_interval * frame_rate))
+        # Hüllkurve: ~70 ms glätten (Hann ohne Null-Ränder), Mittel über ~0.5 s abziehen
+        self.smooth_kernel = np.hanning(max(3, int(0.07 * frame_rate)) + 2)[1:-1]
+        self.smooth_kernel /= self.smooth_kernel.sum()
+        self.mean_kernel = np.full(max(3, int(0.5 * frame_rate)) | 1, 1.0)
+        self.mean_kernel /= self.mean_kernel.sum()
+        # Kandidaten-Tempi im 0.25-BPM-Raster; die Vorliebe für ~120 BPM entscheidet
+        # zwischen Oktaven (70 oder 140 mit Achtel-Hi-Hats ist mehrdeutig)
+        self.candidate_bpms = np.arange(min_bpm, max_bpm + 0.125, 0.25)
+        self.candidate_lags = 60.0 * frame_rate / self.candidate_bpms
+        self.prior = np.exp(-0.5 * (np.log2(self.candidate_bpms / 120.0) / 1.5) ** 2)
+        self.raw_bpm = 0.0
+        self.bpm = 0.0
+        self.period = 0.0          # Sekunden pro Beat
+        self.confidence = 0.0
+        self.last_beat_time = None  # Stream-Zeit eines Beats (Phasen-Referenz)
+        self.clock_offset = 0.0     # perf_counter() - Stream-Zeit
+        # Liste statt None: jede Schätzung als (t, bpm, confidence, last_beat_time)
+        # (Tempo-Spur für den Feature-Index)
+        self.tempo_track = None
+
+    def process(self, spectrum, t=None):
+        """Ein Frame: gibt True zurück, wenn ein Onset erkannt wurde."""
+        if t is None:
+            t = time.perf_counter()
+        self.clock_offset = time.perf_counter() - t
+
+        if self.log_spectrum is None or len(self.log_spectrum) != len(spectrum):
+            self.log_spectrum = np.zeros(len(spectrum), dtype=np.float64)
+            self.prev_spectrum = np.zeros(len(spectrum), dtype=np.float64)
+
+        # Spectral Flux auf log-komprimiertem Betrag (nur Zunahmen)
+        np.log1p(spectrum, out=self.log_spectrum)
+        diff = self.log_spectrum - self.prev_spectrum
+        flux = float(diff[diff > 0].sum())
+        self.prev_spectrum, self.log_spectrum = self.log_spectrum, self.prev_spectrum
+
+        pos = self.frames % self.size
+        self.envelope[pos] = flux
+        self.frames += 1
+
+        self.onset = self._detect_onset(flux)
+
+        if self.frames % self.tempo_every == 0 and self.frames >= self.size // 2:
+            self._estimate_tempo()
+            self._estimate_phase(t)
+            if self.tempo_track is not None and self.locked:
+                self.tempo_track.append((t, self.bpm, self.confidence, self.last_beat_time))
+        return self.onset
+
+    def process_batch(self, spectra, times):
+        """Mehrere Frames (Zeilen von `spectra`); gibt ein bool-Array der Onsets zurück."""
+        onsets = np.zeros(len(spectra), dtype=bool)
+        for i, spectrum in enumerate(spectra):
+            onsets[i] = self.process(spectrum, times[i])
+        return onsets
+
+    def _recent(self, count):
+        count = min(count, self.frames, self.size)
+        end = self.frames % self.size
+        idx = (end - count + np.arange(count)) % self.size
+        return self.envelope[idx]
+
+    def _detect_onset(self, flux):
+        recent = self._recent(self.threshold_frames)
+        if len(recent) < 4:
+            return False
+        threshold = recent.mean() + self.sensitivity * recent.std()
+        frame = self.frames - 1
+        if flux > threshold and flux > 0 and frame - self.last_onset >= self.min_gap:
+            self.last_onset = frame
+            return True
+        return False
+
+    def _onset_curve(self, env):
+        """Geglättete, halbwellen-gleichgerichtete Hüllkurve ohne lokales Mittel."""
+        smoothed = np.convolve(env, self.smooth_kernel, mode='same')
+        return np.maximum(smoothed - np.convolve(smoothed, self.mean_kernel, mode='same'), 0.0)
+
+    def _comb_scores(self, acf, lags, harmonics=TEMPO_HARMONICS):
+        """Summe der (normierten) Autokorrelation bei 1..harmonics Perioden je Lag."""
+        n = len(acf)
+        positions = np.arange(n)
+        scores = np.zeros(len(lags))
+        for k in range(1, harmonics + 1):
+            multiple = lags * k
+            scores += np.where(multiple < n - 1, np.interp(multiple, positions, acf), 0.0)
+        # Halbe Periode (Achtel) stützt das richtige Raster gegen 3:2-Nachbarn
+        scores += SUBDIVISION_WEIGHT * np.interp(lags / 2, positions, acf)
+        return scores
+
+    def _estimate_tempo(self):
+        env = self._recent(self.size)
+        n = len(env)
+        if n < 8 or not env.any():
+            return
+        onset = self._onset_curve(env)
+        if not onset.any():
+            return
+
+        # Autokorrelation per FFT, normiert auf Lag 0
+        spec = np.fft.rfft(onset, 2 * n)
+        acf = np.fft.irfft(spec * np.conj(spec))[:n]
+        if acf[0] <= 0:
+            return
+        acf = acf / acf[0]
+
+        lags = self.candidate_lags
+        valid = lags < n - 2
+        if not valid.any():
+            return
+        comb = self._comb_scores(acf, lags) * valid
+        scores = comb * self.prior
+        best = int(np.argmax(scores))
+        bpm = float(self.candidate_bpms[best])
+
+        # 3:2-Nachbarn (Raster aus Achteln/Triolen): zu knapp = unsicher
+        rivals = [float(self._comb_scores(acf, np.array([lags[best] * ratio]))[0])
+                  for ratio in (1.5, 2.0 / 3.0)
+                  if self.min_bpm <= bpm / ratio <= self.max_bpm]
+        clarity = 1.0
+        if rivals and comb[best] > 0:
+            clarity = max(0.0, min(1.0, (1.0 - max(rivals) / comb[best]) * 4.0))
+        strength = float(np.interp(lags[best], np.arange(n), acf))
+        confidence = max(0.0, min(1.0, strength)) * clarity
+
+        # Erst ein bestätigtes Tempo (zweimal in Folge gleich) darf einrasten
+        if self.raw_bpm <= 0 or abs(bpm - self.raw_bpm) > 0.02 * bpm:
+            confidence *= 0.5
+        self.raw_bpm = bpm
+
+        self.period = 60.0 / bpm
+        self.bpm = bpm
+        self.confidence = confidence
+
+    def _estimate_phase(self, t):
+        if self.period <= 0:
+            return
+        period_frames = self.period * self.frame_rate
+        beats = 4
+        count = int(period_frames * beats) + 1
+        env = self._recent(count)
+        if len(env) < count:
+            return
+
+        # Kamm-Filter: welcher Versatz trifft die meisten Onsets?
+        last = len(env) - 1
+        offsets = np.arange(int(period_frames))
+        positions = last - offsets[:, np.newaxis] - np.round(
+            np.arange(beats) * period_frames).astype(int)[np.newaxis, :]
+        scores = env[np.clip(positions, 0, last)].sum(axis=1)
+        offset = int(offsets[int(np.argmax(scores))])
+        self.last_beat_time = t - offset / self.frame_rate
+
+    @property
+    def locked(self):
+        return self.period > 0 and self.last_beat_time is not None
+
+    def next_beat_time(self, t):
+        """Stream-Zeit des nächsten Beats nach `t` (None ohne Tempo)."""
+        if not self.locked:
+            return None
+        n = math.floor((t - self.last_beat_time) / self.period) + 1
+        return self.last_beat_time + n * self.period
+
+    def next_beat_clock(self, now=None):
+        """Nächster Beat als perf_counter()-Zeitpunkt (für den Render-Loop)."""
+        now = time.perf_counter() if now is None else now
+        t = now - self.clock_offset
+        nxt = self.next_beat_time(t)
+        return None if nxt is None else nxt + self.clock_offset
+
+    def phase(self, t):
+        """Beat-Phase 0..1 zur Stream-Zeit `t` (0 = auf dem Beat)."""
+        if not self.locked:
+            return 0.0
+        return ((t - self.last_beat_time) / self.period) % 1.0
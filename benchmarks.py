@@ -0,0 +1,528 @@
+"""
+Performance-Benchmarks für den Christmas Disco Visualizer.
+Aufruf: python benchmarks.py [--out results.json] [--baseline alt.json] [--threshold 0.25]
+
+Alle Messungen laufen offline mit synthetischen Daten: Analyse über
+Chunk-Größen, Partikel-/Schnee-Update über wachsende Mengen, Cache-Lookup und
+-Verdrängung sowie Download und yt_dlp-Fallback gegen einen lokalen HTTP-Server
+und ein Ersatzmodul für yt_dlp. Der progressive Download wird zusätzlich gegen
+einen gedrosselten Server geprüft (Lesen während des Ladens, Übernahme in den
+Cache bei offenem Leser, Bytes müssen identisch sein). Mit --baseline schlägt der Lauf fehl (Exit 1),
+wenn eine Messung um mehr als --threshold schlechter ist.
+"""
+import argparse
+import functools
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import types
+from contextlib import contextmanager
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+from audio_analysis import AudioAnalyzer, StreamingAnalyzer
+
+CHUNK_SIZES = (512, 1024, 2048, 4096)
+PARTICLE_COUNTS = (256, 1024, 2048, 4096)
+SNOW_COUNTS = (20, 50, 120, 250, 1000)
+REGRESSION_THRESHOLD = 0.25
+
+
+def synthetic_signal(seconds=10, sample_rate=22050, seed=0):
+    """Bass-Kicks + Mitten + Rauschen als int16 (reproduzierbar)."""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    kicks = (np.sin(2 * np.pi * 2.2 * t) > 0.7) * np.sin(2 * np.pi * 60 * t)
+    signal = 9000 * kicks + 3000 * np.sin(2 * np.pi * 880 * t) + 800 * rng.standard_normal(len(t))
+    return signal.astype(np.int16)
+
+
+def frames_of(signal, chunk_size, hop):
+    count = (len(signal) - chunk_size) // hop + 1
+    return np.lib.stride_tricks.as_strided(
+        signal, shape=(count, chunk_size), strides=(signal.strides[0] * hop, signal.strides[0])
+    )
+
+
+def measure(func, repeat=3):
+    """Bestes von `repeat` Läufen in Sekunden."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def result(name, value, unit, higher_is_better):
+    return {'name': name, 'value': value, 'unit': unit, 'higher_is_better': higher_is_better}
+
+
+def bench_analyzer(chunk_size=1024, sample_rate=22050, seconds=10):
+    """Frames/Sek: AudioAnalyzer vs. StreamingAnalyzer (einzeln und als Batch)."""
+    frames = frames_of(synthetic_signal(seconds, sample_rate), chunk_size, chunk_size // 2)
+
+    def run_legacy():
+        analyzer = AudioAnalyzer()
+        analyzer.sample_rate = sample_rate
+        for frame in frames:
+            analyzer.analyze_chunk(frame)
+
+    def run_streaming():
+        analyzer = StreamingAnalyzer(chunk_size, sample_rate)
+        for frame in frames:
+            analyzer.analyze_chunk(frame)
+
+    def run_batch():
+        analyzer = StreamingAnalyzer(chunk_size, sample_rate)
+        for start in range(0, len(frames), 256):
+            analyzer.analyze_frames(frames[start:start + 256])
+
+    results = {}
+    for name, func in (('legacy', run_legacy), ('streaming', run_streaming), ('batch', run_batch)):
+        results[name] = len(frames) / measure(func)
+    return results
+
+
+def bench_particles(particles, snowflakes, frames=300, width=720, height=1280):
+    """ms pro Frame für Partikel + Schnee: step, Größen und Mesh-Daten aller Gruppen."""
+    from particles import ParticleField, SnowField
+
+    def run():
+        field = ParticleField(capacity=max(particles, 1), seed=0)
+        snow = SnowField(snowflakes, width, height, capacity=max(snowflakes, 1), seed=0)
+        for i in range(frames):
+            field.spawn_burst(width / 2, height / 2, max(8, particles // 30))
+            field.step(1 / 30)
+            snow.step(0.5, 0.5, width, height, 1.0)
+            for sprites, groups in ((field, field.groups), (snow, len(SnowField.ALPHA_GROUPS))):
+                sprites.update_sizes()
+                for group in range(groups):
+                    sprites.group_mesh(group)
+
+    return measure(run) / frames * 1000
+
+
+def bench_visualizer(frames=300, renderer='canvas'):
+    """
+    ms pro DiscoVisualizer.update() je Qualitätsstufe (inkl. Kivy-Instruktionen).
+    Braucht Kivy und einen GL-Kontext; sonst leer. Mit renderer='shader' nur,
+    wenn der Shader kompiliert (sonst wäre es die Canvas-Messung noch einmal).
+    """
+    os.environ.setdefault('KIVY_NO_ARGS', '1')
+    try:
+        from Merry_Xmas import DiscoVisualizer
+        from frame_scheduler import QUALITY_TIERS
+    except ImportError as e:
+        print(f"Visualizer-Benchmark übersprungen: {e}")
+        return {}
+
+    results = {}
+    for tier in QUALITY_TIERS:
+        analyzer = AudioAnalyzer()
+        visualizer = DiscoVisualizer(size_hint=(None, None), size=(720, 1280))
+        visualizer.analyzer = analyzer
+        visualizer.render_delay = 0
+        visualizer.create_effects(seed=0, renderer=renderer)
+        if visualizer.renderer != renderer:
+            print(f"Visualizer-Benchmark ({renderer}) übersprungen: Shader nicht verfügbar")
+            return {}
+        visualizer.apply_quality(tier)
+        visualizer.compositor.budget = None
+
+        def run():
+            for i in range(frames):
+                analyzer.beat_detected = i % 15 == 0
+                analyzer.bass_level = analyzer.overall_level = (i % 30) / 30
+                analyzer.publish()
+                visualizer.update(1 / 30)
+
+        results[tier['name']] = measure(run) / frames * 1000
+    return results
+
+
+def fill_cache(cache, count, size, prefix='vid'):
+    for i in range(count):
+        path = os.path.join(cache.staging_dir, f'{prefix}{i}.m4a')
+        with open(path, 'wb') as f:
+            f.write(os.urandom(size))
+        cache.put(f'{prefix}{i}', path, {'ext': 'm4a'})
+
+
+def bench_cache(entries=200, size=32 * 1024, lookups=500):
+    """µs pro Lookup (Treffer, Fehlschlag, mit Prüfsumme) und ms pro Verdrängung."""
+    from audio_cache import AudioCache
+
+    results = {}
+    cache_dir = tempfile.mkdtemp(prefix='xmas_bench_cache_')
+    try:
+        cache = AudioCache(cache_dir, max_bytes=entries * size * 2)
+        fill_cache(cache, entries, size)
+
+        ids = [f'vid{i % entries}' for i in range(lookups)]
+        results['cache.get_hit_us'] = measure(lambda: [cache.get(v) for v in ids]) / lookups * 1e6
+        results['cache.get_miss_us'] = measure(lambda: [cache.get('missing') for _ in ids]) / lookups * 1e6
+        verify_ids = ids[:200]
+        results['cache.get_verify_us'] = measure(
+            lambda: [cache.get(v, verify=True) for v in verify_ids]) / len(verify_ids) * 1e6
+
+        # Verdrängung: Limit halbieren, dann wieder auffüllen
+        def run_evict():
+            cache.max_bytes = entries * size // 2
+            cache.evict()
+            cache.max_bytes = entries * size * 2
+            fill_cache(cache, entries, size)
+
+        start = time.perf_counter()
+        cache.max_bytes = entries * size // 2
+        cache.evict()
+        results['cache.evict_ms'] = (time.perf_counter() - start) * 1000
+        cache.max_bytes = entries * size * 2
+        fill_cache(cache, entries, size)
+        results['cache.evict_refill_ms'] = measure(run_evict, repeat=2) * 1000
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+    return results
+
+
+class QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+class ThrottledHandler(QuietHandler):
+    """Liefert Dateien mit höchstens `server.rate` Bytes/s (langsames Netz)."""
+    CHUNK = 16 * 1024
+
+    def copyfile(self, source, outputfile):
+        rate = getattr(self.server, 'rate', None)
+        for block in iter(lambda: source.read(self.CHUNK), b''):
+            outputfile.write(block)
+            if rate:
+                time.sleep(len(block) / rate)
+
+
+@contextmanager
+def local_server(directory, handler_class=QuietHandler, rate=None):
+    """Statischer HTTP-Server auf 127.0.0.1 (freier Port), optional gedrosselt."""
+    handler = functools.partial(handler_class, directory=directory)
+    server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    server.rate = rate
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f'http://127.0.0.1:{server.server_address[1]}'
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def make_fake_yt_dlp(base_url, payload_dir):
+    """
+    Ersatz für yt_dlp: extract_info liefert eine Stream-URL auf den lokalen
+    Server, download=True kopiert die Datei nach outtmpl.
+    """
+    module = types.ModuleType('yt_dlp')
+    module.extractions = 0
+
+    class YoutubeDL:
+        def __init__(self, options=None):
+            self.options = options or {}
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *args):
+            self.close()
+
+        def close(self):
+            pass
+
+        def extract_info(self, url, download=False):
+            module.extractions += 1
+            video_id = url.rsplit('=', 1)[-1]
+            info = {
+                'id': video_id,
+                'title': f'Fake {video_id}',
+                'duration': 180,
+                'ext': 'm4a',
+                'format_id': '140',
+                'url': f'{base_url}/{video_id}.m4a?expire={int(time.time()) + 6 * 3600}',
+                'filesize': os.path.getsize(os.path.join(payload_dir, f'{video_id}.m4a')),
+            }
+            if download:
+                target = self.prepare_filename(info)
+                shutil.copyfile(os.path.join(payload_dir, f'{video_id}.m4a'), target)
+                for hook in self.options.get('progress_hooks', []):
+                    hook({'status': 'downloading', 'downloaded_bytes': info['filesize'],
+                          'total_bytes': info['filesize']})
+            return info
+
+        def prepare_filename(self, info):
+            return self.options.get('outtmpl', '%(id)s.%(ext)s') % info
+
+    module.YoutubeDL = YoutubeDL
+    return module
+
+
+@contextmanager
+def fake_yt_dlp(module):
+    previous = sys.modules.get('yt_dlp')
+    sys.modules['yt_dlp'] = module
+    try:
+        yield module
+    finally:
+        if previous is None:
+            sys.modules.pop('yt_dlp', None)
+        else:
+            sys.modules['yt_dlp'] = previous
+
+
+def bench_progressive(size=4 * 1024 * 1024, rate=16 * 1024 * 1024):
+    """
+    Progressiver Download gegen einen gedrosselten lokalen Server: Zeit bis zum
+    Anfangspuffer, Durchsatz und Übernahme in den Cache, während ein (langsamerer)
+    Leser die Datei noch liest. Der Leser muss exakt die Server-Bytes erhalten.
+    """
+    from audio_cache import AudioCache
+    from progressive import ProgressiveDownload
+
+    results = {}
+    work_dir = tempfile.mkdtemp(prefix='xmas_bench_prog_')
+    payload_dir = os.path.join(work_dir, 'payload')
+    os.makedirs(payload_dir)
+    payload = os.urandom(size)
+    with open(os.path.join(payload_dir, 'song.m4a'), 'wb') as f:
+        f.write(payload)
+
+    try:
+        with local_server(payload_dir, ThrottledHandler, rate) as base_url:
+            cache = AudioCache(os.path.join(work_dir, 'cache'), max_bytes=size * 4)
+            path = os.path.join(cache.staging_dir, 'song.m4a')
+            download = ProgressiveDownload(f'{base_url}/song.m4a', path).start()
+
+            received = []
+
+            def read():
+                # Leser halb so schnell wie der Server: liest nach der Übernahme weiter
+                for block in download.reader():
+                    received.append(block)
+                    time.sleep(len(block) / (rate / 2))
+
+            reader = threading.Thread(target=read, daemon=True)
+            reader.start()
+            download.complete.wait()
+            complete = time.time() - download.started_at
+            if not download.ok:
+                raise RuntimeError(f"Progressiver Download fehlgeschlagen: {download.error}")
+
+            start = time.perf_counter()
+            cached = download.promote(lambda staged: cache.put('song', staged, {'ext': 'm4a'}))
+            results['promote_ms'] = (time.perf_counter() - start) * 1000
+            reader.join(timeout=size / rate * 4 + 5)
+            if reader.is_alive():
+                raise RuntimeError("Leser nach der Übernahme hängen geblieben")
+            if b''.join(received) != payload or download.path != cached or os.path.exists(path):
+                raise RuntimeError("Progressiver Leser lieferte andere Bytes als der Server")
+
+            results['ready_ms'] = download.time_to_ready * 1000
+            results['mb_s'] = size / complete / 1e6
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return results
+
+
+def bench_download(songs=8, size=2 * 1024 * 1024):
+    """
+    Auflösen (kalt/gecacht), direkter Download und yt_dlp-Fallback gegen lokale
+    Ersatz-Dienste. Mit Kivy laufen zusätzlich die echten App-Methoden.
+    """
+    from audio_cache import AudioCache
+    from metadata_cache import MetadataCache, Extractor
+    from progressive import ProgressiveDownload
+
+    results = {}
+    work_dir = tempfile.mkdtemp(prefix='xmas_bench_dl_')
+    payload_dir = os.path.join(work_dir, 'payload')
+    os.makedirs(payload_dir)
+    payload = os.urandom(size)
+    urls = []
+    for i in range(songs):
+        with open(os.path.join(payload_dir, f'song{i}.m4a'), 'wb') as f:
+            f.write(payload)
+        urls.append(f'https://www.youtube.com/watch?v=song{i}')
+
+    try:
+        with local_server(payload_dir) as base_url, fake_yt_dlp(make_fake_yt_dlp(base_url, payload_dir)) as fake:
+            cache_dir = os.path.join(work_dir, 'cache')
+            os.makedirs(cache_dir)
+            cache = AudioCache(cache_dir, max_bytes=songs * size * 4)
+            extractor = Extractor(MetadataCache(cache_dir))
+
+            start = time.perf_counter()
+            streams = [extractor.resolve(url) for url in urls]
+            results['resolve_cold_ms'] = (time.perf_counter() - start) / songs * 1000
+            start = time.perf_counter()
+            for url in urls:
+                extractor.resolve(url)
+            results['resolve_cached_ms'] = (time.perf_counter() - start) / songs * 1000
+            results['resolve_extractions'] = fake.extractions
+
+            # Direkter Weg: Stream-URL progressiv laden, dann in den Cache
+            start = time.perf_counter()
+            ready = []
+            for stream in streams:
+                path = os.path.join(cache.staging_dir, f"{stream['id']}.{stream['ext']}")
+                download = ProgressiveDownload(stream['url'], path).start()
+                download.complete.wait()
+                ready.append(download.time_to_ready or 0.0)
+                cache.put(stream['id'], path, stream)
+            elapsed = time.perf_counter() - start
+            results['direct_mb_s'] = songs * size / elapsed / 1e6
+            results['direct_ready_ms'] = sum(ready) / len(ready) * 1000
+            for stream in streams:
+                cache.remove(stream['id'])
+
+            # Fallback: yt_dlp lädt selbst in den Staging-Ordner
+            import yt_dlp
+            start = time.perf_counter()
+            for url in urls:
+                options = {'outtmpl': cache.staging_template(), 'progress_hooks': []}
+                with yt_dlp.YoutubeDL(options) as ydl:
+                    info = ydl.extract_info(url, download=True)
+                    staged = ydl.prepare_filename(info)
+                cache.put(info['id'], staged, info)
+            results['fallback_ms'] = (time.perf_counter() - start) / songs * 1000
+            for url in urls:
+                cache.remove(url.rsplit('=', 1)[-1])
+
+            results.update(bench_app_download(cache, extractor, urls))
+            extractor.close()
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return results
+
+
+def bench_app_download(cache, extractor, urls):
+    """ChristmasDiscoApp.download_audio selbst (braucht Kivy), ohne App-Instanz."""
+    os.environ.setdefault('KIVY_NO_ARGS', '1')
+    try:
+        from Merry_Xmas import ChristmasDiscoApp
+    except ImportError as e:
+        print(f"App-Download-Benchmark übersprungen: {e}")
+        return {}
+
+    app = types.SimpleNamespace(cache=cache, extractor=extractor)
+    app.download_direct = functools.partial(ChristmasDiscoApp.download_direct, app)
+    start = time.perf_counter()
+    for url in urls:
+        ChristmasDiscoApp.download_audio(app, url)
+    results = {'app_download_ms': (time.perf_counter() - start) / len(urls) * 1000}
+    start = time.perf_counter()
+    for url in urls:
+        ChristmasDiscoApp.download_audio(app, url)
+    results['app_download_cached_ms'] = (time.perf_counter() - start) / len(urls) * 1000
+    return results
+
+
+def run_all():
+    results = []
+    for chunk_size in CHUNK_SIZES:
+        fps = bench_analyzer(chunk_size)
+        print(f"analyzer chunk={chunk_size:5d}  "
+              f"legacy {fps['legacy']:9.0f} f/s  "
+              f"streaming {fps['streaming']:9.0f} f/s  "
+              f"batch {fps['batch']:9.0f} f/s  "
+              f"(x{fps['batch'] / fps['legacy']:.1f})")
+        for name, value in fps.items():
+            results.append(result(f'analyzer.{name}.{chunk_size}', value, 'frames/s', True))
+
+    for particles in PARTICLE_COUNTS:
+        ms = bench_particles(particles, 50)
+        print(f"particles={particles:5d} snow=50     {ms:7.3f} ms/Frame")
+        results.append(result(f'particles.{particles}', ms, 'ms/frame', False))
+    for snowflakes in SNOW_COUNTS:
+        ms = bench_particles(256, snowflakes)
+        print(f"particles=  256 snow={snowflakes:<5d} {ms:7.3f} ms/Frame")
+        results.append(result(f'snow.{snowflakes}', ms, 'ms/frame', False))
+
+    for tier, ms in bench_visualizer().items():
+        print(f"visualizer.update {tier:7s}  {ms:7.3f} ms/Frame")
+        results.append(result(f'visualizer.{tier}', ms, 'ms/frame', False))
+    for tier, ms in bench_visualizer(renderer='shader').items():
+        print(f"visualizer.shader {tier:7s}  {ms:7.3f} ms/Frame")
+        results.append(result(f'visualizer.shader.{tier}', ms, 'ms/frame', False))
+
+    for name, value in bench_cache().items():
+        print(f"{name:24s} {value:10.2f}")
+        results.append(result(name, value, name.rsplit('_', 1)[-1], False))
+
+    for name, value in bench_progressive().items():
+        print(f"progressive.{name:21s} {value:10.2f}")
+        results.append(result(f'progressive.{name}', value, 'MB/s' if name == 'mb_s' else 'ms', name == 'mb_s'))
+
+    for name, value in bench_download().items():
+        print(f"download.{name:24s} {value:10.2f}")
+        if name == 'resolve_extractions':
+            continue
+        if name == 'direct_mb_s':
+            results.append(result(f'download.{name}', value, 'MB/s', True))
+        else:
+            results.append(result(f'download.{name}', value, 'ms', False))
+    return results
+
+
+def compare(results, baseline, threshold=REGRESSION_THRESHOLD):
+    """Liste der Messungen, die mehr als `threshold` schlechter als die Baseline sind."""
+    old = {entry['name']: entry for entry in baseline.get('results', [])}
+    regressions = []
+    for entry in results:
+        before = old.get(entry['name'])
+        if not before or before['value'] <= 0 or entry['value'] <= 0:
+            continue
+        if entry['higher_is_better']:
+            change = before['value'] / entry['value'] - 1
+        else:
+            change = entry['value'] / before['value'] - 1
+        if change > threshold:
+            regressions.append((entry['name'], before['value'], entry['value'], change))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Performance-Benchmarks (offline).')
+    parser.add_argument('--out', default='benchmark_results.json')
+    parser.add_argument('--baseline', help='Frühere Ergebnisse zum Vergleich')
+    parser.add_argument('--threshold', type=float, default=REGRESSION_THRESHOLD,
+                        help='Erlaubte Verschlechterung (0.25 = 25%%)')
+    args = parser.parse_args(argv)
+
+    results = run_all()
+    data = {
+        'created': time.time(),
+        'python': sys.version.split()[0],
+        'numpy': np.__version__,
+        'results': results,
+    }
+    with open(args.out, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=1)
+    print(f"Ergebnisse: {args.out}")
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        for name, before, after, change in regressions:
+            print(f"❌ Regression {name}: {before:.3f} -> {after:.3f} (+{change * 100:.0f}%)")
+        if regressions:
+            return 1
+        print(f"✅ Keine Regression über {args.threshold * 100:.0f}%")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
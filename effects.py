@@ -0,0 +1,385 @@
+"""
+Effekt-System des Visualizers.
+Jeder Effekt besitzt eine eigene InstructionGroup, bekommt pro Frame einen
+FrameContext (Snapshot, dt, Beat, Geometrie) und wird vom Compositor einzeln
+gemessen. Überschreiten die Effekte zusammen das Frame-Budget, reduziert der
+Compositor zuerst die Detailstufe der teuersten unwichtigen Effekte und
+schaltet optionale Effekte notfalls ganz ab; bei genug Reserve wird wieder
+hochgeschaltet.
+
+Neue Szenen: Unterklasse von Effect mit setup()/update(), dann
+`visualizer.compositor.add(MeinEffekt())`.
+"""
+import time
+
+from kivy.graphics import Color, Ellipse, InstructionGroup, Line, Mesh
+
+from metrics import METRICS
+
+# Anteil der vollen Menge pro Detailstufe (Schnee, Partikel)
+DETAIL_FRACTIONS = (0.25, 0.5, 1.0)
+
+
+class FrameContext:
+    """Alles, was ein Effekt für einen Frame braucht (vom Visualizer befüllt)."""
+    __slots__ = ('snapshot', 'dt', 'steps', 'beat', 'cx', 'cy', 'width', 'height', 'radius')
+
+    def __init__(self, snapshot, dt, beat, cx, cy, width, height):
+        self.snapshot = snapshot
+        self.dt = dt
+        # Animation in Referenz-Frames (30 FPS), große Sprünge begrenzen
+        self.steps = min(dt, 0.1) * 30
+        self.beat = beat
+        self.cx = cx
+        self.cy = cy
+        self.width = width
+        self.height = height
+        # Bass-Radius: gemeinsame Geometrie für Kreis, Ring und Wellen
+        self.radius = 80 + snapshot.bass * 200
+
+
+class Effect:
+    name = 'effect'
+    priority = 1       # höher = wichtiger, wird zuletzt reduziert
+    optional = True    # darf vom Compositor ganz abgeschaltet werden
+    levels = 1         # Anzahl Detailstufen (0 = niedrigste)
+
+    def __init__(self):
+        self.group = InstructionGroup()
+        self.enabled = True
+        self.level = self.levels - 1
+        self.cost = 0.0        # gleitender Mittelwert in Sekunden
+        self.measured = False
+
+    def setup(self, visualizer):
+        """Legt die Instruktionen in self.group an."""
+
+    def apply_tier(self, tier):
+        """Übernimmt Mengen einer Qualitätsstufe (frame_scheduler.QUALITY_TIERS)."""
+
+    def set_level(self, level):
+        self.level = max(0, min(self.levels - 1, level))
+
+    def update(self, frame):
+        raise NotImplementedError
+
+    def hide(self):
+        """Beim Abschalten: nichts mehr zeichnen."""
+
+
+class BassCircleEffect(Effect):
+    name = 'bass_circle'
+    priority = 10
+    optional = False
+
+    def setup(self, visualizer):
+        self.colors = visualizer.colors
+        self.color = Color(1, 0, 0, 0.8)
+        self.circle = Ellipse(pos=(0, 0), size=(100, 100))
+        self.group.add(self.color)
+        self.group.add(self.circle)
+
+    def update(self, frame):
+        radius = frame.radius
+        bass = frame.snapshot.bass
+        self.circle.pos = (frame.cx - radius, frame.cy - radius)
+        self.circle.size = (radius * 2, radius * 2)
+
+        # Farbe basierend auf Bass
+        self.color.rgb = self.colors[int(bass * (len(self.colors) - 1))]
+        self.color.a = 0.6 + bass * 0.4
+
+
+class SpectrumRingEffect(Effect):
+    """Spektrum-Balken rund um den Bass-Kreis (ein Mesh); Stufe 0 ohne Spiegelung."""
+    name = 'spectrum_ring'
+    priority = 4
+    levels = 2
+
+    def setup(self, visualizer):
+        from spectrum_ring import SpectrumRing
+        from filterbank import DEFAULT_BANDS
+
+        self.colors = visualizer.colors
+        self.ring = SpectrumRing(DEFAULT_BANDS)
+        self.color = Color(1, 0.84, 0, 0)
+        self.mesh = Mesh(vertices=[], indices=self.ring.indices, mode='triangles')
+        self.group.add(self.color)
+        self.group.add(self.mesh)
+
+    def set_level(self, level):
+        super().set_level(level)
+        mirror = self.level > 0
+        if mirror != self.ring.mirror:
+            self.ring.mirror = mirror
+            self.ring.configure(self.ring.bands)
+            self.mesh.indices = self.ring.indices
+
+    def update(self, frame):
+        snapshot = frame.snapshot
+        if snapshot.bands is None:
+            self.hide()
+            return
+        bars = len(self.ring.indices)
+        self.mesh.vertices = self.ring.update(
+            snapshot.bands, frame.cx, frame.cy, frame.radius + 10, 60 + snapshot.overall * 140
+        )
+        if len(self.ring.indices) != bars:
+            self.mesh.indices = self.ring.indices
+        self.color.rgb = self.colors[int(snapshot.treble * (len(self.colors) - 1))]
+        self.color.a = 0.5 + snapshot.overall * 0.5
+
+    def hide(self):
+        self.color.a = 0
+
+
+class BeatWavesEffect(Effect):
+    """Bis zu drei Ringe, die bei jedem Beat vom Bass-Kreis aus wachsen."""
+    name = 'beat_waves'
+    priority = 6
+    levels = 3
+
+    def setup(self, visualizer):
+        self.waves = []
+        self.max_waves = self.levels
+        for i in range(self.levels):
+            color = Color(1, 0, 0, 0)
+            line = Line(circle=(0, 0, 0), width=3)
+            self.group.add(color)
+            self.group.add(line)
+            self.waves.append({'color': color, 'line': line, 'size': 0})
+
+    @property
+    def active(self):
+        return min(self.max_waves, self.level + 1)
+
+    def apply_tier(self, tier):
+        self.max_waves = tier['waves']
+        self._clear(self.active)
+
+    def set_level(self, level):
+        super().set_level(level)
+        self._clear(self.active)
+
+    def _clear(self, start):
+        for wave in self.waves[start:]:
+            wave['size'] = 0
+            wave['color'].a = 0
+
+    def update(self, frame):
+        for wave in self.waves[:self.active]:
+            if frame.beat and wave['size'] == 0:
+                wave['size'] = frame.radius
+
+            if wave['size'] > 0:
+                wave['size'] += 15 * frame.steps
+                alpha = 1 - (wave['size'] / 600)
+
+                if alpha > 0:
+                    wave['color'].rgba = (1, 0, 0, alpha)
+                    wave['line'].circle = (frame.cx, frame.cy, wave['size'])
+                else:
+                    wave['size'] = 0
+                    wave['color'].a = 0
+
+    def hide(self):
+        self._clear(0)
+
+
+class SpriteEffect(Effect):
+    """Gemeinsame Basis für Schnee und Partikel: Feld + ein Mesh pro Farbgruppe."""
+    levels = len(DETAIL_FRACTIONS)
+
+    def create_meshes(self, texture, rgba_list):
+        self.meshes = []
+        for rgba in rgba_list:
+            self.group.add(Color(*rgba))
+            mesh = Mesh(vertices=[], indices=[], mode='triangles', texture=texture)
+            self.group.add(mesh)
+            self.meshes.append(mesh)
+
+    def draw_field(self):
+        """Überträgt die Arrays des Feldes in die Meshes."""
+        self.field.update_sizes()
+        for group, mesh in enumerate(self.meshes):
+            vertices, indices = self.field.group_mesh(group)
+            mesh.vertices = vertices
+            mesh.indices = indices
+
+    def hide(self):
+        for mesh in self.meshes:
+            mesh.vertices = []
+            mesh.indices = []
+
+
+class SnowEffect(SpriteEffect):
+    name = 'snow'
+    priority = 3
+
+    def setup(self, visualizer):
+        from particles import SnowField
+        self.visualizer = visualizer
+        self.base_count = 50
+        self.field = SnowField(self.base_count, max(visualizer.width, 1), max(visualizer.height, 1),
+                               seed=visualizer.effect_seed)
+        self.create_meshes(visualizer.sprite_texture, [(1, 1, 1, a) for a in SnowField.ALPHA_GROUPS])
+
+    def _resize(self):
+        count = int(self.base_count * DETAIL_FRACTIONS[self.level])
+        self.field.resize(count, max(self.visualizer.width, 1), max(self.visualizer.height, 1))
+
+    def apply_tier(self, tier):
+        self.base_count = tier['snowflakes']
+        self._resize()
+
+    def set_level(self, level):
+        super().set_level(level)
+        self._resize()
+
+    def update(self, frame):
+        snapshot = frame.snapshot
+        self.field.step(snapshot.mid, snapshot.overall, frame.width, frame.height, frame.steps)
+        self.draw_field()
+
+
+class ParticleEffect(SpriteEffect):
+    name = 'particles'
+    priority = 2
+
+    def setup(self, visualizer):
+        from particles import ParticleField
+        self.base_limit = 1024
+        self.field = ParticleField(groups=len(visualizer.colors), seed=visualizer.effect_seed)
+        self.create_meshes(visualizer.sprite_texture, [(r, g, b, 1) for r, g, b in visualizer.colors])
+
+    def apply_tier(self, tier):
+        self.base_limit = tier['particles']
+        self.field.set_limit(int(self.base_limit * DETAIL_FRACTIONS[self.level]))
+
+    def set_level(self, level):
+        super().set_level(level)
+        self.field.set_limit(int(self.base_limit * DETAIL_FRACTIONS[self.level]))
+
+    def update(self, frame):
+        # Erstelle Partikel bei Beat (Zufall aus dem geseedeten Feld: reproduzierbar)
+        if frame.beat and self.field.rng.random() > 0.5:
+            self.field.spawn_burst(frame.cx, frame.cy, 8)
+        self.field.step(min(frame.dt, 0.1))
+        self.draw_field()
+
+    def hide(self):
+        self.field.count = 0
+        super().hide()
+
+
+class Compositor:
+    """
+    Führt die Effekte in Reihenfolge aus, misst ihre Kosten und hält die Summe
+    unter `budget` (Sekunden pro Frame, None = keine Anpassung).
+    """
+    def __init__(self, visualizer, budget=None, window=30, cooldown=1.0):
+        self.visualizer = visualizer
+        self.effects = []
+        self.budget = budget
+        self.window = window
+        self.cooldown = cooldown
+        self.frames = 0
+        self.last_change = 0.0
+
+    def add(self, effect):
+        effect.setup(self.visualizer)
+        self.effects.append(effect)
+        self.visualizer.canvas.add(effect.group)
+        return effect
+
+    def remove(self, name):
+        effect = self.get(name)
+        if effect:
+            self.effects.remove(effect)
+            self.visualizer.canvas.remove(effect.group)
+        return effect
+
+    def get(self, name):
+        for effect in self.effects:
+            if effect.name == name:
+                return effect
+        return None
+
+    def apply_tier(self, tier):
+        for effect in self.effects:
+            effect.apply_tier(tier)
+
+    def update(self, frame):
+        alpha = 2.0 / (self.window + 1)
+        for effect in self.effects:
+            if not effect.enabled:
+                continue
+            start = time.perf_counter()
+            effect.update(frame)
+            cost = time.perf_counter() - start
+            if effect.measured:
+                effect.cost += (cost - effect.cost) * alpha
+            else:
+                effect.cost, effect.measured = cost, True
+
+        self.frames += 1
+        if self.budget is not None and self.frames >= self.window:
+            self.frames = 0
+            self._balance()
+
+    @property
+    def total_cost(self):
+        return sum(effect.cost for effect in self.effects if effect.enabled)
+
+    def _balance(self):
+        now = time.perf_counter()
+        if now - self.last_change < self.cooldown:
+            return
+        total = self.total_cost
+        if METRICS.enabled:
+            for effect in self.effects:
+                METRICS.gauge(f'effect.{effect.name}_ms', effect.cost * 1000 if effect.enabled else 0.0)
+
+        if total > self.budget:
+            changed = self._downgrade()
+        elif total < self.budget * 0.5:
+            changed = self._upgrade(total)
+        else:
+            changed = False
+        if changed:
+            self.last_change = now
+
+    def _downgrade(self):
+        # Unwichtigste zuerst, bei gleicher Priorität die teuerste
+        for effect in sorted(self.effects, key=lambda e: (e.priority, -e.cost)):
+            if not effect.enabled:
+                continue
+            if effect.level > 0:
+                effect.set_level(effect.level - 1)
+                print(f"Effekt {effect.name}: Stufe {effect.level}")
+                return True
+            if effect.optional:
+                effect.enabled = False
+                effect.hide()
+                print(f"Effekt {effect.name}: aus")
+                return True
+        return False
+
+    def _upgrade(self, total):
+        # Wichtigste zuerst; abgeschaltete nur, wenn ihre letzten Kosten ins Budget passen
+        for effect in sorted(self.effects, key=lambda e: -e.priority):
+            if not effect.enabled:
+                if total + effect.cost < self.budget * 0.8:
+                    effect.enabled = True
+                    effect.set_level(0)
+                    print(f"Effekt {effect.name}: an")
+                    return True
+            elif effect.level < effect.levels - 1:
+                effect.set_level(effect.level + 1)
+                print(f"Effekt {effect.name}: Stufe {effect.level}")
+                return True
+        return False
+
+    def report(self):
+        return [{'name': e.name, 'enabled': e.enabled, 'level': e.level, 'cost_ms': e.cost * 1000}
+                for e in self.effects]
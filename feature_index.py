@@ -0,0 +1,282 @@
+"""
+Vorberechneter Feature-Index pro Song.
+Einmalige Offline-Analyse, danach nur noch Lookups per Wiedergabeposition
+statt FFTs auf dem Handy.
+
+Dateiformat (.xmf, liegt neben der Audio-Datei im Cache):
+    24 Byte Header: b'XMF3', sample_rate, hop, frame_count, bands, tempo_count
+                    (je uint32 LE)
+    danach frame_count Records à 5 Byte (bass, mid, treble, rms, beat als uint8)
+    danach frame_count x bands Spektrum-Bänder (uint8)
+    danach tempo_count Records à 24 Byte (time, bpm, confidence, beat_time):
+    die Tempo-Schätzungen des BeatTracker beim Bauen, damit die Wiedergabe
+    aus dem Index dieselbe Beat-Vorhersage bekommt wie die Live-Analyse.
+Ältere XMF2- (ohne Tempo) und XMF1-Dateien (16 Byte Header, ohne Bänder)
+werden weiter gelesen, gelten aber als veraltet und werden neu gebaut.
+"""
+import os
+import struct
+import subprocess
+import time
+
+import numpy as np
+
+from analysis_state import ANALYSIS_SAMPLE_RATE, ANALYSIS_WINDOW, ANALYSIS_HOP
+from audio_analysis import StreamingAnalyzer
+from beat_tracking import BeatTracker
+from audio_stream import PCMDecoder, ffmpeg_pcm_command
+from transcode import PCMFile, is_sidecar
+
+INDEX_SUFFIX = '.xmf'
+INDEX_MAGIC = b'XMF3'
+HEADER = struct.Struct('<4sIIIII')
+V2_MAGIC = b'XMF2'
+V2_HEADER = struct.Struct('<4sIIII')
+LEGACY_MAGIC = b'XMF1'
+LEGACY_HEADER = struct.Struct('<4sIII')
+
+FEATURE_DTYPE = np.dtype([
+    ('bass', 'u1'),
+    ('mid', 'u1'),
+    ('treble', 'u1'),
+    ('rms', 'u1'),
+    ('beat', 'u1'),
+])
+
+TEMPO_DTYPE = np.dtype([
+    ('time', '<f8'),         # Stream-Zeit der Schätzung
+    ('bpm', '<f4'),
+    ('confidence', '<f4'),
+    ('beat_time', '<f8'),    # Phasen-Referenz (Stream-Zeit eines Beats)
+])
+
+BATCH_FRAMES = 256
+
+AUDIO_EXTENSIONS = ('.m4a', '.webm', '.mp3', '.ogg', '.opus', '.wav', '.aac', '.flac')
+
+
+def index_path_for(audio_path):
+    return audio_path + INDEX_SUFFIX
+
+
+def iter_pcm_windows(source, sample_rate, window, hop):
+    """Liefert überlappende int16-Fenster (window/hop) aus ffmpeg, ohne Komplett-Dekodierung."""
+    process = subprocess.Popen(
+        ffmpeg_pcm_command(source, sample_rate),
+        stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
+    )
+    buf = np.zeros(window, dtype=np.int16)
+    filled = 0
+    try:
+        while True:
+            raw = process.stdout.read(hop * 2)
+            if len(raw) < 2:
+                break
+            samples = np.frombuffer(raw[:len(raw) - len(raw) % 2], dtype=np.int16)
+            n = len(samples)
+            buf[:-n] = buf[n:]
+            buf[-n:] = samples
+            filled = min(window, filled + n)
+            if filled == window:
+                yield buf
+    finally:
+        process.kill()
+        process.wait()
+
+
+def build_feature_index(audio_path, sample_rate=ANALYSIS_SAMPLE_RATE, window=ANALYSIS_WINDOW,
+                        hop=ANALYSIS_HOP, info=None):
+    """
+    Analysiert `audio_path` einmal komplett und schreibt den .xmf-Index daneben.
+    Liegt eine transkodierte .pcm-Datei vor, kommen die Fenster direkt aus dem
+    memmap (keine Dekodierung), sonst aus ffmpeg. Ein übergebenes dict `info`
+    bekommt frames, duration, bpm und confidence des Songs.
+    """
+    analyzer = StreamingAnalyzer(window, sample_rate)
+    tracker = BeatTracker(sample_rate / hop)
+    tracker.tempo_track = []
+    analyzer.attach_beat_tracker(tracker)
+    rows = []
+    band_rows = []
+
+    # Frame i beschreibt das Fenster, das bei Sample (i + 1) * hop endet
+    for _ in range(window // hop - 1):
+        rows.append(np.zeros((1, 5), dtype=np.float32))
+        band_rows.append(np.zeros((1, analyzer.bands), dtype=np.float32))
+
+    # Fenster sammeln und als 2-D Batch analysieren
+    batch = np.zeros((BATCH_FRAMES, window), dtype=np.int16)
+    frame = window // hop - 1   # Index des nächsten Frames
+    n = 0
+
+    def flush(frames):
+        # Stream-Zeit = Ende des jeweiligen Fensters
+        times = (frame + np.arange(len(frames)) + 1) * hop / sample_rate
+        rows.append(analyzer.analyze_frames(frames, times))
+        if analyzer.band_frames is not None:
+            band_rows.append(analyzer.band_frames)
+        return frame + len(frames)
+
+    pcm = PCMFile.open_for(audio_path, sample_rate)
+    if pcm is not None:
+        windows = pcm.frames(window, hop)
+        for start in range(0, len(windows), BATCH_FRAMES):
+            frame = flush(windows[start:start + BATCH_FRAMES])
+    else:
+        for chunk in iter_pcm_windows(audio_path, sample_rate, window, hop):
+            batch[n] = chunk
+            n += 1
+            if n == BATCH_FRAMES:
+                frame = flush(batch)
+                n = 0
+        if n:
+            frame = flush(batch[:n])
+
+    if len(rows) < window // hop:
+        return None
+
+    values = np.vstack(rows)
+    features = np.empty(len(values), dtype=FEATURE_DTYPE)
+    for i, name in enumerate(('bass', 'mid', 'treble', 'rms')):
+        features[name] = (values[:, i] * 255).astype(np.uint8)
+    features['beat'] = values[:, 4] > 0
+    bands = (np.vstack(band_rows) * 255).astype(np.uint8) if analyzer.bands else None
+    tempo = np.array(tracker.tempo_track, dtype=TEMPO_DTYPE)
+
+    path = index_path_for(audio_path)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(HEADER.pack(INDEX_MAGIC, sample_rate, hop, len(features), analyzer.bands, len(tempo)))
+        f.write(features.tobytes())
+        if bands is not None:
+            f.write(bands.tobytes())
+        f.write(tempo.tobytes())
+    os.replace(tmp_path, path)
+    print(f"Feature-Index geschrieben: {path} ({len(features)} Frames)")
+    if info is not None:
+        info.update(frames=len(features), duration=len(features) * hop / float(sample_rate),
+                    bpm=float(tracker.bpm), confidence=float(tracker.confidence))
+    return path
+
+
+def index_cache_dir(cache_dir):
+    """Baut fehlende oder veraltete Indizes für alle Audio-Dateien in `cache_dir`."""
+    if not PCMDecoder.available():
+        return []
+    built = []
+    for name in sorted(os.listdir(cache_dir)):
+        audio_path = os.path.join(cache_dir, name)
+        if not name.lower().endswith(AUDIO_EXTENSIONS) or is_sidecar(name):
+            continue
+        if FeatureIndex.is_fresh(audio_path):
+            continue
+        try:
+            if build_feature_index(audio_path):
+                built.append(audio_path)
+        except Exception as e:
+            print(f"Feature-Index error ({name}): {e}")
+    return built
+
+
+class FeatureIndex:
+    """Memory-mapped Zugriff auf einen .xmf-Index."""
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            head = f.read(HEADER.size)
+        tempo_count = 0
+        if head[:4] == INDEX_MAGIC:
+            _, sample_rate, hop, count, bands, tempo_count = HEADER.unpack(head)
+            offset = HEADER.size
+        elif head[:4] == V2_MAGIC:
+            _, sample_rate, hop, count, bands = V2_HEADER.unpack(head[:V2_HEADER.size])
+            offset = V2_HEADER.size
+        elif head[:4] == LEGACY_MAGIC:
+            _, sample_rate, hop, count = LEGACY_HEADER.unpack(head[:LEGACY_HEADER.size])
+            offset, bands = LEGACY_HEADER.size, 0
+        else:
+            raise ValueError(f"Kein Feature-Index: {path}")
+        self.path = path
+        self.sample_rate = sample_rate
+        self.hop = hop
+        self.frames = np.memmap(path, dtype=FEATURE_DTYPE, mode='r',
+                                offset=offset, shape=(count,))
+        self.bands = None
+        if bands and count:
+            self.bands = np.memmap(path, dtype=np.uint8, mode='r',
+                                   offset=offset + count * FEATURE_DTYPE.itemsize, shape=(count, bands))
+        self.tempo = None
+        if tempo_count:
+            # Klein (zwei Einträge pro Sekunde): komplett lesen statt memmap
+            with open(path, 'rb') as f:
+                f.seek(offset + count * (FEATURE_DTYPE.itemsize + bands))
+                self.tempo = np.fromfile(f, dtype=TEMPO_DTYPE, count=tempo_count)
+        self.frame_rate = sample_rate / hop
+        self.last_frame = -1
+
+    @staticmethod
+    def is_fresh(audio_path):
+        """Index existiert, ist neuer als die Audio-Datei und im aktuellen Format (mit Tempo)."""
+        path = index_path_for(audio_path)
+        if not os.path.exists(path) or os.path.getmtime(path) < os.path.getmtime(audio_path):
+            return False
+        try:
+            with open(path, 'rb') as f:
+                return f.read(4) == INDEX_MAGIC
+        except OSError:
+            return False
+
+    @classmethod
+    def open_for(cls, audio_path):
+        """Öffnet den Index zu `audio_path` oder gibt None zurück."""
+        if not audio_path or audio_path.startswith('http') or not cls.is_fresh(audio_path):
+            return None
+        try:
+            return cls(index_path_for(audio_path))
+        except Exception as e:
+            print(f"Feature-Index error: {e}")
+            return None
+
+    def __len__(self):
+        return len(self.frames)
+
+    def frame_at(self, seconds):
+        return min(len(self.frames) - 1, max(0, int(seconds * self.frame_rate)))
+
+    def apply(self, analyzer, seconds):
+        """Setzt die Analyzer-Werte für die Wiedergabeposition `seconds` (keine FFT)."""
+        i = self.frame_at(seconds)
+        row = self.frames[i]
+        analyzer.bass_level = row['bass'] / 255.0
+        analyzer.mid_level = row['mid'] / 255.0
+        analyzer.treble_level = row['treble'] / 255.0
+        analyzer.overall_level = row['rms'] / 255.0
+        if self.bands is not None:
+            analyzer.band_levels = self.bands[i] / 255.0
+
+        # Beats zwischen zwei Lookups nicht verschlucken
+        if self.last_frame < i <= self.last_frame + 8:
+            analyzer.beat_detected = bool(self.frames['beat'][self.last_frame + 1:i + 1].any())
+        else:
+            analyzer.beat_detected = bool(row['beat'])
+        self.last_frame = i
+        self.apply_tempo(analyzer, seconds)
+        analyzer.publish(seconds)
+        return i
+
+    def apply_tempo(self, analyzer, seconds):
+        """
+        Übernimmt die beim Bauen gespeicherte Tempo-Schätzung in den BeatTracker
+        des Analyzers (vor der ersten Schätzung gilt die erste), damit
+        predict_beat und der Party-Host auch beim Abspielen aus dem Index laufen.
+        """
+        tracker = getattr(analyzer, 'beat_tracker', None)
+        if tracker is None or self.tempo is None:
+            return
+        j = max(0, int(np.searchsorted(self.tempo['time'], seconds, 'right')) - 1)
+        entry = self.tempo[j]
+        tracker.bpm = float(entry['bpm'])
+        tracker.period = 60.0 / tracker.bpm if tracker.bpm > 0 else 0.0
+        tracker.confidence = float(entry['confidence'])
+        tracker.last_beat_time = float(entry['beat_time'])
+        tracker.clock_offset = time.perf_counter() - seconds
+        analyzer.bpm = tracker.bpm
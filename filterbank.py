@@ -0,0 +1,79 @@
+"""
+Log-frequenz Filterbank für die Spektrum-Bänder.
+Dreieckige Filter mit logarithmisch verteilten Mittenfrequenzen, als eine
+(Bänder x Bins)-Matrix vorberechnet: pro Frame genügt ein Matrix-Produkt.
+Dazu Attack/Decay-Glättung und eine adaptive Normierung auf 0..1.
+"""
+import numpy as np
+
+DEFAULT_BANDS = 32
+MIN_FREQ = 40.0       # Hz
+MAX_FREQ = 10000.0    # Hz (begrenzt auf Nyquist)
+
+
+def log_filterbank(n_fft, sample_rate, bands=DEFAULT_BANDS, fmin=MIN_FREQ, fmax=MAX_FREQ):
+    """
+    (bands, n_fft // 2 + 1)-Matrix. Jede Zeile summiert zu 1, das
+    Produkt mit einem Betragsspektrum ist also ein gewichteter Band-Mittelwert.
+    Schmale Bänder bei tiefen Frequenzen bekommen mindestens einen Bin.
+    """
+    bins = n_fft // 2 + 1
+    freqs = np.fft.rfftfreq(n_fft, 1.0 / sample_rate)
+    fmax = min(fmax, sample_rate / 2)
+    edges = np.geomspace(fmin, fmax, bands + 2)
+
+    matrix = np.zeros((bands, bins), dtype=np.float64)
+    for b in range(bands):
+        lo, center, hi = edges[b], edges[b + 1], edges[b + 2]
+        rising = (freqs - lo) / (center - lo)
+        falling = (hi - freqs) / (hi - center)
+        weights = np.clip(np.minimum(rising, falling), 0, None)
+        if not weights.any():
+            # Band schmaler als ein Bin: nächstgelegenen Bin nehmen
+            weights[int(np.argmin(np.abs(freqs - center)))] = 1.0
+        matrix[b] = weights / weights.sum()
+    return matrix
+
+
+class BandSmoother:
+    """
+    Glättet Band-Pegel pro Frame: schneller Anstieg (attack), langsames
+    Abklingen (decay). Pegel in dB relativ zu einer langsam fallenden gemeinsamen
+    Spitze aller Bänder: 0 dB -> 1, -`range_db` -> 0. So bleibt die Form des
+    Spektrums erhalten.
+    """
+    def __init__(self, bands, frame_rate, attack=0.01, decay=0.25, peak_decay=4.0,
+                 range_db=40.0, floor=1.0):
+        self.bands = bands
+        # Zeitkonstanten (Sekunden) -> Koeffizienten pro Frame
+        self.attack = 1.0 - np.exp(-1.0 / max(attack * frame_rate, 1e-6))
+        self.decay = 1.0 - np.exp(-1.0 / max(decay * frame_rate, 1e-6))
+        self.peak_fall = np.exp(-1.0 / max(peak_decay * frame_rate, 1e-6))
+        self.range = range_db / 20.0 * np.log(10)   # dB -> natürlicher Log
+        self.floor = floor
+        self.peak = floor
+        self.levels = np.zeros(bands, dtype=np.float64)
+        self.target = np.zeros(bands, dtype=np.float64)
+
+    def update(self, energies):
+        """Ein Frame Rohwerte (Filterbank-Ausgang) -> geglättete Pegel 0..1."""
+        target = np.log1p(energies, out=self.target)
+        self.peak = max(self.peak - (1.0 - self.peak_fall) * self.range, float(target.max()), self.floor)
+        target -= self.peak - self.range
+        target /= self.range
+        np.clip(target, 0.0, 1.0, out=target)
+
+        levels = self.levels
+        levels += (target - levels) * np.where(target > levels, self.attack, self.decay)
+        return levels
+
+    def update_batch(self, energies):
+        """Mehrere Frames (Zeilen); gibt die geglätteten Pegel aller Frames zurück."""
+        out = np.empty((len(energies), self.bands), dtype=np.float32)
+        for i, row in enumerate(energies):
+            out[i] = self.update(row)
+        return out
+
+    def reset(self):
+        self.peak = self.floor
+        self.levels[:] = 0
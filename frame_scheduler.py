@@ -0,0 +1,124 @@
+"""
+Adaptiver Frame-Scheduler.
+Misst die Frame-Zeit, wechselt zwischen Qualitätsstufen um ein Zeitbudget
+zu halten und drosselt die Tick-Rate, solange nichts abgespielt wird.
+"""
+import time
+
+from metrics import METRICS
+
+# Qualitätsstufen: Partikel-Limit, Schneeflocken, Beat-Wellen, Ziel-FPS
+QUALITY_TIERS = [
+    {'name': 'low', 'particles': 256, 'snowflakes': 20, 'waves': 1, 'fps': 20},
+    {'name': 'medium', 'particles': 1024, 'snowflakes': 50, 'waves': 2, 'fps': 30},
+    {'name': 'high', 'particles': 2048, 'snowflakes': 120, 'waves': 3, 'fps': 45},
+    {'name': 'ultra', 'particles': 4096, 'snowflakes': 250, 'waves': 3, 'fps': 60},
+]
+
+
+class FrameScheduler:
+    """
+    Ruft `callback(dt)` über `clock` (z.B. kivy.clock.Clock) auf.
+    `on_tier(tier)` wird bei jedem Stufenwechsel aufgerufen.
+    """
+    def __init__(self, callback, clock, on_tier=None, tier=1, idle_fps=5,
+                 budget_ratio=0.5, window=30, cooldown=2.0):
+        self.callback = callback
+        self.clock = clock
+        self.on_tier = on_tier
+        self.tier_index = tier
+        self.idle_fps = idle_fps
+        self.budget_ratio = budget_ratio   # Anteil des Frame-Intervalls für update()
+        self.window = window               # Frames pro Messfenster
+        self.cooldown = cooldown           # Sekunden zwischen Stufenwechseln
+
+        self.active = False
+        self.event = None
+        self.fps = None
+        self.cost_avg = 0.0
+        self.interval_avg = 0.0
+        self.frames = 0
+        self.last_change = 0.0
+
+    @property
+    def tier(self):
+        return QUALITY_TIERS[self.tier_index]
+
+    @property
+    def budget(self):
+        """Zeitbudget pro Frame für den Python-Teil (Sekunden)."""
+        return self.budget_ratio / self.tier['fps']
+
+    def start(self):
+        if self.on_tier:
+            self.on_tier(self.tier)
+        self._schedule()
+
+    def stop(self):
+        if self.event:
+            self.event.cancel()
+            self.event = None
+        self.fps = None
+
+    def set_active(self, active):
+        """Aktiv = volle Ziel-FPS, inaktiv (Pause/Stop) = Leerlauf-Rate."""
+        if active != self.active:
+            self.active = active
+            self.frames = 0
+            self._schedule()
+
+    def _schedule(self):
+        fps = self.tier['fps'] if self.active else self.idle_fps
+        if fps == self.fps and self.event:
+            return
+        if self.event:
+            self.event.cancel()
+        self.fps = fps
+        self.event = self.clock.schedule_interval(self._tick, 1.0 / fps)
+
+    def _tick(self, dt):
+        start = time.perf_counter()
+        self.callback(dt)
+        cost = time.perf_counter() - start
+        METRICS.observe('frame_ms', cost * 1000)
+
+        if not self.active:
+            return
+
+        # Gleitende Mittelwerte von Update-Kosten und tatsächlichem Intervall
+        alpha = 2.0 / (self.window + 1)
+        if self.frames == 0:
+            self.cost_avg, self.interval_avg = cost, dt
+        else:
+            self.cost_avg += (cost - self.cost_avg) * alpha
+            self.interval_avg += (dt - self.interval_avg) * alpha
+        self.frames += 1
+
+        if self.frames >= self.window:
+            self._adapt()
+
+    def _adapt(self):
+        now = time.perf_counter()
+        if now - self.last_change < self.cooldown:
+            return
+
+        target_interval = 1.0 / self.tier['fps']
+        over_budget = self.cost_avg > self.budget or self.interval_avg > target_interval * 1.5
+        headroom = self.cost_avg < self.budget * 0.4 and self.interval_avg < target_interval * 1.1
+
+        if over_budget and self.tier_index > 0:
+            self.set_tier(self.tier_index - 1)
+        elif headroom and self.tier_index < len(QUALITY_TIERS) - 1:
+            self.set_tier(self.tier_index + 1)
+
+    def set_tier(self, index):
+        index = max(0, min(len(QUALITY_TIERS) - 1, index))
+        if index == self.tier_index:
+            return
+        self.tier_index = index
+        self.last_change = time.perf_counter()
+        self.frames = 0
+        print(f"Qualitätsstufe: {self.tier['name']} ({self.tier['fps']} FPS)")
+        if self.on_tier:
+            self.on_tier(self.tier)
+        self._schedule()
@@ -0,0 +1,306 @@
+"""
+Headless Offline-Rendering des Visualizers.
+Rendert die Effekte zu einer gecachten Audio-Datei mit festem Zeitschritt in
+ein FBO - ohne sichtbares Fenster und ohne Wiedergabe. Die Analyse kommt aus
+dem vorberechneten Feature-Index (.xmf), der bei Bedarf erstellt wird.
+
+Mehrere Frames werden als Kacheln in ein Atlas-FBO gezeichnet und mit einem
+einzigen Readback gelesen. Ausgabe als PNG-Sequenz oder als roher RGBA-Stream,
+z.B. direkt in ffmpeg:
+
+    python headless_render.py song.m4a --format raw --out - | \\
+        ffmpeg -f rawvideo -pix_fmt rgba -s 720x1280 -r 30 -i - -i song.m4a share.mp4
+
+Ohne Display (CI): SDL-Offscreen-Treiber bzw. xvfb-run. Der Shader-Renderer
+(--renderer shader) läuft auch mit Mesa-Software-GL:
+
+    LIBGL_ALWAYS_SOFTWARE=1 xvfb-run python headless_render.py song.m4a --renderer shader
+"""
+import argparse
+import os
+import struct
+import sys
+import time
+import zlib
+
+# Vor dem ersten Kivy-Import: keine Kivy-Argumente, kein sichtbares Fenster
+os.environ.setdefault('KIVY_NO_ARGS', '1')
+if sys.platform.startswith('linux') and not os.environ.get('DISPLAY') and not os.environ.get('WAYLAND_DISPLAY'):
+    os.environ.setdefault('SDL_VIDEODRIVER', 'offscreen')
+
+import numpy as np
+
+DEFAULT_FPS = 30
+DEFAULT_SIZE = (720, 1280)
+DEFAULT_BATCH = 8
+FALLBACK_TEXTURE_SIZE = 4096   # falls GL_MAX_TEXTURE_SIZE nicht abfragbar ist
+
+
+def log(*args):
+    # Bei Ausgabe nach stdout (raw) dürfen Meldungen den Frame-Stream nicht stören
+    print(*args, file=sys.stderr)
+
+
+def max_texture_size():
+    """GL_MAX_TEXTURE_SIZE des aktuellen Kontexts (Atlas darf nicht größer werden)."""
+    try:
+        from kivy.graphics.opengl import glGetIntegerv, GL_MAX_TEXTURE_SIZE
+        value = glGetIntegerv(GL_MAX_TEXTURE_SIZE)
+        value = int(value[0] if isinstance(value, (list, tuple)) else value)
+        if value > 0:
+            return value
+    except Exception as e:
+        log(f"GL_MAX_TEXTURE_SIZE nicht abfragbar: {e}")
+    return FALLBACK_TEXTURE_SIZE
+
+
+def atlas_grid(size, batch, max_size):
+    """(Spalten, Zeilen, Batch) für ein Kachel-Raster innerhalb von max_size x max_size."""
+    width, height = size
+    if width > max_size or height > max_size:
+        raise ValueError(f"Framegröße {width}x{height} über GL_MAX_TEXTURE_SIZE {max_size}")
+    max_cols = max_size // width
+    max_rows = max_size // height
+    batch = max(1, min(batch, max_cols * max_rows))
+    cols = min(batch, max_cols)
+    rows = -(-batch // cols)
+    return cols, rows, batch
+
+
+def parse_size(text):
+    width, height = text.lower().split('x')
+    return int(width), int(height)
+
+
+def write_png(path, rgba, compression=1):
+    """Schreibt ein (h, w, 4) uint8-Array als PNG (nur zlib, kein PIL nötig)."""
+    height, width = rgba.shape[:2]
+    # Filter-Byte 0 vor jeder Zeile
+    raw = np.zeros((height, width * 4 + 1), dtype=np.uint8)
+    raw[:, 1:] = rgba.reshape(height, width * 4)
+
+    def chunk(kind, data):
+        body = kind + data
+        return struct.pack('>I', len(data)) + body + struct.pack('>I', zlib.crc32(body) & 0xffffffff)
+
+    with open(path, 'wb') as f:
+        f.write(b'\x89PNG\r\n\x1a\n')
+        f.write(chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 6, 0, 0, 0)))
+        f.write(chunk(b'IDAT', zlib.compress(raw.tobytes(), compression)))
+        f.write(chunk(b'IEND', b''))
+
+
+class FrameWriter:
+    """Nimmt Frames (h, w, 4) entgegen: PNG-Sequenz in einen Ordner oder roher Stream."""
+    def __init__(self, out, fmt='png', compression=1, stdout=None):
+        self.fmt = fmt
+        self.compression = compression
+        self.count = 0
+        self.stream = None
+        self.owns_stream = False
+        self.out = out
+        if fmt == 'png':
+            os.makedirs(out, exist_ok=True)
+        elif out == '-':
+            self.stream = stdout or sys.stdout.buffer
+        else:
+            self.stream = open(out, 'wb')
+            self.owns_stream = True
+
+    def write(self, frame):
+        if self.fmt == 'png':
+            write_png(os.path.join(self.out, f'frame_{self.count:06d}.png'), frame, self.compression)
+        else:
+            self.stream.write(frame.tobytes())
+        self.count += 1
+
+    def close(self):
+        if self.stream is not None:
+            self.stream.flush()
+            if self.owns_stream:
+                self.stream.close()
+
+
+class HeadlessRenderer:
+    """
+    Treibt einen DiscoVisualizer mit festem `dt` aus einem FeatureIndex.
+    Kacheln: ein FBO pro Frame im Batch, ein Atlas-FBO (Raster innerhalb
+    GL_MAX_TEXTURE_SIZE) für den Readback.
+    """
+    def __init__(self, feature_index, size=DEFAULT_SIZE, fps=DEFAULT_FPS, batch=DEFAULT_BATCH,
+                 quality='high', seed=0, renderer='canvas'):
+        from kivy.graphics import Fbo, Rectangle, Color
+        from Merry_Xmas import DiscoVisualizer
+        from frame_scheduler import QUALITY_TIERS
+        from audio_analysis import AudioAnalyzer
+
+        self.index = feature_index
+        self.size = size
+        self.fps = fps
+
+        self.analyzer = AudioAnalyzer()
+        self.visualizer = DiscoVisualizer(size_hint=(None, None), size=size, pos=(0, 0))
+        self.visualizer.analyzer = self.analyzer
+        self.visualizer.render_delay = 0
+        self.visualizer.create_effects(seed=seed, renderer=renderer)
+        log(f"Renderer: {self.visualizer.renderer}")
+        tiers = {tier['name']: tier for tier in QUALITY_TIERS}
+        self.visualizer.apply_quality(tiers[quality])
+        # Feste Qualität: kein Abschalten von Effekten nach Render-Zeit (reproduzierbar)
+        self.visualizer.compositor.budget = None
+
+        width, height = size
+        self.cols, self.rows, self.batch = atlas_grid(size, max(1, batch), max_texture_size())
+        if self.batch < batch:
+            log(f"Batch auf {self.batch} begrenzt (GL_MAX_TEXTURE_SIZE)")
+        self.tiles = [Fbo(size=size) for _ in range(self.batch)]
+        self.atlas = Fbo(size=(width * self.cols, height * self.rows))
+        with self.atlas:
+            Color(1, 1, 1, 1)
+            for k, tile in enumerate(self.tiles):
+                row, col = divmod(k, self.cols)
+                Rectangle(texture=tile.texture, pos=(col * width, row * height), size=size)
+
+        self.frames = 0
+        self.readbacks = 0
+        self.timings = {'update': 0.0, 'draw': 0.0, 'readback': 0.0, 'write': 0.0}
+
+    def duration(self):
+        return len(self.index) / self.index.frame_rate
+
+    def render_tile(self, k, t):
+        """Zustand für Stream-Zeit `t` setzen, ein Update, in Kachel `k` zeichnen."""
+        start = time.perf_counter()
+        self.index.apply(self.analyzer, t)
+        self.visualizer.update(1.0 / self.fps)
+        mid = time.perf_counter()
+
+        tile = self.tiles[k]
+        tile.add(self.visualizer.canvas)
+        tile.draw()
+        tile.remove(self.visualizer.canvas)
+        self.timings['update'] += mid - start
+        self.timings['draw'] += time.perf_counter() - mid
+
+    def read_batch(self, count):
+        """Ein Readback für `count` Kacheln; liefert Frames von oben nach unten orientiert."""
+        start = time.perf_counter()
+        self.atlas.draw()
+        width, height = self.size
+        pixels = np.frombuffer(self.atlas.pixels, dtype=np.uint8).reshape(
+            height * self.rows, width * self.cols, 4)
+        self.readbacks += 1
+        self.timings['readback'] += time.perf_counter() - start
+        # OpenGL-Ursprung unten links: Kachel k liegt in Zeile k // cols (von unten)
+        frames = []
+        for k in range(count):
+            row, col = divmod(k, self.cols)
+            frames.append(pixels[row * height:(row + 1) * height, col * width:(col + 1) * width][::-1])
+        return frames
+
+    def render(self, writer, start=0.0, duration=None):
+        """Rendert [start, start + duration) und gibt die Durchsatz-Statistik zurück."""
+        end = self.duration() if duration is None else min(self.duration(), start + duration)
+        total = max(0, int((end - start) * self.fps))
+        t0 = time.perf_counter()
+
+        for first in range(0, total, self.batch):
+            count = min(self.batch, total - first)
+            for k in range(count):
+                self.render_tile(k, start + (first + k) / self.fps)
+            frames = self.read_batch(count)
+
+            write_start = time.perf_counter()
+            for frame in frames:
+                writer.write(frame)
+            self.timings['write'] += time.perf_counter() - write_start
+            self.frames += count
+
+        return self.report(time.perf_counter() - t0)
+
+    def report(self, elapsed):
+        fps = self.frames / elapsed if elapsed > 0 else 0.0
+        stats = {
+            'frames': self.frames,
+            'seconds': elapsed,
+            'fps': fps,
+            'realtime_factor': fps / self.fps,
+            'readbacks': self.readbacks,
+            'frames_per_readback': self.frames / self.readbacks if self.readbacks else 0.0,
+            'timings': dict(self.timings),
+        }
+        log(f"=== Render: {self.frames} Frames in {elapsed:.2f}s "
+            f"({fps:.1f} f/s, x{stats['realtime_factor']:.1f} Echtzeit, "
+            f"{self.readbacks} Readbacks) ===")
+        for name, seconds in self.timings.items():
+            per_frame = seconds / self.frames * 1000 if self.frames else 0.0
+            log(f"  {name:9s} {seconds:8.2f} s  {per_frame:6.2f} ms/Frame")
+        return stats
+
+
+def load_index(audio_path, build=True):
+    """Feature-Index zu `audio_path`, notfalls jetzt erstellt."""
+    from feature_index import FeatureIndex, build_feature_index
+    from Merry_Xmas import ANALYSIS_SAMPLE_RATE, ANALYSIS_WINDOW, ANALYSIS_HOP
+
+    index = FeatureIndex.open_for(audio_path)
+    if index is None and build:
+        log(f"Erstelle Feature-Index für {audio_path} ...")
+        build_feature_index(audio_path, sample_rate=ANALYSIS_SAMPLE_RATE,
+                            window=ANALYSIS_WINDOW, hop=ANALYSIS_HOP)
+        index = FeatureIndex.open_for(audio_path)
+    return index
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Rendert den Visualizer offline zu Frames.')
+    parser.add_argument('audio', help='Gecachte Audio-Datei (Index: <audio>.xmf)')
+    parser.add_argument('--out', default='frames', help="Ordner (png) oder Datei/'-' (raw)")
+    parser.add_argument('--format', choices=('png', 'raw'), default='png')
+    parser.add_argument('--size', type=parse_size, default=DEFAULT_SIZE, help='BxH, z.B. 720x1280')
+    parser.add_argument('--fps', type=int, default=DEFAULT_FPS)
+    parser.add_argument('--batch', type=int, default=DEFAULT_BATCH, help='Frames pro Readback')
+    parser.add_argument('--quality', choices=('low', 'medium', 'high', 'ultra'), default='high')
+    parser.add_argument('--start', type=float, default=0.0)
+    parser.add_argument('--duration', type=float, default=None)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--renderer', choices=('canvas', 'shader'), default='canvas')
+    parser.add_argument('--compression', type=int, default=1, help='PNG zlib-Level 0-9')
+    parser.add_argument('--no-build', action='store_true', help='Fehlenden Index nicht erstellen')
+    args = parser.parse_args(argv)
+
+    # stdout gehört den Frames: alle Meldungen (auch print() aus Feature-Index,
+    # Visualizer und Kivy) gehen nach stderr
+    stdout = sys.stdout
+    sys.stdout = sys.stderr
+    try:
+        return run(args, stdout.buffer)
+    finally:
+        sys.stdout = stdout
+
+
+def run(args, frame_stream):
+    """Rendert gemäß `args`; rohe Frames gehen nach `frame_stream` (das echte stdout)."""
+    # Fenster verstecken, bevor Merry_Xmas kivy.core.window lädt
+    from kivy.config import Config
+    Config.set('graphics', 'window_state', 'hidden')
+    Config.set('graphics', 'width', str(args.size[0]))
+    Config.set('graphics', 'height', str(args.size[1]))
+
+    index = load_index(args.audio, build=not args.no_build)
+    if index is None:
+        log(f"❌ Kein Feature-Index für {args.audio}")
+        return 1
+
+    renderer = HeadlessRenderer(index, size=args.size, fps=args.fps, batch=args.batch,
+                                quality=args.quality, seed=args.seed, renderer=args.renderer)
+    writer = FrameWriter(args.out, args.format, args.compression, stdout=frame_stream)
+    try:
+        renderer.render(writer, start=args.start, duration=args.duration)
+    finally:
+        writer.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
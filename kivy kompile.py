@@ -1,12 +1,13 @@
-from kivy.app import App
-from kivy.uix.button import Button
-from Merry_Xmas import show_menu  # importiere die Funktion
+from startup_timing import TIMER  # Zeitmessung ab Prozessstart
+
+
+def main():
+    # App-Modul erst hier laden (kein zweiter Kivy-App-Wrapper, kein doppelter Import)
+    with TIMER.section('import Merry_Xmas'):
+        from Merry_Xmas import ChristmasDiscoApp
+    TIMER.mark('module loaded')
+    ChristmasDiscoApp().run()
 
-class MyApp(App):
-    def build(self):
-        # Button klickt → Funktion ausführen
-        show_menu()  # Funktion aufrufen, wenn die App gebaut wird
-        
 
 if __name__ == "__main__":
-    MyApp().run()
+    main()
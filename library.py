@@ -0,0 +1,263 @@
+"""
+Lokale Musik-Bibliothek: Audio-Dateien aus Ordnern, ganz ohne Netz.
+Titel, Interpret, Dauer, Größe und Änderungszeit stehen in einer kleinen
+SQLite-Datenbank. Beim Start wird nur die Datenbank gelesen (sofortige
+Liste); ein Hintergrund-Thread gleicht danach die Ordner ab und liest
+Metadaten nur für neue oder geänderte Dateien. Anschließend werden die
+Ordner überwacht (Polling der Verzeichnis-Änderungszeiten, funktioniert
+auch auf Android ohne inotify).
+"""
+import json
+import os
+import shutil
+import sqlite3
+import subprocess
+import threading
+import time
+import wave
+
+LIBRARY_DB_NAME = 'library.sqlite3'
+AUDIO_EXTENSIONS = ('.mp3', '.m4a', '.aac', '.ogg', '.opus', '.flac', '.wav', '.webm')
+
+WATCH_INTERVAL = 5.0          # Sekunden zwischen zwei Verzeichnis-Prüfungen
+FULL_RESCAN_INTERVAL = 300.0  # voller Abgleich (erkennt auch in-place geänderte Dateien)
+SCAN_BATCH = 50               # Einträge pro Transaktion / UI-Aktualisierung
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tracks (
+    path TEXT PRIMARY KEY,
+    folder TEXT NOT NULL,
+    title TEXT NOT NULL,
+    artist TEXT,
+    duration REAL,
+    size INTEGER NOT NULL,
+    mtime REAL NOT NULL,
+    indexed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS tracks_folder ON tracks (folder);
+"""
+
+
+def is_local(source):
+    """True für Dateipfade, False für http(s)-URLs."""
+    return not source.startswith(('http://', 'https://'))
+
+
+def default_folders(android=False):
+    """Musik-Ordner: XMAS_MUSIC_DIR (mit os.pathsep getrennt) oder der Standard-Ordner."""
+    env = os.environ.get('XMAS_MUSIC_DIR')
+    if env:
+        return [p for p in env.split(os.pathsep) if p]
+    if android:
+        return ['/storage/emulated/0/Music']
+    return [os.path.join(os.path.expanduser('~'), 'Music')]
+
+
+def iter_audio_files(folder):
+    """(Pfad, stat) aller Audio-Dateien unter `folder`, rekursiv."""
+    stack = [folder]
+    while stack:
+        current = stack.pop()
+        try:
+            entries = list(os.scandir(current))
+        except OSError:
+            continue
+        for entry in entries:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    if not entry.name.startswith('.'):
+                        stack.append(entry.path)
+                elif entry.name.lower().endswith(AUDIO_EXTENSIONS):
+                    yield entry.path, entry.stat()
+            except OSError:
+                continue
+
+
+def dir_mtimes(folder):
+    """Änderungszeit jedes Unterordners (ändert sich beim Anlegen/Löschen/Umbenennen)."""
+    mtimes = {}
+    stack = [folder]
+    while stack:
+        current = stack.pop()
+        try:
+            mtimes[current] = os.stat(current).st_mtime
+            with os.scandir(current) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False) and not entry.name.startswith('.'):
+                        stack.append(entry.path)
+        except OSError:
+            continue
+    return mtimes
+
+
+def title_from_filename(path):
+    """'Interpret - Titel.mp3' -> (Titel, Interpret)."""
+    stem = os.path.splitext(os.path.basename(path))[0].replace('_', ' ').strip()
+    if ' - ' in stem:
+        artist, title = stem.split(' - ', 1)
+        return title.strip(), artist.strip()
+    return stem, None
+
+
+def probe_duration(path):
+    """Dauer über ffprobe (falls vorhanden)."""
+    if shutil.which('ffprobe') is None:
+        return None, {}
+    try:
+        out = subprocess.run(
+            ['ffprobe', '-v', 'error', '-print_format', 'json', '-show_format', path],
+            capture_output=True, timeout=10, check=True
+        ).stdout
+        fmt = json.loads(out).get('format', {})
+        tags = {k.lower(): v for k, v in fmt.get('tags', {}).items()}
+        return float(fmt['duration']), tags
+    except (subprocess.SubprocessError, ValueError, KeyError, OSError):
+        return None, {}
+
+
+def read_metadata(path):
+    """
+    Titel, Interpret und Dauer einer Datei. Reihenfolge: mutagen (falls
+    installiert), WAV-Header, ffprobe; der Titel fällt auf den Dateinamen zurück.
+    """
+    title, artist = title_from_filename(path)
+    duration = None
+    tags = {}
+    try:
+        import mutagen
+        audio = mutagen.File(path, easy=True)
+        if audio is not None:
+            duration = getattr(audio.info, 'length', None)
+            tags = {k: v[0] for k, v in (audio.tags or {}).items() if v}
+    except ImportError:
+        pass
+    except Exception as e:
+        print(f"Metadata error ({os.path.basename(path)}): {e}")
+
+    if duration is None and path.lower().endswith('.wav'):
+        try:
+            with wave.open(path, 'rb') as w:
+                duration = w.getnframes() / float(w.getframerate())
+        except (wave.Error, EOFError, OSError):
+            pass
+    if duration is None:
+        duration, probed = probe_duration(path)
+        tags = tags or probed
+
+    return {
+        'title': tags.get('title') or title,
+        'artist': tags.get('artist') or artist,
+        'duration': duration,
+    }
+
+
+class LocalLibrary:
+    """Titel-Datenbank für lokale Ordner, Abgleich und Überwachung im Hintergrund."""
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(db_path, check_same_thread=False)
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.executescript(SCHEMA)
+        self.folders = []
+        self.on_change = None
+        self.running = False
+        self.wake = threading.Event()
+        self.thread = None
+
+    def tracks(self):
+        """Alle Titel aus der Datenbank (ohne Dateizugriff), sortiert."""
+        with self.lock:
+            rows = self.db.execute(
+                'SELECT path, title, artist, duration FROM tracks '
+                'ORDER BY artist COLLATE NOCASE, title COLLATE NOCASE'
+            ).fetchall()
+        return [{'path': p, 'title': t, 'artist': a, 'duration': d} for p, t, a, d in rows]
+
+    def scan(self, folder):
+        """
+        Gleicht `folder` mit der Datenbank ab: neue und geänderte Dateien
+        (Größe oder mtime) werden gelesen, verschwundene gelöscht.
+        Gibt (neu/geändert, gelöscht) zurück.
+        """
+        folder = os.path.abspath(folder)
+        with self.lock:
+            known = {path: (size, mtime) for path, size, mtime in self.db.execute(
+                'SELECT path, size, mtime FROM tracks WHERE folder = ?', (folder,))}
+
+        seen = set()
+        changed = []
+        for path, st in iter_audio_files(folder):
+            seen.add(path)
+            if known.get(path) != (st.st_size, st.st_mtime):
+                changed.append((path, st))
+        removed = [path for path in known if path not in seen]
+
+        if removed:
+            with self.lock, self.db:
+                self.db.executemany('DELETE FROM tracks WHERE path = ?', [(p,) for p in removed])
+            self._changed()
+
+        for start in range(0, len(changed), SCAN_BATCH):
+            if not self.running and self.thread is not None:
+                break
+            rows = []
+            for path, st in changed[start:start + SCAN_BATCH]:
+                meta = read_metadata(path)
+                rows.append((path, folder, meta['title'], meta['artist'], meta['duration'],
+                             st.st_size, st.st_mtime, time.time()))
+            with self.lock, self.db:
+                self.db.executemany(
+                    'INSERT OR REPLACE INTO tracks '
+                    '(path, folder, title, artist, duration, size, mtime, indexed_at) '
+                    'VALUES (?, ?, ?, ?, ?, ?, ?, ?)', rows)
+            self._changed()
+        return len(changed), len(removed)
+
+    def _changed(self):
+        if self.on_change:
+            self.on_change()
+
+    def start(self, folders, on_change=None):
+        """Abgleich aller Ordner und anschließende Überwachung in einem Hintergrund-Thread."""
+        self.folders = [os.path.abspath(f) for f in folders if os.path.isdir(f)]
+        self.on_change = on_change
+        if not self.folders:
+            return self
+        self.running = True
+        self.thread = threading.Thread(target=self._watch_loop, daemon=True)
+        self.thread.start()
+        return self
+
+    def rescan(self):
+        """Erzwingt einen Abgleich beim nächsten Durchlauf."""
+        self.wake.set()
+
+    def _watch_loop(self):
+        mtimes = {}
+        last_full = 0.0
+        while self.running:
+            forced = self.wake.is_set()
+            self.wake.clear()
+            full = forced or time.time() - last_full > FULL_RESCAN_INTERVAL
+            if full:
+                last_full = time.time()
+            for folder in self.folders:
+                current = dir_mtimes(folder)
+                if full or current != mtimes.get(folder):
+                    try:
+                        added, removed = self.scan(folder)
+                        if added or removed:
+                            print(f"Bibliothek {folder}: {added} neu/geändert, {removed} entfernt")
+                    except sqlite3.Error as e:
+                        print(f"Library error: {e}")
+                    mtimes[folder] = current
+            self.wake.wait(WATCH_INTERVAL)
+
+    def stop(self):
+        self.running = False
+        self.wake.set()
+        if self.thread:
+            self.thread.join(timeout=2.0)
+        with self.lock:
+            self.db.close()
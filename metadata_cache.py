@@ -0,0 +1,161 @@
+"""
+Cache für yt_dlp-Metadaten.
+Hält gewähltes Format, direkte Stream-URL (mit Ablaufzeit), Titel und Dauer
+im Speicher und auf der Platte, damit Replays und Fallbacks keinen weiteren
+extract_info-Aufruf brauchen. Alle Abfragen laufen über eine einzige,
+wiederverwendete YoutubeDL-Instanz (yt_dlp wird erst dann importiert).
+"""
+import json
+import os
+import threading
+import time
+from urllib.parse import parse_qs, urlparse
+
+from audio_cache import video_id_from_url
+
+METADATA_NAME = 'metadata.json'
+METADATA_TTL = 24 * 3600      # Titel/Dauer/Format
+URL_TTL_FALLBACK = 3600       # Wenn die URL kein expire-Feld hat
+URL_EXPIRY_MARGIN = 300       # Sekunden Sicherheitsabstand
+METADATA_MAX_ENTRIES = 500    # Ältere Einträge fliegen beim Speichern raus
+
+STREAM_FIELDS = ('id', 'title', 'duration', 'ext', 'format_id', 'url', 'filesize')
+
+
+def url_expiry(url, now=None):
+    """Ablaufzeitpunkt einer direkten YouTube-URL (Query-Parameter `expire`)."""
+    now = time.time() if now is None else now
+    try:
+        return float(parse_qs(urlparse(url).query)['expire'][0])
+    except (KeyError, ValueError, IndexError):
+        return now + URL_TTL_FALLBACK
+
+
+def stream_from_info(info, youtube_url):
+    """Reduziert ein extract_info-Ergebnis auf die benötigten Felder."""
+    stream = {key: info.get(key) for key in STREAM_FIELDS}
+    stream['id'] = stream['id'] or video_id_from_url(youtube_url)
+    stream['filesize'] = stream['filesize'] or info.get('filesize_approx')
+
+    # Ohne Top-Level-URL: erstes Format mit Audio
+    if not stream['url']:
+        for fmt in info.get('formats', []):
+            if fmt.get('acodec') != 'none' and fmt.get('url'):
+                print(f"Found stream URL in format: {fmt.get('format_id')}")
+                stream.update(url=fmt['url'], ext=fmt.get('ext'), format_id=fmt.get('format_id'))
+                break
+    if not stream['url']:
+        return None
+    return stream
+
+
+class MetadataCache:
+    """Metadaten pro Video-ID, im Speicher und als JSON-Datei."""
+    def __init__(self, cache_dir, ttl=METADATA_TTL, max_entries=METADATA_MAX_ENTRIES):
+        self.path = os.path.join(cache_dir, METADATA_NAME)
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.entries = self._load()
+        self._prune()
+
+    def _load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            print(f"Metadata cache error: {e}")
+            return {}
+
+    def _prune(self, now=None):
+        """Wirft abgelaufene Einträge weg und behält höchstens max_entries (die neuesten)."""
+        now = time.time() if now is None else now
+        entries = {key: entry for key, entry in self.entries.items()
+                   if now - entry.get('stored_at', 0) <= self.ttl}
+        if len(entries) > self.max_entries:
+            newest = sorted(entries, key=lambda key: entries[key]['stored_at'], reverse=True)
+            entries = {key: entries[key] for key in newest[:self.max_entries]}
+        removed = len(self.entries) - len(entries)
+        self.entries = entries
+        return removed
+
+    def _save(self):
+        self._prune()
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.entries, f, indent=1)
+        os.replace(tmp_path, self.path)
+
+    def get(self, video_id, need_url=True):
+        """Eintrag oder None, wenn abgelaufen (bzw. die URL abgelaufen ist)."""
+        now = time.time()
+        with self.lock:
+            entry = self.entries.get(video_id)
+            if entry is None or now - entry['stored_at'] > self.ttl:
+                return None
+            if need_url and now > entry['url_expires'] - URL_EXPIRY_MARGIN:
+                return None
+            return dict(entry)
+
+    def put(self, stream):
+        entry = dict(stream)
+        entry['stored_at'] = time.time()
+        entry['url_expires'] = url_expiry(stream['url'], entry['stored_at'])
+        with self.lock:
+            self.entries[stream['id']] = entry
+            self._save()
+        return dict(entry)
+
+    def invalidate(self, video_id):
+        """Verwirft einen Eintrag (z.B. wenn die URL mit 403 abgelehnt wurde)."""
+        with self.lock:
+            if self.entries.pop(video_id, None) is not None:
+                self._save()
+
+
+class Extractor:
+    """Eine wiederverwendete YoutubeDL-Instanz plus MetadataCache."""
+    def __init__(self, metadata, options=None):
+        self.metadata = metadata
+        self.options = options or {
+            'format': 'bestaudio[ext=m4a]/bestaudio/best',
+            'quiet': True,
+            'no_warnings': True,
+        }
+        self.ydl = None
+        self.lock = threading.Lock()
+        self.extractions = 0
+
+    def resolve(self, youtube_url, need_url=True):
+        """Stream-Infos zu `youtube_url`, aus dem Cache oder per extract_info."""
+        video_id = video_id_from_url(youtube_url)
+        if video_id:
+            cached = self.metadata.get(video_id, need_url)
+            if cached:
+                return cached
+
+        with self.lock:
+            # Während wir auf den Lock gewartet haben, hat evtl. ein anderer Thread extrahiert
+            if video_id:
+                cached = self.metadata.get(video_id, need_url)
+                if cached:
+                    return cached
+            if self.ydl is None:
+                # yt_dlp erst beim ersten Bedarf laden (teurer Import)
+                import yt_dlp
+                self.ydl = yt_dlp.YoutubeDL(self.options)
+            info = self.ydl.extract_info(youtube_url, download=False)
+            self.extractions += 1
+
+        stream = stream_from_info(info, youtube_url)
+        if stream is None:
+            return None
+        return self.metadata.put(stream)
+
+    def close(self):
+        with self.lock:
+            if self.ydl is not None:
+                self.ydl.close()
+                self.ydl = None
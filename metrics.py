@@ -0,0 +1,185 @@
+"""
+Laufzeit-Metriken (Timer, Zähler, Raten, Messwerte) für echte Geräte.
+Ausgeschaltet kosten alle Aufrufe nur eine Attribut-Abfrage; eingeschaltet
+werden Werte in kleinen Ringpuffern gesammelt, als Overlay-Text aufbereitet
+und periodisch als JSON-Zeilen in eine rotierende Log-Datei geschrieben.
+
+Einschalten: Umgebungsvariable XMAS_METRICS=1 (oder METRICS.enable()).
+"""
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager, nullcontext
+
+SAMPLE_WINDOW = 120           # Messwerte pro Reihe für Mittelwert/Perzentil
+RATE_WINDOW = 2.0             # Sekunden für Raten (z.B. Bytes/s)
+LOG_MAX_BYTES = 512 * 1024
+LOG_BACKUPS = 2
+
+_NULL = nullcontext()
+
+
+class Series:
+    """Ringpuffer der letzten Messwerte einer Reihe."""
+    def __init__(self, size=SAMPLE_WINDOW):
+        self.values = deque(maxlen=size)
+        self.count = 0
+        self.max = 0.0
+
+    def add(self, value):
+        self.values.append(value)
+        self.count += 1
+        self.max = max(self.max, value)
+
+    def summary(self):
+        if not self.values:
+            return {'count': self.count}
+        ordered = sorted(self.values)
+        return {
+            'count': self.count,
+            'last': self.values[-1],
+            'mean': sum(ordered) / len(ordered),
+            'p95': ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))],
+            'max': self.max,
+        }
+
+
+class Metrics:
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.series = {}     # Name -> Series (Zeiten in ms, Messwerte)
+            self.counters = {}   # Name -> int
+            self.gauges = {}     # Name -> letzter Wert
+            self.rates = {}      # Name -> deque((Zeitpunkt, Menge))
+            self.started = time.time()
+
+    def enable(self, enabled=True):
+        self.enabled = enabled
+
+    def count(self, name, n=1):
+        if not self.enabled:
+            return
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def gauge(self, name, value):
+        if self.enabled:
+            self.gauges[name] = value
+
+    def observe(self, name, value):
+        if not self.enabled:
+            return
+        with self.lock:
+            series = self.series.get(name)
+            if series is None:
+                series = self.series[name] = Series()
+            series.add(value)
+
+    def timer(self, name):
+        """`with METRICS.timer('analysis_ms'): ...` - misst in Millisekunden."""
+        if not self.enabled:
+            return _NULL
+        return self._timed(name)
+
+    @contextmanager
+    def _timed(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, (time.perf_counter() - start) * 1000)
+
+    def rate(self, name, amount):
+        """Menge (z.B. Bytes) für eine Rate pro Sekunde über RATE_WINDOW."""
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        with self.lock:
+            events = self.rates.get(name)
+            if events is None:
+                events = self.rates[name] = deque()
+            events.append((now, amount))
+            while events and now - events[0][0] > RATE_WINDOW:
+                events.popleft()
+
+    def per_second(self, name):
+        events = self.rates.get(name)
+        if not events:
+            return 0.0
+        now = time.perf_counter()
+        recent = [amount for at, amount in list(events) if now - at <= RATE_WINDOW]
+        return sum(recent) / RATE_WINDOW
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                'time': time.time(),
+                'uptime': time.time() - self.started,
+                'series': {name: s.summary() for name, s in self.series.items()},
+                'counters': dict(self.counters),
+                'gauges': dict(self.gauges),
+                'rates': {name: self.per_second(name) for name in self.rates},
+            }
+
+    def overlay_text(self):
+        """Kompakter Text für das On-Screen-Overlay."""
+        data = self.snapshot()
+        series = data['series']
+        lines = []
+        frame = series.get('frame_ms')
+        if frame and 'mean' in frame:
+            lines.append(f"Frame {frame['mean']:.1f} ms (p95 {frame['p95']:.1f}, max {frame['max']:.1f})")
+        analysis = series.get('analysis_ms')
+        age = series.get('snapshot_age_ms')
+        if analysis and 'mean' in analysis:
+            text = f"Analyse {analysis['mean']:.2f} ms"
+            if age and 'mean' in age:
+                text += f", Latenz {age['mean']:.0f} ms"
+            lines.append(text)
+        gauges = data['gauges']
+        if 'particles' in gauges:
+            lines.append(f"Partikel {gauges['particles']}  Schnee {gauges.get('snowflakes', 0)}  "
+                         f"Stufe {gauges.get('quality', '-')}")
+        counters = data['counters']
+        hits, misses = counters.get('cache.hit', 0), counters.get('cache.miss', 0)
+        if hits or misses:
+            lines.append(f"Cache {hits} Treffer / {misses} Fehlschläge")
+        download = data['rates'].get('download.bytes')
+        if download:
+            lines.append(f"Download {download / 1024:.0f} KB/s")
+        if 'time_to_first_sound' in gauges:
+            lines.append(f"Erster Ton nach {gauges['time_to_first_sound']:.2f} s")
+        return '\n'.join(lines)
+
+
+class MetricsLog:
+    """JSON-Zeilen-Log mit Größenbegrenzung (metrics.jsonl, .1, .2 ...)."""
+    def __init__(self, path, max_bytes=LOG_MAX_BYTES, backups=LOG_BACKUPS):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+
+    def write(self, data):
+        try:
+            if os.path.exists(self.path) and os.path.getsize(self.path) >= self.max_bytes:
+                self._rotate()
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(data, separators=(',', ':')) + '\n')
+        except OSError as e:
+            print(f"Metrics log error: {e}")
+
+    def _rotate(self):
+        for i in range(self.backups, 0, -1):
+            source = self.path if i == 1 else f'{self.path}.{i - 1}'
+            if os.path.exists(source):
+                os.replace(source, f'{self.path}.{i}')
+
+
+METRICS = Metrics(enabled=os.environ.get('XMAS_METRICS', '') not in ('', '0'))
@@ -0,0 +1,189 @@
+"""
+Array-basiertes Partikel- und Schneeflocken-System.
+Zustand liegt in numpy-Arrays, Updates sind vektorisiert und gezeichnet wird
+über wiederverwendete Vertex-Puffer (ein Mesh pro Farbgruppe) statt einer
+Color/Ellipse-Instruktion pro Objekt.
+"""
+import math
+
+import numpy as np
+
+# Quad-Ecken (x, y, u, v) - gegen den Uhrzeigersinn
+QUAD_CORNERS = np.array([
+    (0, 0, 0, 1),
+    (1, 0, 1, 1),
+    (1, 1, 1, 0),
+    (0, 1, 0, 0),
+], dtype=np.float32)
+
+
+def disc_pixels(size=32):
+    """RGBA-Pixel einer weichen, weißen Kreisscheibe (für die Sprite-Textur)."""
+    coords = (np.arange(size) + 0.5) / size * 2 - 1
+    dist = np.sqrt(coords[np.newaxis, :] ** 2 + coords[:, np.newaxis] ** 2)
+    alpha = np.clip((1.0 - dist) * size / 2, 0, 1)
+    pixels = np.full((size, size, 4), 255, dtype=np.uint8)
+    pixels[:, :, 3] = (alpha * 255).astype(np.uint8)
+    return pixels
+
+
+class SpriteField:
+    """Basis: Positionen, Größen und Gruppen als Arrays + Quad-Vertex-Puffer."""
+    def __init__(self, capacity, seed=None):
+        self.capacity = int(capacity)
+        self.count = 0
+        self.rng = np.random.default_rng(seed)
+
+        self.x = np.zeros(self.capacity, dtype=np.float32)
+        self.y = np.zeros(self.capacity, dtype=np.float32)
+        self.size = np.zeros(self.capacity, dtype=np.float32)
+        self.group = np.zeros(self.capacity, dtype=np.int8)
+
+        # Wiederverwendete Puffer: 4 Vertices à (x, y, u, v) pro Sprite
+        self.vertices = np.zeros((self.capacity, 4, 4), dtype=np.float32)
+        self.vertices[:] = QUAD_CORNERS
+        self.draw_size = np.zeros(self.capacity, dtype=np.float32)
+        quad = np.array([0, 1, 2, 2, 3, 0])
+        self.index_list = (np.arange(self.capacity)[:, np.newaxis] * 4 + quad).ravel().tolist()
+
+    def _arrays(self):
+        return [self.x, self.y, self.size, self.group]
+
+    def compact(self, keep):
+        """Entfernt Sprites mit keep == False in O(n) (kein list.remove)."""
+        n = int(np.count_nonzero(keep))
+        if n == self.count:
+            return
+        for arr in self._arrays():
+            arr[:n] = arr[:self.count][keep]
+        self.count = n
+
+    def update_sizes(self):
+        """Setzt self.draw_size[:count] - in Unterklassen überschrieben."""
+        self.draw_size[:self.count] = self.size[:self.count]
+
+    def group_mesh(self, group):
+        """Vertices und Indizes aller Sprites einer Gruppe (für Mesh.vertices/indices)."""
+        n = self.count
+        sel = np.flatnonzero(self.group[:n] == group)
+        m = len(sel)
+        if m == 0:
+            return [], []
+
+        verts = self.vertices[:m]
+        s = self.draw_size[sel][:, np.newaxis]
+        verts[:, :, 0] = self.x[sel][:, np.newaxis] + QUAD_CORNERS[:, 0] * s
+        verts[:, :, 1] = self.y[sel][:, np.newaxis] + QUAD_CORNERS[:, 1] * s
+        return verts.ravel().tolist(), self.index_list[:m * 6]
+
+
+class ParticleField(SpriteField):
+    """Beat-Partikel mit Geschwindigkeit und Lebensdauer."""
+    def __init__(self, capacity=4096, groups=6, seed=None):
+        self.vx = np.zeros(capacity, dtype=np.float32)
+        self.vy = np.zeros(capacity, dtype=np.float32)
+        self.life = np.zeros(capacity, dtype=np.float32)
+        super().__init__(capacity, seed)
+        self.groups = groups
+        self.limit = self.capacity
+
+    def _arrays(self):
+        return super()._arrays() + [self.vx, self.vy, self.life]
+
+    def spawn_burst(self, x, y, count):
+        """Erstellt bis zu `count` Partikel am Punkt (x, y)."""
+        start = self.count
+        n = min(count, self.limit - start)
+        if n <= 0:
+            return 0
+        end = start + n
+
+        angle = self.rng.uniform(0, 2 * math.pi, n)
+        speed = self.rng.uniform(50, 150, n)
+        self.x[start:end] = x
+        self.y[start:end] = y
+        self.vx[start:end] = np.cos(angle) * speed
+        self.vy[start:end] = np.sin(angle) * speed
+        self.size[start:end] = self.rng.uniform(5, 12, n)
+        self.life[start:end] = 1.0
+        self.group[start:end] = self.rng.integers(0, self.groups, n)
+        self.count = end
+        return n
+
+    def set_limit(self, limit):
+        """Begrenzt die Partikelanzahl (Qualitätsstufe); überzählige werden verworfen."""
+        self.limit = min(int(limit), self.capacity)
+        self.count = min(self.count, self.limit)
+
+    def step(self, dt):
+        """Bewegt alle Partikel um dt und entfernt abgelaufene."""
+        n = self.count
+        if n == 0:
+            return
+        self.life[:n] -= dt
+        self.compact(self.life[:n] > 0)
+
+        n = self.count
+        self.x[:n] += self.vx[:n] * (dt * 60)
+        self.y[:n] += self.vy[:n] * (dt * 60)
+
+    def update_sizes(self):
+        # Ausblenden über die Größe (eine Farbe pro Mesh)
+        n = self.count
+        np.multiply(self.size[:n], self.life[:n], out=self.draw_size[:n])
+
+
+class SnowField(SpriteField):
+    """Schneeflocken, die mit den Mitten fallen und mit dem Pegel pulsieren."""
+    ALPHA_GROUPS = (0.6, 0.9)
+
+    def __init__(self, count, width=400, height=800, capacity=2048, seed=None):
+        self.speed = np.zeros(capacity, dtype=np.float32)
+        self.sway = np.zeros(capacity, dtype=np.float32)
+        super().__init__(capacity, seed)
+        self.pulse = 1.0
+        self.resize(count, width, height)
+
+    def _arrays(self):
+        return super()._arrays() + [self.speed, self.sway]
+
+    def resize(self, count, width, height):
+        """Ändert die Anzahl der Flocken (neue werden zufällig verteilt)."""
+        count = min(int(count), self.capacity)
+        start = self.count
+        if count <= start:
+            self.count = count
+            return
+        n = count - start
+        self.x[start:count] = self.rng.uniform(0, width, n)
+        self.y[start:count] = self.rng.uniform(0, height, n)
+        self.size[start:count] = self.rng.uniform(3, 8, n)
+        self.speed[start:count] = self.rng.uniform(1, 3, n)
+        self.sway[start:count] = self.rng.uniform(-0.5, 0.5, n)
+        self.group[start:count] = self.rng.uniform(0.5, 1.0, n) >= 0.75
+        self.count = count
+
+    def step(self, mid, overall, width, height, scale=1.0):
+        """Bewegt alle Flocken; `scale` = Anzahl Referenz-Frames in diesem Tick."""
+        n = self.count
+        x = self.x[:n]
+        y = self.y[:n]
+
+        y -= self.speed[:n] * ((1 + mid * 2) * scale)
+        x += self.sway[:n] * (mid * 5 * scale)
+
+        # Wrap around
+        fallen = y < 0
+        k = int(np.count_nonzero(fallen))
+        if k:
+            y[fallen] = height
+            x[fallen] = self.rng.uniform(0, max(width, 1), k)
+        x[x < 0] = width
+        x[x > width] = 0
+
+        # Größe pulsiert mit Musik
+        self.pulse = 1 + overall * 0.5
+
+    def update_sizes(self):
+        n = self.count
+        np.multiply(self.size[:n], self.pulse, out=self.draw_size[:n])
@@ -0,0 +1,456 @@
+"""
+Party-Modus: mehrere Geräte im LAN zeigen synchron dieselbe Visualisierung.
+Der Host schickt jeden Analyse-Snapshot (Pegel, Bänder, Beat-Zähler, Tempo
+und nächster vorhergesagter Beat) als kleines UDP-Multicast-Paket. Gäste
+laden und analysieren nichts selbst: sie schätzen den Uhren-Versatz zum Host
+per Ping/Pong (NTP-Prinzip, Probe mit der kürzesten Laufzeit gewinnt) und
+rechnen alle Zeitstempel auf die eigene Uhr um.
+
+Test mit mehreren Prozessen auf einem Rechner:
+    python party.py host --seconds 20
+    python party.py client --seconds 15      (in weiteren Terminals)
+"""
+import argparse
+import ipaddress
+import math
+import socket
+import struct
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+from analysis_state import AnalysisSnapshot, SharedAnalysisState
+
+PARTY_GROUP = '239.255.42.99'
+PARTY_PORT = 47999
+PARTY_TTL = 1                 # nur lokales Netz
+
+# Zusätzliche Render-Verzögerung im Party-Modus (auf allen Geräten gleich),
+# damit Pakete auch über WLAN vor ihrem Anzeigezeitpunkt ankommen
+PARTY_RENDER_DELAY = 0.06
+HOST_TIMEOUT = 1.5            # Sekunden ohne Paket = Host weg / Pause
+
+PING_INTERVAL = 1.0
+PING_FAST_COUNT = 8           # erste Pings schneller für einen schnellen Start
+OFFSET_SAMPLES = 16
+
+VERSION = 1
+TYPE_SNAPSHOT = 1
+TYPE_PING = 2
+TYPE_PONG = 3
+
+FLAG_PLAYING = 1
+
+# Snapshot: Kopf + n Bänder (uint8)
+#   version, type, flags, n_bands, seq, host_time, stream_time, bass, mid, treble,
+#   overall, beat_count, bpm, confidence, next_beat
+SNAPSHOT = struct.Struct('<BBBBIddBBBBIfBd')
+# Ping: version, type, client_send ; Pong: version, type, client_send, host_recv, host_send
+PING = struct.Struct('<BBd')
+PONG = struct.Struct('<BBddd')
+
+
+def level_byte(value):
+    return max(0, min(255, int(value * 255 + 0.5)))
+
+
+def encode_snapshot(snapshot, tracker=None, playing=True):
+    """Snapshot (+ Tempo/Phase des BeatTrackers) -> Paket-Bytes."""
+    bands = snapshot.bands
+    n_bands = 0 if bands is None else min(255, len(bands))
+    next_beat = math.nan
+    confidence = 0.0
+    if tracker is not None and tracker.locked:
+        next_beat = tracker.next_beat_clock(snapshot.timestamp)
+        confidence = tracker.confidence
+    head = SNAPSHOT.pack(
+        VERSION, TYPE_SNAPSHOT, FLAG_PLAYING if playing else 0, n_bands,
+        snapshot.seq & 0xffffffff, snapshot.timestamp,
+        math.nan if snapshot.stream_time is None else snapshot.stream_time,
+        level_byte(snapshot.bass), level_byte(snapshot.mid),
+        level_byte(snapshot.treble), level_byte(snapshot.overall),
+        snapshot.beat_count & 0xffffffff, snapshot.bpm, level_byte(confidence), next_beat,
+    )
+    if n_bands:
+        return head + np.clip(np.asarray(bands[:n_bands]) * 255 + 0.5, 0, 255).astype(np.uint8).tobytes()
+    return head
+
+
+def decode_snapshot(data):
+    """Paket-Bytes -> dict mit Host-Zeitstempeln (oder None bei fremden Paketen)."""
+    if len(data) < SNAPSHOT.size or data[0] != VERSION or data[1] != TYPE_SNAPSHOT:
+        return None
+    (_, _, flags, n_bands, seq, host_time, stream_time, bass, mid, treble, overall,
+     beat_count, bpm, confidence, next_beat) = SNAPSHOT.unpack_from(data)
+    bands = None
+    if n_bands and len(data) >= SNAPSHOT.size + n_bands:
+        bands = np.frombuffer(data, dtype=np.uint8, count=n_bands, offset=SNAPSHOT.size) / 255.0
+    return {
+        'playing': bool(flags & FLAG_PLAYING),
+        'seq': seq,
+        'host_time': host_time,
+        'stream_time': None if math.isnan(stream_time) else stream_time,
+        'bass': bass / 255.0,
+        'mid': mid / 255.0,
+        'treble': treble / 255.0,
+        'overall': overall / 255.0,
+        'beat_count': beat_count,
+        'bpm': bpm,
+        'confidence': confidence / 255.0,
+        'next_beat': None if math.isnan(next_beat) else next_beat,
+        'bands': bands,
+    }
+
+
+def is_multicast(address):
+    try:
+        return ipaddress.ip_address(address).is_multicast
+    except ValueError:
+        return False
+
+
+class ClockOffset:
+    """
+    Versatz Host-Uhr minus lokale Uhr aus Ping/Pong-Proben.
+    Pro Probe: offset = ((t1 - t0) + (t2 - t3)) / 2, delay = (t3 - t0) - (t2 - t1);
+    verwendet wird die Probe mit der kürzesten Laufzeit aus den letzten N.
+    """
+    def __init__(self, size=OFFSET_SAMPLES):
+        self.samples = deque(maxlen=size)
+        self.offset = 0.0
+        self.delay = None
+
+    def add(self, t0, t1, t2, t3):
+        delay = (t3 - t0) - (t2 - t1)
+        offset = ((t1 - t0) + (t2 - t3)) / 2
+        self.samples.append((delay, offset))
+        self.delay, self.offset = min(self.samples)
+        return offset, delay
+
+    @property
+    def synced(self):
+        return self.delay is not None
+
+    def to_local(self, host_time):
+        return host_time - self.offset
+
+
+class PartyHost:
+    """Sendet Snapshots per Multicast und beantwortet Pings der Gäste."""
+    def __init__(self, group=PARTY_GROUP, port=PARTY_PORT, get_tracker=None):
+        self.group = group
+        self.port = port
+        self.get_tracker = get_tracker
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
+        if is_multicast(group):
+            self.sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, PARTY_TTL)
+            self.sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_LOOP, 1)
+        self.sock.bind(('', 0))
+        self.sock.settimeout(0.5)
+        self.running = False
+        self.playing = False     # Wiedergabe am Host (set_playing)
+        self.sent = 0
+        self.pings = 0
+        self.thread = None
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self._pong_loop, daemon=True)
+        self.thread.start()
+        print(f"Party-Host sendet an {self.group}:{self.port}")
+        return self
+
+    def set_playing(self, playing, snapshot=None):
+        """Wiedergabe-Zustand des Hosts; mit `snapshot` erfahren Gäste eine Änderung sofort."""
+        changed = playing != self.playing
+        self.playing = playing
+        if changed and snapshot is not None and self.running:
+            self.send(snapshot)
+
+    def send(self, snapshot):
+        """Als SharedAnalysisState.on_publish verwendbar (läuft im Analyse-Thread)."""
+        tracker = self.get_tracker() if self.get_tracker else None
+        try:
+            self.sock.sendto(encode_snapshot(snapshot, tracker, self.playing), (self.group, self.port))
+            self.sent += 1
+        except OSError as e:
+            print(f"Party send error: {e}")
+
+    def _pong_loop(self):
+        while self.running:
+            try:
+                data, address = self.sock.recvfrom(64)
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            received = time.perf_counter()
+            if len(data) == PING.size and data[0] == VERSION and data[1] == TYPE_PING:
+                _, _, client_send = PING.unpack(data)
+                self.pings += 1
+                try:
+                    self.sock.sendto(PONG.pack(VERSION, TYPE_PONG, client_send, received,
+                                               time.perf_counter()), address)
+                except OSError as e:
+                    print(f"Party pong error: {e}")
+
+    def stop(self):
+        self.running = False
+        self.sock.close()
+        if self.thread:
+            self.thread.join(timeout=1.0)
+
+
+class RemoteBeatClock:
+    """Tempo/Phase des Hosts in lokaler Zeit; ersetzt den BeatTracker beim Gast."""
+    def __init__(self):
+        self.bpm = 0.0
+        self.period = 0.0
+        self.confidence = 0.0
+        self.next_beat = None    # lokale perf_counter()-Zeit
+
+    @property
+    def locked(self):
+        return self.period > 0 and self.next_beat is not None
+
+    def next_beat_clock(self, now=None):
+        now = time.perf_counter() if now is None else now
+        if not self.locked:
+            return None
+        if now <= self.next_beat:
+            return self.next_beat
+        # Pakete bleiben aus: Phase mit dem letzten Tempo fortschreiben
+        return self.next_beat + math.ceil((now - self.next_beat) / self.period) * self.period
+
+
+class PartyClient:
+    """
+    Empfängt Host-Snapshots und stellt sie wie ein Analyzer bereit
+    (state, beat_tracker, running), damit der Visualizer unverändert läuft.
+    """
+    def __init__(self, group=PARTY_GROUP, port=PARTY_PORT, on_playing=None):
+        self.group = group
+        self.port = port
+        self.on_playing = on_playing
+        self.state = SharedAnalysisState()
+        self.beat_tracker = RemoteBeatClock()
+        self.clock = ClockOffset()
+        self.running = False
+        self.playing = False
+        self.host = None
+        self.last_packet = 0.0
+        self.received = 0
+        self.lost = 0
+        self.last_seq = None
+        self.seq = 0
+
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        if hasattr(socket, 'SO_REUSEPORT'):
+            self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        self.sock.bind(('', port))
+        if is_multicast(group):
+            membership = struct.pack('4s4s', socket.inet_aton(group), socket.inet_aton('0.0.0.0'))
+            self.sock.setsockopt(socket.IPPROTO_IP, socket.IP_ADD_MEMBERSHIP, membership)
+        self.sock.settimeout(0.2)
+        # Eigener Unicast-Socket für Ping/Pong: der Multicast-Port wird mit
+        # SO_REUSEPORT geteilt, Unicast-Antworten landeten sonst bei einem beliebigen Gast
+        self.ping_sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
+        self.ping_sock.bind(('', 0))
+        self.ping_sock.settimeout(0.2)
+        self.threads = []
+
+    def start(self):
+        self.running = True
+        for target in (self._receive_loop, self._ping_loop, self._pong_loop):
+            thread = threading.Thread(target=target, daemon=True)
+            thread.start()
+            self.threads.append(thread)
+        print(f"Party-Gast hört auf {self.group}:{self.port}")
+        return self
+
+    def _receive_loop(self):
+        while self.running:
+            try:
+                data, address = self.sock.recvfrom(2048)
+            except socket.timeout:
+                self._check_timeout()
+                continue
+            except OSError:
+                break
+            now = time.perf_counter()
+            packet = decode_snapshot(data)
+            if packet is None:
+                continue
+            self.host = address
+            self.last_packet = now
+            self._apply(packet)
+            self._check_timeout()
+
+    def _apply(self, packet):
+        if self.last_seq is not None and packet['seq'] > self.last_seq + 1:
+            self.lost += packet['seq'] - self.last_seq - 1
+        self.last_seq = packet['seq']
+        self.received += 1
+        if not self.clock.synced:
+            return
+
+        # Host-Zeitstempel auf die lokale Uhr umrechnen
+        self.seq += 1
+        snapshot = AnalysisSnapshot(
+            self.seq, self.clock.to_local(packet['host_time']), packet['stream_time'],
+            packet['bass'], packet['mid'], packet['treble'], packet['overall'],
+            packet['beat_count'] != self.state.latest().beat_count, packet['beat_count'],
+            packet['bpm'], packet['bands'],
+        )
+        self.state.push(snapshot)
+
+        tracker = self.beat_tracker
+        tracker.bpm = packet['bpm']
+        tracker.period = 60.0 / packet['bpm'] if packet['bpm'] > 0 else 0.0
+        tracker.confidence = packet['confidence']
+        tracker.next_beat = None if packet['next_beat'] is None else self.clock.to_local(packet['next_beat'])
+
+        if packet['playing'] != self.playing:
+            self._set_playing(packet['playing'])
+
+    def _check_timeout(self):
+        if self.playing and time.perf_counter() - self.last_packet > HOST_TIMEOUT:
+            self._set_playing(False)
+
+    def _set_playing(self, playing):
+        self.playing = playing
+        if self.on_playing:
+            self.on_playing(playing)
+
+    def _pong_loop(self):
+        while self.running:
+            try:
+                data = self.ping_sock.recv(64)
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            now = time.perf_counter()
+            if len(data) == PONG.size and data[0] == VERSION and data[1] == TYPE_PONG:
+                _, _, t0, t1, t2 = PONG.unpack(data)
+                self.clock.add(t0, t1, t2, now)
+
+    def _ping_loop(self):
+        sent = 0
+        while self.running:
+            if self.host is not None:
+                try:
+                    self.ping_sock.sendto(PING.pack(VERSION, TYPE_PING, time.perf_counter()), self.host)
+                    sent += 1
+                except OSError as e:
+                    print(f"Party ping error: {e}")
+            time.sleep(0.2 if sent < PING_FAST_COUNT else PING_INTERVAL)
+
+    def stop(self):
+        self.running = False
+        self.sock.close()
+        self.ping_sock.close()
+        for thread in self.threads:
+            thread.join(timeout=1.0)
+
+
+def run_host(args):
+    """Test-Host ohne Audio: synthetische Pegel mit festem Tempo."""
+    from audio_analysis import AudioAnalyzer
+
+    analyzer = AudioAnalyzer()
+    period = 60.0 / args.bpm
+
+    class FixedTempo:
+        # Minimaler Tracker-Ersatz: Beats exakt auf dem Raster ab Start
+        locked = True
+        confidence = 1.0
+
+        def __init__(self, start):
+            self.start = start
+            self.period = period
+
+        def next_beat_clock(self, now=None):
+            now = time.perf_counter() if now is None else now
+            return self.start + math.floor((now - self.start) / period + 1) * period
+
+    start = time.perf_counter()
+    tracker = FixedTempo(start)
+    host = PartyHost(args.group, args.port, get_tracker=lambda: tracker).start()
+    host.set_playing(True)
+    analyzer.state.on_publish = host.send
+    analyzer.bpm = args.bpm
+    hop = 512 / 22050.0
+    beats = 0
+    while time.perf_counter() - start < args.seconds:
+        now = time.perf_counter()
+        count = int((now - start) / period)
+        phase = ((now - start) / period) % 1.0
+        analyzer.bass_level = max(0.0, 1.0 - phase * 3)
+        analyzer.mid_level = 0.5
+        analyzer.treble_level = 0.3
+        analyzer.overall_level = 0.6
+        analyzer.beat_detected = count != beats
+        beats = count
+        analyzer.band_levels = np.linspace(analyzer.bass_level, 0.2, 32)
+        analyzer.publish(now - start)
+        time.sleep(hop)
+    host.set_playing(False, analyzer.state.latest())
+    print(f"Host: {host.sent} Pakete, {host.pings} Pings beantwortet")
+    host.stop()
+
+
+def run_client(args):
+    """
+    Test-Gast: Versatz und Laufzeit der Uhrensynchronisation, Paketverluste und
+    wie spät Beat-Pakete gegenüber dem vorhergesagten Beat ankommen (muss unter
+    PARTY_RENDER_DELAY bleiben). Auf einem Rechner ist der wahre Versatz 0.
+    """
+    client = PartyClient(args.group, args.port).start()
+    start = time.perf_counter()
+    lateness = []
+    last_count = None
+    expected = None
+    while time.perf_counter() - start < args.seconds:
+        time.sleep(0.001)
+        now = time.perf_counter()
+        snap = client.state.latest()
+        if snap.seq == 0:
+            continue
+        if last_count is not None and snap.beat_count != last_count and expected is not None:
+            lateness.append(now - expected)
+        last_count = snap.beat_count
+        expected = client.beat_tracker.next_beat_clock(now - client.beat_tracker.period / 2) \
+            if client.beat_tracker.locked else None
+    client.stop()
+
+    delay = client.clock.delay
+    print(f"Gast: {client.received} Pakete, {client.lost} verloren, "
+          f"Versatz {client.clock.offset * 1000:+.3f} ms, "
+          f"Laufzeit {delay * 1000 if delay is not None else float('nan'):.3f} ms, "
+          f"BPM {client.beat_tracker.bpm:.1f}")
+    if lateness:
+        late = np.array(lateness) * 1000
+        print(f"Beats: {len(late)}, Ankunft nach Vorhersage Mittel {late.mean():.1f} ms, "
+              f"max {late.max():.1f} ms (Render-Verzögerung {PARTY_RENDER_DELAY * 1000:.0f} ms)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Party-Modus (Test ohne Kivy).')
+    parser.add_argument('role', choices=('host', 'client'))
+    parser.add_argument('--group', default=PARTY_GROUP)
+    parser.add_argument('--port', type=int, default=PARTY_PORT)
+    parser.add_argument('--seconds', type=float, default=10.0)
+    parser.add_argument('--bpm', type=float, default=128.0)
+    args = parser.parse_args(argv)
+    if args.role == 'host':
+        run_host(args)
+    else:
+        run_client(args)
+
+
+if __name__ == '__main__':
+    main()
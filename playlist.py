@@ -0,0 +1,122 @@
+"""
+Wiedergabe-Warteschlange über den Song-Katalog.
+Reihenfolge (normal oder gemischt), Auto-Weiter und Wiederholung. Der nächste
+Titel steht schon vorher fest, damit er vorgeladen werden kann.
+"""
+import random
+
+
+class PlayQueue:
+    def __init__(self, names, shuffle=False, repeat=True, seed=None):
+        self.names = list(names)
+        self.repeat = repeat
+        self.rng = random.Random(seed)
+        self.shuffle = False
+        self.order = list(range(len(self.names)))
+        self.pos = 0
+        self.pending = None   # Reihenfolge der nächsten Runde (bei Wiederholung)
+        if shuffle:
+            self.set_shuffle(True)
+
+    def __len__(self):
+        return len(self.names)
+
+    @property
+    def current(self):
+        if not self.names:
+            return None
+        return self.names[self.order[self.pos]]
+
+    def jump_to(self, name):
+        """Setzt die Position auf `name` (z.B. nach manueller Auswahl)."""
+        if name not in self.names:
+            return False
+        self.pos = self.order.index(self.names.index(name))
+        return True
+
+    def _next_order(self):
+        if self.pending is None:
+            order = list(range(len(self.names)))
+            if self.shuffle:
+                self.rng.shuffle(order)
+                # Denselben Song nicht zweimal hintereinander
+                if len(order) > 1 and order[0] == self.order[self.pos]:
+                    order[0], order[-1] = order[-1], order[0]
+            self.pending = order
+        return self.pending
+
+    def peek_next(self):
+        """Nächster Titel, ohne weiterzuschalten (None am Ende ohne Wiederholung)."""
+        if not self.names:
+            return None
+        if self.pos + 1 < len(self.order):
+            return self.names[self.order[self.pos + 1]]
+        if not self.repeat:
+            return None
+        return self.names[self._next_order()[0]]
+
+    def advance(self):
+        """Schaltet weiter und gibt den neuen aktuellen Titel zurück."""
+        if not self.names:
+            return None
+        if self.pos + 1 < len(self.order):
+            self.pos += 1
+        elif self.repeat:
+            self.order = self._next_order()
+            self.pending = None
+            self.pos = 0
+        else:
+            return None
+        return self.current
+
+    def set_names(self, names):
+        """
+        Neuer Katalog (z.B. Bibliothek geändert); der aktuelle Titel bleibt aktuell.
+        Gemischt bleibt die Reihenfolge erhalten: entfernte Titel fallen raus, neue
+        landen an zufälligen Stellen im noch nicht gespielten Rest der Runde
+        (nach dem nächsten Titel, damit dessen Vorladen weiterläuft).
+        """
+        current = self.current
+        old_names = self.names
+        self.names = list(names)
+        if not self.shuffle or not old_names:
+            self.order = list(range(len(self.names)))
+            self.pos = self.names.index(current) if current in self.names else 0
+            self.pending = None
+            if self.shuffle:
+                self.set_shuffle(True)
+            return
+
+        index = {name: i for i, name in enumerate(self.names)}
+        known = set(old_names)
+        added = [index[name] for name in self.names if name not in known]
+        played = [index[old_names[i]] for i in self.order[:self.pos + 1] if old_names[i] in index]
+        rest = [index[old_names[i]] for i in self.order[self.pos + 1:] if old_names[i] in index]
+        # Hinter dem nächsten Titel einfügen: der ist evtl. schon vorgeladen
+        for i in added:
+            rest.insert(self.rng.randint(min(1, len(rest)), len(rest)), i)
+        self.order = played + rest
+        # Aktueller Titel entfernt: der nächste übrig gebliebene rückt nach
+        pos = len(played) - 1 if current in index else len(played)
+        self.pos = max(0, min(pos, len(self.order) - 1))
+        if self.pending is not None:
+            pending = [index[old_names[i]] for i in self.pending if old_names[i] in index]
+            for i in added:
+                pending.insert(self.rng.randint(min(1, len(pending)), len(pending)), i)
+            self.pending = pending
+
+    def set_shuffle(self, shuffle):
+        """Mischt den Rest der Runde neu (der aktuelle Titel bleibt aktuell)."""
+        self.shuffle = shuffle
+        self.pending = None
+        if not self.names:
+            return
+        cur = self.order[self.pos]
+        if shuffle:
+            rest = [i for i in range(len(self.names)) if i != cur]
+            self.rng.shuffle(rest)
+            self.order = [cur] + rest
+            self.pos = 0
+        else:
+            self.order = list(range(len(self.names)))
+            self.pos = cur
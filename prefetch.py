@@ -0,0 +1,176 @@
+"""
+Hintergrund-Prefetch für den Song-Katalog.
+Lädt Songs über einen kleinen Thread-Pool mit Parallelitäts-Limit herunter,
+der ausgewählte Song und die folgenden zuerst.
+"""
+import heapq
+import itertools
+import threading
+
+QUEUED = 'queued'
+DOWNLOADING = 'downloading'
+DONE = 'done'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+
+
+class PrefetchCancelled(Exception):
+    """Wird im Download-Callback ausgelöst, wenn der Eintrag abgebrochen wurde."""
+
+
+class PrefetchItem:
+    """Ein Song in der Prefetch-Queue."""
+    def __init__(self, name, url, priority):
+        self.name = name
+        self.url = url
+        self.priority = priority
+        self.state = QUEUED
+        self.progress = 0.0
+        self.path = None
+        self.error = None
+        self.done = threading.Event()
+        self.cancel_event = threading.Event()
+
+    @property
+    def finished(self):
+        return self.state in (DONE, FAILED, CANCELLED)
+
+
+class Prefetcher:
+    """
+    `download_func(url, progress, cancel_event)` lädt einen Song und gibt den
+    lokalen Pfad zurück; `progress(fraction)` meldet den Fortschritt.
+    `on_progress(item)` wird (im Worker-Thread) bei jeder Änderung aufgerufen.
+    """
+    def __init__(self, download_func, max_workers=2, on_progress=None):
+        self.download_func = download_func
+        self.max_workers = max_workers
+        self.on_progress = on_progress
+        self.items = {}
+        self.heap = []
+        self.counter = itertools.count()
+        self.cond = threading.Condition()
+        self.workers = []
+        self.closed = False
+
+    def enqueue(self, catalog, selected=None):
+        """Reiht alle Songs aus `catalog` (Name -> URL) ein, `selected` zuerst."""
+        with self.cond:
+            for name, url in catalog.items():
+                if name not in self.items or self.items[name].state in (FAILED, CANCELLED):
+                    self.items[name] = PrefetchItem(name, url, len(self.items))
+            self._reprioritize(list(catalog), selected)
+        self._start_workers()
+
+    def prioritize(self, names, selected):
+        """Sortiert die Queue neu: `selected`, dann die folgenden Songs in Katalog-Reihenfolge."""
+        with self.cond:
+            self._reprioritize(names, selected)
+
+    def _reprioritize(self, names, selected):
+        if selected in names:
+            start = names.index(selected)
+            names = names[start:] + names[:start]
+        for priority, name in enumerate(names):
+            item = self.items.get(name)
+            if item and item.state == QUEUED:
+                item.priority = priority
+        # Heap neu aufbauen (maximal ein paar Dutzend Einträge)
+        self.heap = [(item.priority, next(self.counter), item)
+                     for item in self.items.values() if item.state == QUEUED]
+        heapq.heapify(self.heap)
+        self.cond.notify_all()
+
+    def request(self, name, url):
+        """Stellt sicher, dass `name` als Nächstes geladen wird, und gibt den Eintrag zurück."""
+        with self.cond:
+            item = self.items.get(name)
+            if item is None or item.state in (FAILED, CANCELLED):
+                item = PrefetchItem(name, url, -1)
+                self.items[name] = item
+            if item.state == QUEUED:
+                item.priority = -1
+                heapq.heappush(self.heap, (item.priority, next(self.counter), item))
+                self.cond.notify_all()
+        self._start_workers()
+        return item
+
+    def get(self, name):
+        return self.items.get(name)
+
+    def cancel(self, name=None):
+        """Bricht einen Eintrag (oder alle) ab."""
+        with self.cond:
+            if name is None:
+                targets = list(self.items.values())
+            else:
+                targets = [self.items[name]] if name in self.items else []
+            for item in targets:
+                if not item.finished:
+                    item.cancel_event.set()
+                    if item.state == QUEUED:
+                        self._finish(item, CANCELLED)
+
+    def shutdown(self):
+        self.cancel()
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
+
+    def _start_workers(self):
+        with self.cond:
+            self.workers = [w for w in self.workers if w.is_alive()]
+            while len(self.workers) < self.max_workers:
+                worker = threading.Thread(target=self._worker, daemon=True)
+                self.workers.append(worker)
+                worker.start()
+
+    def _next_item(self):
+        with self.cond:
+            while not self.closed:
+                while self.heap:
+                    _, _, item = heapq.heappop(self.heap)
+                    if item.state == QUEUED:
+                        item.state = DOWNLOADING
+                        return item
+                self.cond.wait()
+        return None
+
+    def _worker(self):
+        while True:
+            item = self._next_item()
+            if item is None:
+                return
+            self._notify(item)
+
+            def progress(fraction, item=item):
+                if item.cancel_event.is_set():
+                    raise PrefetchCancelled(item.name)
+                item.progress = fraction
+                self._notify(item)
+
+            try:
+                path = self.download_func(item.url, progress, item.cancel_event)
+                if item.cancel_event.is_set():
+                    self._finish(item, CANCELLED)
+                elif path:
+                    item.path = path
+                    item.progress = 1.0
+                    self._finish(item, DONE)
+                else:
+                    self._finish(item, FAILED)
+            except Exception as e:
+                item.error = e
+                self._finish(item, CANCELLED if item.cancel_event.is_set() else FAILED)
+
+    def _finish(self, item, state):
+        item.state = state
+        item.done.set()
+        self._notify(item)
+
+    def _notify(self, item):
+        if self.on_progress:
+            try:
+                self.on_progress(item)
+            except Exception as e:
+                print(f"Prefetch progress error: {e}")
@@ -0,0 +1,176 @@
+"""
+Progressiver Download für Streaming-Wiedergabe.
+Füllt die Cache-Datei häppchenweise; Wiedergabe und Analyse können starten,
+sobald ein kurzer Anfangspuffer da ist. Unterläufe (Wiedergabe schneller als
+Download) werden gezählt. Leser halten die Datei nur während eines Lesezugriffs
+offen, damit sie mit promote() verschoben werden kann (Windows sperrt offene Dateien).
+"""
+import os
+import threading
+import time
+import urllib.request
+
+from metrics import METRICS
+
+USER_AGENT = 'Mozilla/5.0 (ChristmasDisco)'
+
+
+class ProgressiveDownload:
+    """Lädt `url` in Chunks nach `path` und meldet Fortschritt über Events."""
+    def __init__(self, url, path, initial_bytes=128 * 1024, chunk_size=64 * 1024, timeout=30):
+        self.url = url
+        self.path = path
+        self.initial_bytes = initial_bytes
+        self.chunk_size = chunk_size
+        self.timeout = timeout
+
+        self.bytes_written = 0
+        self.total_bytes = None
+        self.error = None
+        self.underruns = 0
+        self.started_at = None
+        self.ready_at = None
+
+        self.ready = threading.Event()      # Anfangspuffer vorhanden
+        self.complete = threading.Event()   # Datei vollständig (oder Fehler)
+        self.cancelled = threading.Event()
+        self.cond = threading.Condition()
+        self.file_lock = threading.Lock()   # Lesen vs. Verschieben der Datei
+        self.thread = None
+
+    def start(self):
+        self.started_at = time.time()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+        return self
+
+    def _run(self):
+        request = urllib.request.Request(self.url, headers={'User-Agent': USER_AGENT})
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response, \
+                    open(self.path, 'wb') as f:
+                length = response.headers.get('Content-Length')
+                self.total_bytes = int(length) if length else None
+
+                while not self.cancelled.is_set():
+                    # read1: liefert, was da ist - Abbruch greift auch bei langsamen Servern sofort
+                    block = response.read1(self.chunk_size)
+                    if not block:
+                        break
+                    f.write(block)
+                    f.flush()
+                    with self.cond:
+                        self.bytes_written += len(block)
+                        self.cond.notify_all()
+                    METRICS.rate('download.bytes', len(block))
+                    if not self.ready.is_set() and self.bytes_written >= self.initial_bytes:
+                        self._mark_ready()
+
+            if self.total_bytes and self.bytes_written < self.total_bytes and not self.cancelled.is_set():
+                raise IOError(f"Download unvollständig: {self.bytes_written}/{self.total_bytes}")
+        except Exception as e:
+            self.error = e
+            print(f"Progressive download error: {e}")
+        finally:
+            if self.total_bytes is None and self.error is None:
+                self.total_bytes = self.bytes_written
+            self._mark_ready()
+            with self.cond:
+                self.complete.set()
+                self.cond.notify_all()
+
+    def _mark_ready(self):
+        if not self.ready.is_set():
+            self.ready_at = time.time()
+            self.ready.set()
+
+    @property
+    def ok(self):
+        return self.complete.is_set() and self.error is None and not self.cancelled.is_set()
+
+    @property
+    def time_to_ready(self):
+        if self.ready_at is None or self.started_at is None:
+            return None
+        return self.ready_at - self.started_at
+
+    def wait_ready(self, timeout=None):
+        """Wartet auf den Anfangspuffer. True wenn abspielbar."""
+        self.ready.wait(timeout)
+        return self.ready.is_set() and self.bytes_written > 0 and not self.cancelled.is_set()
+
+    def fraction(self):
+        if not self.total_bytes:
+            return 1.0 if self.complete.is_set() else 0.0
+        return min(1.0, self.bytes_written / self.total_bytes)
+
+    def has_data_for(self, position, duration, margin=2.0):
+        """
+        Prüft ob die Daten bis `position + margin` Sekunden (bei gleichmäßiger
+        Bitrate) schon geladen sind.
+        """
+        if self.complete.is_set() or not self.total_bytes or not duration:
+            return True
+        needed = min(1.0, (position + margin) / duration) * self.total_bytes
+        return self.bytes_written >= needed
+
+    def reader(self, chunk_size=32 * 1024, batch_chunks=4):
+        """Liest die wachsende Datei von vorne; blockiert bis neue Daten da sind."""
+        if not self.wait_ready():
+            return
+        offset = 0
+        while not self.cancelled.is_set():
+            with self.cond:
+                while (offset >= self.bytes_written and not self.complete.is_set()
+                       and not self.cancelled.is_set()):
+                    self.cond.wait(0.5)
+                available = self.bytes_written - offset
+                done = self.complete.is_set()
+            if available <= 0:
+                if done:
+                    return
+                continue
+            # Pro Häppchen öffnen (self.path kann sich durch promote() geändert haben);
+            # nicht mit gehaltenem Lock yielden
+            blocks = []
+            with self.file_lock:
+                with open(self.path, 'rb') as f:
+                    f.seek(offset)
+                    for _ in range(batch_chunks):
+                        block = f.read(min(chunk_size, available))
+                        if not block:
+                            break
+                        blocks.append(block)
+                        offset += len(block)
+                        available -= len(block)
+                        if available <= 0:
+                            break
+            if not blocks:
+                # Datei kürzer als gemeldet (abgeschnitten/ersetzt): nicht endlos warten
+                return
+            for block in blocks:
+                yield block
+
+    def promote(self, move):
+        """
+        Verschiebt die fertige Datei mit `move(path) -> neuer Pfad` (z.B. cache.put),
+        während kein Leser sie offen hat. Laufende Leser lesen danach am neuen Ort weiter.
+        """
+        with self.file_lock:
+            new_path = move(self.path)
+            self.path = new_path
+        return new_path
+
+    def cancel(self):
+        keep = self.ok
+        self.cancelled.set()
+        self.ready.set()     # wait_ready() sofort aufwecken (liefert dann False)
+        with self.cond:
+            self.cond.notify_all()
+        if self.thread and self.thread is not threading.current_thread():
+            self.thread.join(timeout=2.0)
+        if not keep and os.path.exists(self.path):
+            try:
+                os.remove(self.path)
+            except OSError as e:
+                print(f"Progressive cleanup error: {e}")
@@ -0,0 +1,371 @@
+"""
+Aufnahme und Wiedergabe von Analyse-Sitzungen für reproduzierbare Profile.
+Die Aufnahme hängt sich an SharedAnalysisState.on_publish und schreibt jeden
+Snapshot mit Zeitstempel in eine kompakte Binärdatei, zusammen mit dem
+Effekt-Seed und der Fenstergröße. Die Wiedergabe speist die Snapshots wieder
+in einen DiscoVisualizer (gleicher Seed, feste Qualitätsstufe) - entweder im
+Tempo der Aufnahme oder so schnell wie möglich mit festem dt - und misst
+update() und Zeichnen pro Frame. Zwei Builds lassen sich so auf demselben
+Gerät mit identischer Eingabe vergleichen. Tempo und nächster Beat des
+BeatTracker werden mit aufgenommen und bei der Wiedergabe über eine
+RemoteBeatClock (wie beim Party-Gast) bereitgestellt, damit predict_beat
+denselben Code durchläuft wie live.
+
+Aufnahme in der App:  XMAS_RECORD=sitzung.xrec python Merry_Xmas.py
+Wiedergabe:           python session_replay.py sitzung.xrec [--realtime] [--out profil.json]
+                      python session_replay.py sitzung.xrec --baseline alt.json
+
+Dateiformat (little endian):
+    Kopf:    b'XREC', version (uint16), seed (uint32), breite, höhe (uint16),
+             erstellt (float64, time.time())
+    Eintrag: t (float64, Sekunden seit Aufnahmebeginn), stream_time (float32,
+             NaN = keine), bass, mid, treble, overall (uint16, 0..1 * 65535),
+             beat_count (uint32), bpm (float32), next_beat (float64, Sekunden
+             seit Aufnahmebeginn, NaN = kein Tempo), period (float32),
+             confidence (float32), flags (uint8, 1 = Beat), n_bands (uint8),
+             danach n_bands Bänder (uint8, 0..1 * 255)
+Version 1 (ohne next_beat/period/confidence) wird weiter gelesen.
+Ein abgebrochener letzter Eintrag (Absturz) wird beim Lesen ignoriert.
+"""
+import argparse
+import json
+import math
+import os
+import struct
+import sys
+import threading
+import time
+
+HEADER = struct.Struct('<4sHIHHd')
+RECORD = struct.Struct('<dfHHHHIfdffBB')
+RECORD_V1 = struct.Struct('<dfHHHHIfBB')
+MAGIC = b'XREC'
+VERSION = 2
+FLAG_BEAT = 1
+
+LEVEL_SCALE = 65535
+BAND_SCALE = 255
+DEFAULT_QUALITY = 'high'
+DEFAULT_SIZE = (720, 1280)
+
+
+def level_word(value):
+    return max(0, min(LEVEL_SCALE, int(value * LEVEL_SCALE + 0.5)))
+
+
+class SessionRecorder:
+    """
+    Schreibt den Snapshot-Strom eines SharedAnalysisState mit. `attach()` kettet
+    sich vor einen schon gesetzten on_publish-Callback (z.B. Party-Host).
+    Geschrieben wird im Analyse-Thread; die Datei ist gepuffert. `get_tracker`
+    liefert den aktuellen BeatTracker (wechselt pro Song) für die Beat-Felder.
+    """
+    def __init__(self, path, seed=0, size=(0, 0), get_tracker=None):
+        self.path = path
+        self.file = open(path, 'wb')
+        self.file.write(HEADER.pack(MAGIC, VERSION, (seed or 0) & 0xffffffff,
+                                    int(size[0]) & 0xffff, int(size[1]) & 0xffff, time.time()))
+        self.lock = threading.Lock()
+        self.started = time.perf_counter()
+        self.count = 0
+        self.get_tracker = get_tracker
+        self.state = None
+        self.forward = None
+
+    def attach(self, state):
+        self.detach()
+        self.state = state
+        self.forward = state.on_publish
+        state.on_publish = self.record
+        return self
+
+    def detach(self):
+        if self.state is not None and self.state.on_publish == self.record:
+            self.state.on_publish = self.forward
+        self.state = None
+        self.forward = None
+
+    def record(self, snapshot):
+        bands = snapshot.bands
+        n_bands = 0 if bands is None else min(255, len(bands))
+        tracker = self.get_tracker() if self.get_tracker else None
+        next_beat, period, confidence = math.nan, 0.0, 0.0
+        if tracker is not None and tracker.locked:
+            next_beat = tracker.next_beat_clock(snapshot.timestamp) - self.started
+            period, confidence = tracker.period, tracker.confidence
+        data = RECORD.pack(
+            snapshot.timestamp - self.started,
+            math.nan if snapshot.stream_time is None else snapshot.stream_time,
+            level_word(snapshot.bass), level_word(snapshot.mid),
+            level_word(snapshot.treble), level_word(snapshot.overall),
+            snapshot.beat_count & 0xffffffff, snapshot.bpm, next_beat, period, confidence,
+            FLAG_BEAT if snapshot.beat else 0, n_bands,
+        )
+        if n_bands:
+            import numpy as np
+            data += np.clip(np.asarray(bands[:n_bands]) * BAND_SCALE + 0.5, 0, BAND_SCALE).astype(np.uint8).tobytes()
+        with self.lock:
+            if self.file is not None:
+                self.file.write(data)
+                self.count += 1
+        if self.forward is not None:
+            self.forward(snapshot)
+
+    def close(self):
+        self.detach()
+        with self.lock:
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+        print(f"Sitzung aufgenommen: {self.count} Snapshots in {self.path}")
+
+
+class Session:
+    """
+    Eine gelesene Aufnahme: Kopfdaten, die Snapshots (timestamp = t seit Beginn)
+    und pro Snapshot (next_beat, period, confidence) - next_beat None ohne Tempo.
+    """
+    def __init__(self, seed, size, created, snapshots, beats=None):
+        self.seed = seed
+        self.size = size
+        self.created = created
+        self.snapshots = snapshots
+        self.beats = beats if beats is not None else [(None, 0.0, 0.0)] * len(snapshots)
+
+    def __len__(self):
+        return len(self.snapshots)
+
+    @property
+    def duration(self):
+        return self.snapshots[-1].timestamp if self.snapshots else 0.0
+
+    @property
+    def render_size(self):
+        return self.size if all(self.size) else DEFAULT_SIZE
+
+    @classmethod
+    def load(cls, path):
+        import numpy as np
+        from analysis_state import AnalysisSnapshot
+
+        with open(path, 'rb') as f:
+            data = f.read()
+        if len(data) < HEADER.size or data[:4] != MAGIC:
+            raise ValueError(f"Keine Sitzungs-Aufnahme: {path}")
+        _, version, seed, width, height, created = HEADER.unpack_from(data)
+        if version not in (1, VERSION):
+            raise ValueError(f"Aufnahme-Version {version} nicht unterstützt: {path}")
+        record = RECORD if version == VERSION else RECORD_V1
+
+        snapshots = []
+        beats = []
+        offset = HEADER.size
+        while offset + record.size <= len(data):
+            if version == VERSION:
+                (t, stream_time, bass, mid, treble, overall, beat_count, bpm,
+                 next_beat, period, confidence, flags, n_bands) = record.unpack_from(data, offset)
+            else:
+                (t, stream_time, bass, mid, treble, overall,
+                 beat_count, bpm, flags, n_bands) = record.unpack_from(data, offset)
+                next_beat, period, confidence = math.nan, 0.0, 0.0
+            offset += record.size
+            bands = None
+            if n_bands:
+                if offset + n_bands > len(data):
+                    break
+                bands = np.frombuffer(data, dtype=np.uint8, count=n_bands, offset=offset) / float(BAND_SCALE)
+                offset += n_bands
+            snapshots.append(AnalysisSnapshot(
+                len(snapshots) + 1, t, None if math.isnan(stream_time) else stream_time,
+                bass / LEVEL_SCALE, mid / LEVEL_SCALE, treble / LEVEL_SCALE, overall / LEVEL_SCALE,
+                bool(flags & FLAG_BEAT), beat_count, bpm, bands,
+            ))
+            beats.append((None if math.isnan(next_beat) else next_beat, period, confidence))
+        return cls(seed, (width, height), created, snapshots, beats)
+
+
+class SessionFeed:
+    """
+    Gibt die Snapshots einer Session bis zur Sitzungszeit `t` an einen State
+    weiter und stellt Tempo/nächsten Beat auf einer RemoteBeatClock ein.
+    """
+    def __init__(self, session):
+        self.session = session
+        self.pos = 0
+        self.beat = (None, 0.0, 0.0)
+
+    @property
+    def finished(self):
+        return self.pos >= len(self.session.snapshots)
+
+    def feed(self, state, t, base=0.0, tracker=None):
+        """
+        Schiebt alle Snapshots mit Zeitstempel <= t nach `state` (Zeitstempel + base).
+        `tracker` bekommt den zuletzt aufgenommenen nächsten Beat (ebenfalls + base).
+        """
+        snapshots = self.session.snapshots
+        pushed = 0
+        while self.pos < len(snapshots) and snapshots[self.pos].timestamp <= t:
+            snapshot = snapshots[self.pos]
+            state.push(snapshot._replace(timestamp=base + snapshot.timestamp))
+            self.beat = self.session.beats[self.pos]
+            self.pos += 1
+            pushed += 1
+        if tracker is not None:
+            next_beat, period, confidence = self.beat
+            tracker.bpm = state.latest().bpm
+            tracker.period = period
+            tracker.confidence = confidence
+            tracker.next_beat = None if next_beat is None else base + next_beat
+        return pushed
+
+
+def percentile(values, q):
+    import numpy as np
+    return float(np.percentile(values, q)) if len(values) else 0.0
+
+
+class ReplayProfiler:
+    """
+    Treibt einen DiscoVisualizer aus einer Session und misst pro Frame update()
+    und das Zeichnen in ein FBO. Ohne `realtime` mit festem dt so schnell wie
+    möglich (render_delay 0, virtuelle Uhr des Visualizers = Sitzungszeit, bei
+    gleichem Build bitgleiche Eingaben); mit
+    `realtime` im Tempo der Aufnahme und mit derselben Interpolation wie live.
+    Der Analyzer bekommt eine RemoteBeatClock als beat_tracker: predict_beat
+    läuft wie live auf den aufgenommenen Beats.
+    """
+    def __init__(self, session, size=None, quality=DEFAULT_QUALITY, renderer='canvas',
+                 fps=None, realtime=False):
+        from kivy.graphics import Fbo
+        from Merry_Xmas import DiscoVisualizer, RENDER_DELAY
+        from frame_scheduler import QUALITY_TIERS
+        from audio_analysis import AudioAnalyzer
+        from party import RemoteBeatClock
+
+        tier = {t['name']: t for t in QUALITY_TIERS}[quality]
+        self.session = session
+        self.size = size or session.render_size
+        self.fps = fps or tier['fps']
+        self.realtime = realtime
+        self.quality = quality
+
+        self.analyzer = AudioAnalyzer()
+        self.analyzer.beat_tracker = RemoteBeatClock()
+        self.visualizer = DiscoVisualizer(size_hint=(None, None), size=self.size, pos=(0, 0))
+        self.visualizer.analyzer = self.analyzer
+        self.visualizer.render_delay = RENDER_DELAY if realtime else 0
+        self.visualizer.create_effects(seed=session.seed, renderer=renderer)
+        self.visualizer.apply_quality(tier)
+        # Feste Qualität: Compositor schaltet nichts nach Render-Zeit ab
+        self.visualizer.compositor.budget = None
+        self.fbo = Fbo(size=self.size)
+
+    def run(self):
+        import numpy as np
+
+        dt = 1.0 / self.fps
+        total = int(self.session.duration * self.fps) + 1
+        update_ms = np.zeros(total)
+        draw_ms = np.zeros(total)
+        feed = SessionFeed(self.session)
+        state = self.analyzer.state
+        visualizer = self.visualizer
+
+        started = time.perf_counter()
+        base = started
+        self.now = base
+        if not self.realtime:
+            # Schnellmodus: Snapshots und Beat-Vorhersage sehen die Sitzungszeit
+            visualizer.clock = lambda: self.now
+        for i in range(total):
+            t = i * dt
+            if self.realtime:
+                wait = started + t - time.perf_counter()
+                if wait > 0:
+                    time.sleep(wait)
+            self.now = base + t
+            feed.feed(state, t, base, self.analyzer.beat_tracker)
+
+            t0 = time.perf_counter()
+            visualizer.update(dt)
+            t1 = time.perf_counter()
+            self.fbo.add(visualizer.canvas)
+            self.fbo.draw()
+            self.fbo.remove(visualizer.canvas)
+            t2 = time.perf_counter()
+            update_ms[i] = (t1 - t0) * 1000
+            draw_ms[i] = (t2 - t1) * 1000
+        return self.report(update_ms, draw_ms, time.perf_counter() - started)
+
+    def report(self, update_ms, draw_ms, elapsed):
+        frame_ms = update_ms + draw_ms
+        mode = 'realtime' if self.realtime else 'max'
+        print(f"=== Replay ({mode}, {self.quality}, {self.visualizer.renderer}): "
+              f"{len(frame_ms)} Frames in {elapsed:.2f}s, Seed {self.session.seed} ===")
+        results = []
+        for name, values in (('update', update_ms), ('draw', draw_ms), ('frame', frame_ms)):
+            stats = {'mean': float(values.mean()) if len(values) else 0.0,
+                     'p50': percentile(values, 50), 'p95': percentile(values, 95),
+                     'p99': percentile(values, 99), 'max': float(values.max()) if len(values) else 0.0}
+            print(f"  {name:7s} " + '  '.join(f"{key} {value:7.3f}" for key, value in stats.items()) + " ms")
+            for key, value in stats.items():
+                results.append({'name': f'replay.{name}.{key}', 'value': value,
+                                'unit': 'ms', 'higher_is_better': False})
+        for effect in self.visualizer.compositor.report():
+            print(f"  effect {effect['name']:12s} {effect['cost_ms']:7.3f} ms (Stufe {effect['level']})")
+            results.append({'name': f"replay.effect.{effect['name']}", 'value': effect['cost_ms'],
+                            'unit': 'ms', 'higher_is_better': False})
+        return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Spielt eine Sitzungs-Aufnahme in den Visualizer und misst Frame-Zeiten.')
+    parser.add_argument('session', help='Aufnahme (XMAS_RECORD=...)')
+    parser.add_argument('--realtime', action='store_true', help='Im Tempo der Aufnahme statt so schnell wie möglich')
+    parser.add_argument('--quality', choices=('low', 'medium', 'high', 'ultra'), default=DEFAULT_QUALITY)
+    parser.add_argument('--renderer', choices=('canvas', 'shader'), default='canvas')
+    parser.add_argument('--fps', type=int, default=None, help='Standard: Ziel-FPS der Qualitätsstufe')
+    parser.add_argument('--out', default=None, help='Ergebnisse als JSON (Format wie benchmarks.py)')
+    parser.add_argument('--baseline', help='Frühere Ergebnisse zum Vergleich')
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help='Erlaubte Verschlechterung (0.25 = 25%%)')
+    args = parser.parse_args(argv)
+
+    session = Session.load(args.session)
+    if not session.snapshots:
+        print(f"❌ Aufnahme ohne Snapshots: {args.session}")
+        return 1
+
+    # Vor dem ersten Kivy-Import: keine Kivy-Argumente, kein sichtbares Fenster
+    os.environ.setdefault('KIVY_NO_ARGS', '1')
+    if sys.platform.startswith('linux') and not os.environ.get('DISPLAY') and not os.environ.get('WAYLAND_DISPLAY'):
+        os.environ.setdefault('SDL_VIDEODRIVER', 'offscreen')
+    from kivy.config import Config
+    Config.set('graphics', 'window_state', 'hidden')
+    Config.set('graphics', 'width', str(session.render_size[0]))
+    Config.set('graphics', 'height', str(session.render_size[1]))
+
+    profiler = ReplayProfiler(session, quality=args.quality, renderer=args.renderer,
+                              fps=args.fps, realtime=args.realtime)
+    results = profiler.run()
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            json.dump({'created': time.time(), 'session': os.path.basename(args.session),
+                       'seed': session.seed, 'results': results}, f, indent=1)
+        print(f"Ergebnisse: {args.out}")
+
+    if args.baseline:
+        from benchmarks import compare
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        for name, before, after, change in regressions:
+            print(f"❌ Regression {name}: {before:.3f} -> {after:.3f} (+{change * 100:.0f}%)")
+        if regressions:
+            return 1
+        print(f"✅ Keine Regression über {args.threshold * 100:.0f}%")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
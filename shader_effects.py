@@ -0,0 +1,149 @@
+"""
+GPU-Renderpfad: Hintergrund-Glühen, pulsierender Bass-Kreis, Beat-Ringe und
+Schnee in einem einzigen Fragment-Shader (Kivy RenderContext + GLSL).
+Python setzt pro Frame nur ein gutes Dutzend Uniforms (Pegel, Zeit, Ring-Radien,
+Fallweg); die Kosten bleiben damit konstant, egal wie viele Flocken oder Ringe
+gezeichnet werden. Der Shader hält sich an GLSL ES 1.00 (keine Integer-
+Arithmetik, nur konstante Schleifen) und läuft damit auch unter Mesa
+(llvmpipe), z.B. headless:
+
+    LIBGL_ALWAYS_SOFTWARE=1 xvfb-run python headless_render.py song.m4a --renderer shader
+
+Kompilier-Check (Exit 1 bei Fehler, ohne GL-Kontext übersprungen bzw. mit
+--require-gl ebenfalls Exit 1; ohne Display rendert SDL offscreen):
+
+    LIBGL_ALWAYS_SOFTWARE=1 python shader_effects.py --require-gl
+"""
+import math
+import os
+import sys
+
+if __name__ == '__main__':
+    import importlib.util
+    if importlib.util.find_spec('kivy') is None:
+        print("Shader-Check übersprungen: Kivy nicht installiert")
+        sys.exit(1 if '--require-gl' in sys.argv[1:] else 0)
+    # Vor dem ersten Kivy-Import: keine Kivy-Argumente, ohne Display offscreen
+    os.environ.setdefault('KIVY_NO_ARGS', '1')
+    if sys.platform.startswith('linux') and not os.environ.get('DISPLAY') and not os.environ.get('WAYLAND_DISPLAY'):
+        os.environ.setdefault('SDL_VIDEODRIVER', 'offscreen')
+
+from kivy.graphics import Color, Rectangle, RenderContext
+
+from effects import Effect
+from shader_source import FRAGMENT_SHADER, RING_FADE, RING_SLOTS, SNOW_FILL
+
+
+def compile_shader():
+    """Kompiliert FRAGMENT_SHADER im aktuellen GL-Kontext; gibt den RenderContext zurück."""
+    context = RenderContext(use_parent_projection=True, use_parent_modelview=True)
+    context.shader.fs = FRAGMENT_SHADER
+    return context
+
+
+class ShaderSceneEffect(Effect):
+    """
+    Ersetzt BassCircleEffect, BeatWavesEffect und SnowEffect durch ein Rechteck
+    mit Fragment-Shader. Detailstufen = Schnee-Ebenen, Ringe nach Qualitätsstufe.
+    """
+    name = 'gpu_scene'
+    priority = 10
+    optional = False
+    levels = 3
+
+    def __init__(self):
+        super().__init__()
+        self.group = compile_shader()
+        self.compiled = bool(self.group.shader.success)
+        self.max_rings = 3
+        self.snowflakes = 50
+        self.rings = [0.0] * RING_SLOTS
+        self.fall = 0.0
+        self.time = 0.0
+        self.glow = 1.0
+
+    def setup(self, visualizer):
+        self.colors = visualizer.colors
+        self.visualizer = visualizer
+        with self.group:
+            Color(1, 1, 1, 1)
+            self.rect = Rectangle(pos=visualizer.pos, size=visualizer.size)
+
+    def apply_tier(self, tier):
+        self.max_rings = min(RING_SLOTS, tier['waves'])
+        self.snowflakes = tier['snowflakes']
+        self.glow = 0.0 if tier['name'] == 'low' else 1.0
+        for i in range(self.max_rings, RING_SLOTS):
+            self.rings[i] = 0.0
+
+    def snow_cell(self, width, height):
+        """Rastergröße, bei der alle Ebenen zusammen etwa `snowflakes` Flocken zeigen."""
+        layers = self.level + 1
+        return max(12.0, math.sqrt(width * height * SNOW_FILL * layers / max(self.snowflakes, 1)))
+
+    def update(self, frame):
+        snapshot = frame.snapshot
+        rc = self.group
+        width, height = float(frame.width), float(frame.height)
+        self.rect.pos = (frame.cx - width / 2, frame.cy - height / 2)
+        self.rect.size = (width, height)
+
+        # Ringe wie BeatWavesEffect, nur als Radien statt Line-Instruktionen
+        rings = self.rings
+        for i in range(self.max_rings):
+            if frame.beat and rings[i] == 0:
+                rings[i] = frame.radius
+            if rings[i] > 0:
+                rings[i] += 15 * frame.steps
+                if rings[i] >= RING_FADE:
+                    rings[i] = 0.0
+
+        self.time += frame.dt
+        self.fall += (1 + snapshot.mid * 2) * 2.0 * frame.steps
+        bass = snapshot.bass
+
+        rc['size'] = (width, height)
+        rc['center'] = (width / 2, height / 2)
+        rc['time'] = float(self.time)
+        rc['radius'] = float(frame.radius)
+        rc['levels'] = (float(bass), float(snapshot.mid), float(snapshot.treble), float(snapshot.overall))
+        rc['circle_color'] = tuple(float(c) for c in self.colors[int(bass * (len(self.colors) - 1))])
+        rc['circle_alpha'] = 0.6 + bass * 0.4
+        rc['ring_radius'] = tuple(float(r) for r in rings)
+        rc['ring_color'] = (1.0, 0.0, 0.0)
+        rc['glow'] = float(self.glow)
+        rc['snow_layers'] = float(self.level + 1)
+        rc['snow_cell'] = float(self.snow_cell(width, height))
+        rc['snow_fall'] = float(self.fall)
+        rc['snow_pulse'] = 1.0 + snapshot.overall * 0.5
+
+    def hide(self):
+        self.rect.size = (0, 0)
+
+
+def main(argv=None):
+    """
+    Kompiliert den Shader in einem (versteckten) Fenster; 0 = ok oder kein GL,
+    1 = Fehler (oder kein GL mit --require-gl).
+    """
+    argv = sys.argv[1:] if argv is None else argv
+    skipped = 1 if '--require-gl' in argv else 0
+    try:
+        from kivy.core.window import Window
+    except Exception as e:
+        print(f"Shader-Check übersprungen: {e}")
+        return skipped
+    if Window is None:
+        print("Shader-Check übersprungen: kein GL-Kontext")
+        return skipped
+    from kivy.graphics.opengl import glGetString, GL_RENDERER, GL_VERSION
+    print(f"GL: {glGetString(GL_RENDERER)} / {glGetString(GL_VERSION)}")
+    if not compile_shader().shader.success:
+        print("❌ Fragment-Shader kompiliert nicht (Details im Kivy-Log)")
+        return 1
+    print("✅ Fragment-Shader kompiliert")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,93 @@
+"""
+GLSL-Quelltext des GPU-Renderpfads (siehe shader_effects), ohne Kivy-Import:
+die Konstanten und der fertige FRAGMENT_SHADER lassen sich so auch ohne
+GL-Kontext prüfen.
+"""
+
+RING_SLOTS = 4          # vec4 ring_radius
+RING_FADE = 600.0       # Radius, bei dem ein Ring verschwunden ist (wie BeatWavesEffect)
+SNOW_FILL = 0.45        # Anteil der Raster-Zellen mit Flocke (siehe snow_layer)
+
+# $RING_FADE$ / $SNOW_FILL$ werden wie Kivys $HEADER$ ersetzt: CPU- und GPU-Pfad
+# nutzen dieselben Konstanten
+FRAGMENT_TEMPLATE = '''
+$HEADER$
+
+uniform vec2 size;
+uniform vec2 center;
+uniform float time;
+uniform float radius;
+uniform vec4 levels;          // bass, mid, treble, overall
+uniform vec3 circle_color;
+uniform float circle_alpha;
+uniform vec4 ring_radius;     // 0 = Ring aus
+uniform vec3 ring_color;
+uniform float glow;
+uniform float snow_layers;    // 0..3
+uniform float snow_cell;      // Rastergröße in Pixeln
+uniform float snow_fall;      // aufsummierter Fallweg in Pixeln
+uniform float snow_pulse;
+
+float hash(vec2 p) {
+    return fract(sin(dot(p, vec2(127.1, 311.7))) * 43758.5453);
+}
+
+void over(inout vec4 dst, vec3 rgb, float a) {
+    // dst ist vormultipliziert
+    dst.rgb = rgb * a + dst.rgb * (1.0 - a);
+    dst.a = a + dst.a * (1.0 - a);
+}
+
+float ring(float dist, float r) {
+    float fade = 1.0 - r / $RING_FADE$;
+    return step(0.5, r) * max(fade, 0.0) * (1.0 - smoothstep(1.0, 2.5, abs(dist - r)));
+}
+
+float snow_layer(vec2 p, float cell, float speed, float seed) {
+    // Höchstens eine Flocke pro Raster-Zelle, Raster fällt mit snow_fall
+    vec2 q = vec2(p.x, p.y + snow_fall * speed) / cell;
+    vec2 id = floor(q);
+    float h = hash(id + seed);
+    vec2 jitter = vec2(hash(id + seed + 1.7), hash(id + seed + 4.3)) - 0.5;
+    float sway = sin(time * (0.8 + h) + h * 6.2831) * 0.15 * (0.5 + levels.y);
+    vec2 d = (fract(q) - 0.5 - jitter * 0.6 - vec2(sway, 0.0)) * cell;
+    float r = (1.5 + 2.5 * h) * snow_pulse;
+    return step(1.0 - $SNOW_FILL$, h) * (1.0 - smoothstep(r * 0.4, r, length(d))) * (0.6 + 0.3 * h);
+}
+
+void main(void) {
+    vec2 p = tex_coord0 * size;
+    float dist = length(p - center);
+    vec4 dst = vec4(0.0);
+
+    // Glühen um den Kreis, Reichweite wächst mit dem Bass
+    float reach = 30.0 + levels.x * 90.0;
+    float halo = exp(-max(dist - radius, 0.0) / reach) * step(radius, dist);
+    over(dst, circle_color, glow * halo * (0.25 + levels.w * 0.35));
+
+    // Bass-Kreis mit weicher Kante
+    over(dst, circle_color, circle_alpha * (1.0 - smoothstep(radius - 1.5, radius + 1.5, dist)));
+
+    // Beat-Ringe
+    float rings = ring(dist, ring_radius.x) + ring(dist, ring_radius.y)
+                + ring(dist, ring_radius.z) + ring(dist, ring_radius.w);
+    over(dst, ring_color, min(rings, 1.0));
+
+    // Schnee: bis zu drei Ebenen mit eigener Rastergröße und Geschwindigkeit
+    float snow = snow_layer(p, snow_cell, 1.0, 0.0) * step(0.5, snow_layers)
+               + snow_layer(p, snow_cell * 1.35, 0.7, 17.0) * step(1.5, snow_layers)
+               + snow_layer(p, snow_cell * 0.75, 1.4, 41.0) * step(2.5, snow_layers);
+    over(dst, vec3(1.0), min(snow, 1.0));
+
+    gl_FragColor = vec4(dst.rgb / max(dst.a, 0.0001), dst.a);
+}
+'''
+
+
+def glsl_float(value):
+    return repr(float(value))
+
+
+FRAGMENT_SHADER = (FRAGMENT_TEMPLATE
+                   .replace('$RING_FADE$', glsl_float(RING_FADE))
+                   .replace('$SNOW_FILL$', glsl_float(SNOW_FILL)))
@@ -0,0 +1,55 @@
+"""
+Spektrum-Ring: ein Balken pro Band rund um den Bass-Kreis.
+Alle Balken liegen in einem Vertex-Array und werden als ein einziges Mesh
+gezeichnet (links/rechts gespiegelt, tiefe Bänder oben).
+"""
+import math
+
+import numpy as np
+
+QUAD_INDICES = (0, 1, 2, 2, 3, 0)
+
+
+class SpectrumRing:
+    def __init__(self, bands, gap=0.3, mirror=True):
+        self.gap = gap
+        self.mirror = mirror
+        self.configure(bands)
+
+    def configure(self, bands):
+        """Winkel und Indizes für `bands` Bänder vorberechnen."""
+        self.bands = bands
+        bars = bands * 2 if self.mirror else bands
+        self.bars = bars
+
+        # Balken i zentriert bei Winkel i, von oben (90°) aus im Uhrzeigersinn
+        step = 2 * math.pi / bars
+        centers = math.pi / 2 - (np.arange(bars) + 0.5) * step
+        half = step * (1 - self.gap) / 2
+        self.cos0, self.sin0 = np.cos(centers - half), np.sin(centers - half)
+        self.cos1, self.sin1 = np.cos(centers + half), np.sin(centers + half)
+
+        self.vertices = np.zeros((bars, 4, 4), dtype=np.float32)   # x, y, u, v
+        self.levels = np.zeros(bars, dtype=np.float32)
+        self.indices = (np.arange(bars)[:, np.newaxis] * 4 + np.array(QUAD_INDICES)).ravel().tolist()
+
+    def update(self, levels, cx, cy, inner, length):
+        """Setzt die Balkenlängen und gibt die Vertex-Liste für Mesh.vertices zurück."""
+        if len(levels) != self.bands:
+            self.configure(len(levels))
+        bars = self.levels
+        bars[:self.bands] = levels
+        if self.mirror:
+            bars[self.bands:] = levels[::-1]
+        outer = inner + 2 + bars * length
+
+        v = self.vertices
+        v[:, 0, 0] = cx + self.cos0 * inner
+        v[:, 0, 1] = cy + self.sin0 * inner
+        v[:, 1, 0] = cx + self.cos0 * outer
+        v[:, 1, 1] = cy + self.sin0 * outer
+        v[:, 2, 0] = cx + self.cos1 * outer
+        v[:, 2, 1] = cy + self.sin1 * outer
+        v[:, 3, 0] = cx + self.cos1 * inner
+        v[:, 3, 1] = cy + self.sin1 * inner
+        return v.ravel().tolist()
@@ -0,0 +1,62 @@
+"""
+Startzeit-Messung für den Kaltstart.
+Sammelt Import-Zeiten und Meilensteine ab dem ersten Import dieses Moduls
+und gibt beim ersten Frame einen Bericht aus (optional als JSON-Datei).
+"""
+import json
+import time
+from contextlib import contextmanager
+
+T0 = time.perf_counter()
+
+# Ziel für "UI sichtbar" auf dem Handy (Sekunden ab Prozessstart)
+STARTUP_BUDGET = 2.0
+
+
+class StartupTimer:
+    def __init__(self):
+        self.sections = []   # (Name, Dauer) - Import-Zeiten und verzögerte Initialisierung
+        self.marks = []      # (Name, Zeitpunkt seit T0)
+        self.reported = False
+
+    def mark(self, name):
+        self.marks.append((name, time.perf_counter() - T0))
+
+    @contextmanager
+    def section(self, name):
+        """Misst einen Block, z.B. `with TIMER.section('import yt_dlp'): import yt_dlp`."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.sections.append((name, time.perf_counter() - start))
+
+    def report(self, path=None, budget=STARTUP_BUDGET):
+        """Gibt die Aufschlüsselung aus und schreibt sie optional nach `path`."""
+        total = time.perf_counter() - T0
+        self.reported = True
+
+        print(f"=== Startzeit: {total * 1000:.0f} ms (Budget {budget * 1000:.0f} ms) ===")
+        for name, duration in sorted(self.sections, key=lambda item: -item[1]):
+            print(f"  {duration * 1000:8.1f} ms  {name}")
+        for name, at in self.marks:
+            print(f"  @{at * 1000:7.0f} ms  {name}")
+        if total > budget:
+            print("⚠️ Startzeit über Budget!")
+
+        data = {
+            'total': total,
+            'budget': budget,
+            'sections': [{'name': n, 'seconds': d} for n, d in self.sections],
+            'marks': [{'name': n, 'at': t} for n, t in self.marks],
+        }
+        if path:
+            try:
+                with open(path, 'w', encoding='utf-8') as f:
+                    json.dump(data, f, indent=1)
+            except OSError as e:
+                print(f"Startup report error: {e}")
+        return data
+
+
+TIMER = StartupTimer()
@@ -0,0 +1,179 @@
+"""
+Abbrechbare Hintergrund-Aufgaben auf einem gemeinsamen Thread-Pool.
+Jede Aufgabe gehört zu einer Gruppe ('playback', 'preload', 'analysis', ...).
+Ein neuer Start in einer Gruppe erhöht deren Generation und bricht die
+vorherige Aufgabe ab: ihr CancelToken wird gesetzt, registrierte Abbruch-
+Aktionen (Download stoppen, Sound entladen) laufen sofort, und Ergebnisse
+veralteter Generationen werden verworfen statt angewendet.
+"""
+import itertools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_WORKERS = 8
+
+
+class TaskCancelled(Exception):
+    """Wird von `CancelToken.check()` in abgebrochenen Aufgaben ausgelöst."""
+
+
+class CancelToken:
+    """
+    Abbruch-Signal einer Aufgabe. `event` ist ein threading.Event und kann
+    überall dort übergeben werden, wo bisher ein cancel_event erwartet wurde.
+    """
+    def __init__(self, group=None, generation=0):
+        self.group = group
+        self.generation = generation
+        self.event = threading.Event()
+        self.lock = threading.Lock()
+        self.callbacks = []
+
+    @property
+    def cancelled(self):
+        return self.event.is_set()
+
+    def cancel(self):
+        """Setzt das Signal und führt alle Abbruch-Aktionen (einmalig) aus."""
+        with self.lock:
+            if self.event.is_set():
+                return
+            self.event.set()
+            callbacks, self.callbacks = self.callbacks, []
+        for callback in reversed(callbacks):
+            try:
+                callback()
+            except Exception as e:
+                print(f"Cancel callback error: {e}")
+
+    def on_cancel(self, callback):
+        """Registriert eine Abbruch-Aktion; ist schon abgebrochen, läuft sie sofort."""
+        with self.lock:
+            if not self.event.is_set():
+                self.callbacks.append(callback)
+                return callback
+        callback()
+        return callback
+
+    def discard(self, callback):
+        """Entfernt eine Abbruch-Aktion wieder (z.B. weil die Ressource übergeben wurde)."""
+        with self.lock:
+            if callback in self.callbacks:
+                self.callbacks.remove(callback)
+
+    def check(self):
+        if self.event.is_set():
+            raise TaskCancelled(f'{self.group} #{self.generation}')
+
+    def wait_for(self, event, poll=0.2):
+        """Wartet auf `event`; False wenn die Aufgabe vorher abgebrochen wird."""
+        while not event.wait(poll):
+            if self.event.is_set():
+                return False
+        return not self.event.is_set()
+
+    def sleep(self, seconds):
+        """Schläft `seconds`; True wenn währenddessen abgebrochen wurde."""
+        return self.event.wait(seconds)
+
+
+class Task:
+    def __init__(self, token, future):
+        self.token = token
+        self.future = future
+        self.thread = None
+
+    def cancel(self):
+        self.token.cancel()
+        self.future.cancel()     # noch nicht gestartet: gar nicht erst ausführen
+
+    def wait(self, timeout=None):
+        """Wartet auf das Ende (nicht aus dem eigenen Thread heraus)."""
+        if self.thread is threading.current_thread():
+            return False
+        try:
+            self.future.exception(timeout=timeout)
+            return True
+        except Exception:
+            return self.future.cancelled()
+
+    @property
+    def done(self):
+        return self.future.done()
+
+
+class TaskManager:
+    """Ein Executor für alle Hintergrund-Aufgaben, eine laufende Generation pro Gruppe."""
+    def __init__(self, max_workers=DEFAULT_WORKERS):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='xmas-task')
+        self.lock = threading.Lock()
+        self.generations = itertools.count(1)
+        self.anonymous = itertools.count(1)
+        self.current = {}     # Gruppe -> Task
+        self.closed = False
+
+    def start(self, group, func, *args, **kwargs):
+        """
+        Bricht die laufende Aufgabe der Gruppe ab und startet `func(token, ...)`.
+        Ausnahmen außer TaskCancelled werden ausgegeben, nicht weitergereicht.
+        """
+        with self.lock:
+            previous = self.current.get(group)
+            token = CancelToken(group, next(self.generations))
+            if self.closed:
+                token.cancel()
+                return None
+            task = Task(token, None)
+            task.future = self.executor.submit(self._run, task, func, args, kwargs)
+            self.current[group] = task
+        if previous is not None:
+            previous.cancel()
+        return task
+
+    def submit(self, func, *args, **kwargs):
+        """Aufgabe ohne Gruppe: läuft neben allen anderen, abgebrochen nur beim Beenden."""
+        return self.start(('task', next(self.anonymous)), func, *args, **kwargs)
+
+    def _run(self, task, func, args, kwargs):
+        task.thread = threading.current_thread()
+        try:
+            if not task.token.cancelled:
+                func(task.token, *args, **kwargs)
+        except TaskCancelled:
+            pass
+        except Exception as e:
+            print(f"Task error ({task.token.group}): {e}")
+            import traceback
+            traceback.print_exc()
+        finally:
+            task.thread = None
+            # Gruppen behalten ihre letzte Aufgabe (für is_current), Einzelaufgaben nicht
+            if isinstance(task.token.group, tuple):
+                with self.lock:
+                    if self.current.get(task.token.group) is task:
+                        del self.current[task.token.group]
+
+    def get(self, group):
+        return self.current.get(group)
+
+    def is_current(self, token):
+        """True solange `token` die neueste, nicht abgebrochene Generation seiner Gruppe ist."""
+        task = self.current.get(token.group)
+        return not token.cancelled and task is not None and task.token is token
+
+    def cancel(self, group):
+        """Bricht die Aufgabe der Gruppe ab (Ergebnis wird verworfen)."""
+        with self.lock:
+            task = self.current.pop(group, None)
+        if task is not None:
+            task.cancel()
+        return task
+
+    def shutdown(self):
+        with self.lock:
+            self.closed = True
+            tasks = list(self.current.values())
+            self.current.clear()
+        for task in tasks:
+            task.cancel()
+        self.executor.shutdown(wait=False)
@@ -0,0 +1,5 @@
+"""Tests laufen gegen die flachen Module im Repo-Wurzelverzeichnis."""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
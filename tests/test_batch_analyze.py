@@ -0,0 +1,28 @@
+"""Batch-Analyse: welche Dateien im Cache-Ordner analysiert werden."""
+import os
+
+from audio_cache import MANIFEST_NAME, STAGING_DIR
+from batch_analyze import find_tracks
+
+
+def touch(path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(b'\0')
+
+
+def test_find_tracks_skips_cache_staging(tmp_path):
+    folder = str(tmp_path)
+    touch(os.path.join(folder, MANIFEST_NAME))
+    touch(os.path.join(folder, 'abc.m4a'))
+    touch(os.path.join(folder, 'abc.m4a.play.wav'))
+    touch(os.path.join(folder, STAGING_DIR, 'partial.m4a'))
+
+    assert [rel for rel, _ in find_tracks(folder)] == ['abc.m4a']
+
+
+def test_find_tracks_keeps_subfolders_outside_cache(tmp_path):
+    folder = str(tmp_path)
+    touch(os.path.join(folder, STAGING_DIR, 'song.mp3'))
+
+    assert [rel for rel, _ in find_tracks(folder)] == [os.path.join(STAGING_DIR, 'song.mp3')]
@@ -0,0 +1,58 @@
+"""Feature-Index: Wiedergabe aus dem Index speist den BeatTracker."""
+import numpy as np
+
+from audio_analysis import StreamingAnalyzer
+from beat_tracking import BeatTracker
+from feature_index import FeatureIndex, build_feature_index
+from transcode import PCM_HEADER, PCM_MAGIC, pcm_path_for
+
+SR = 22050
+HOP = 512
+WINDOW = 1024
+
+
+def click_track(bpm, seconds):
+    """Kick-Drum-artige Impulse im Abstand eines Beats."""
+    samples = np.zeros(int(seconds * SR), dtype=np.float64)
+    t = np.arange(int(0.15 * SR)) / SR
+    kick = np.sin(2 * np.pi * (50 + 100 * np.exp(-t * 30)) * t) * np.exp(-t * 18)
+    period = 60.0 / bpm
+    for k in range(int(seconds / period)):
+        start = int(k * period * SR)
+        end = min(len(samples), start + len(kick))
+        samples[start:end] += kick[:end - start]
+    samples += np.random.default_rng(0).standard_normal(len(samples)) * 0.01
+    return (samples / np.abs(samples).max() * 20000).astype(np.int16)
+
+
+def write_track(tmp_path, samples):
+    """Platzhalter-Audio-Datei plus transkodiertes .pcm daneben (kein ffmpeg nötig)."""
+    audio_path = str(tmp_path / 'song.m4a')
+    with open(audio_path, 'wb') as f:
+        f.write(b'\0')
+    with open(pcm_path_for(audio_path), 'wb') as f:
+        f.write(PCM_HEADER.pack(PCM_MAGIC, SR, 1, len(samples)))
+        f.write(samples.tobytes())
+    return audio_path
+
+
+def test_playing_from_index_locks_tracker(tmp_path):
+    audio_path = write_track(tmp_path, click_track(120, 20))
+    info = {}
+    assert build_feature_index(audio_path, SR, WINDOW, HOP, info=info)
+    assert FeatureIndex.is_fresh(audio_path)
+
+    index = FeatureIndex.open_for(audio_path)
+    assert index.tempo is not None and len(index.tempo)
+
+    analyzer = StreamingAnalyzer(WINDOW, SR)
+    tracker = BeatTracker(SR / HOP)
+    analyzer.attach_beat_tracker(tracker)
+    for step in range(int(10 * index.frame_rate)):
+        index.apply(analyzer, step / index.frame_rate)
+
+    assert tracker.locked
+    assert abs(tracker.bpm - 120) < 2.5
+    assert tracker.confidence >= 0.3   # BEAT_LOCK_CONFIDENCE in Merry_Xmas
+    assert tracker.next_beat_clock() is not None
+    assert analyzer.state.latest().bpm == tracker.bpm > 0
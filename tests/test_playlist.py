@@ -0,0 +1,52 @@
+"""PlayQueue: Katalog-Änderungen während einer gemischten Runde."""
+from playlist import PlayQueue
+
+
+def names(count, start=0):
+    return [f'song {i}' for i in range(start, start + count)]
+
+
+def queue_order(queue):
+    return [queue.names[i] for i in queue.order]
+
+
+def test_set_names_append_keeps_shuffled_order():
+    queue = PlayQueue(names(50), shuffle=True, seed=1)
+    queue.advance()
+    queue.advance()
+    before = queue_order(queue)
+    current = queue.current
+    upcoming = queue.peek_next()
+
+    queue.set_names(names(100))
+
+    after = queue_order(queue)
+    assert queue.current == current
+    assert after[:queue.pos + 1] == before[:queue.pos + 1]
+    assert [name for name in after if name in before] == before
+    assert sorted(after) == sorted(names(100))
+    # Der (vorgeladene) nächste Titel bleibt der nächste
+    assert queue.peek_next() == upcoming
+
+
+def test_set_names_removal_keeps_order_and_current():
+    queue = PlayQueue(names(20), shuffle=True, seed=2)
+    queue.advance()
+    before = queue_order(queue)
+    removed = before[-1]
+
+    queue.set_names([name for name in names(20) if name != removed])
+
+    assert queue.current == before[1]
+    assert queue_order(queue) == before[:-1]
+
+
+def test_set_names_removes_current():
+    queue = PlayQueue(names(10), shuffle=True, seed=3)
+    queue.advance()
+    before = queue_order(queue)
+
+    queue.set_names([name for name in names(10) if name != before[1]])
+
+    assert queue.current == before[2]
+    assert queue_order(queue) == before[:1] + before[2:]
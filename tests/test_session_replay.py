@@ -0,0 +1,39 @@
+"""Sitzungs-Aufnahme: Beat-Felder überstehen Aufnahme und Wiedergabe."""
+import pytest
+
+from analysis_state import SharedAnalysisState
+from beat_tracking import BeatTracker
+from party import RemoteBeatClock
+from session_replay import Session, SessionFeed, SessionRecorder
+
+
+def test_replay_serves_recorded_beats(tmp_path):
+    path = str(tmp_path / 'sitzung.xrec')
+    tracker = BeatTracker(22050 / 512)
+    recorder = SessionRecorder(path, seed=7, size=(360, 640), get_tracker=lambda: tracker)
+    # Stream-Zeit = Sitzungszeit, Beats bei 0.0, 0.5, 1.0, ...
+    tracker.clock_offset = recorder.started
+    tracker.period, tracker.bpm, tracker.confidence, tracker.last_beat_time = 0.5, 120.0, 0.8, 0.0
+
+    state = SharedAnalysisState()
+    recorder.attach(state)
+    for step in range(1, 5):
+        state.publish(0.5, 0.2, 0.1, 0.3, False, 120.0, stream_time=step * 0.1)
+    recorder.close()
+
+    session = Session.load(path)
+    assert len(session) == 4
+    assert session.seed == 7
+    for snapshot, (next_beat, period, confidence) in zip(session.snapshots, session.beats):
+        assert period == 0.5
+        assert confidence == pytest.approx(0.8)
+        assert snapshot.timestamp < next_beat <= snapshot.timestamp + 0.5
+        assert next_beat / 0.5 == pytest.approx(round(next_beat / 0.5), abs=1e-6)
+
+    replay_state = SharedAnalysisState()
+    clock = RemoteBeatClock()
+    feed = SessionFeed(session)
+    feed.feed(replay_state, session.duration, base=100.0, tracker=clock)
+    assert clock.locked
+    assert clock.bpm == pytest.approx(120.0)
+    assert clock.next_beat == pytest.approx(100.0 + session.beats[-1][0])
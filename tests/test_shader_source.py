@@ -0,0 +1,15 @@
+"""Shader-Quelltext: Platzhalter ersetzt, Konstanten aus Python (ohne GL)."""
+import re
+
+from shader_source import FRAGMENT_SHADER, FRAGMENT_TEMPLATE, RING_FADE, SNOW_FILL, glsl_float
+
+
+def test_only_header_placeholder_left():
+    assert re.findall(r'\$[A-Z_]+\$', FRAGMENT_SHADER) == ['$HEADER$']
+    assert '$RING_FADE$' in FRAGMENT_TEMPLATE and '$SNOW_FILL$' in FRAGMENT_TEMPLATE
+
+
+def test_constants_substituted_as_glsl_floats():
+    assert f'1.0 - r / {glsl_float(RING_FADE)};' in FRAGMENT_SHADER
+    assert f'step(1.0 - {glsl_float(SNOW_FILL)}, h)' in FRAGMENT_SHADER
+    assert glsl_float(600) == '600.0'
@@ -0,0 +1,183 @@
+"""
+Transkodier-Stufe für den Audio-Cache (optional, braucht ffmpeg).
+Ein einziger ffmpeg-Lauf pro Song erzeugt zwei Nebendateien:
+
+    <datei>.pcm        Mono-int16 in Analyse-Abtastrate, 16 Byte Header
+                       (b'XPCM', sample_rate, channels, frame_count je uint32 LE),
+                       danach die Samples. Wird per np.memmap gelesen: Analyse-
+                       Fenster sind Slices ohne Kopie, keine zweite Dekodierung.
+    <datei>.play.<ext> Wiedergabe-Datei in einem schnell ladbaren Format
+                       (WAV auf dem Desktop: SDL2 muss nicht dekodieren;
+                       Ogg Vorbis auf Android: kleiner, MediaPlayer streamt).
+
+Die Nebendateien heißen wie die Cache-Datei plus Endung und werden deshalb
+zusammen mit dem Cache-Eintrag verdrängt.
+"""
+import os
+import shutil
+import struct
+import subprocess
+
+import numpy as np
+
+PCM_SUFFIX = '.pcm'
+PCM_MAGIC = b'XPCM'
+PCM_HEADER = struct.Struct('<4sIII')
+
+PLAYBACK_FORMATS = {
+    'wav': ('.play.wav', ['-c:a', 'pcm_s16le', '-f', 'wav']),
+    'ogg': ('.play.ogg', ['-c:a', 'libvorbis', '-q:a', '4', '-f', 'ogg']),
+}
+DEFAULT_PLAYBACK_FORMAT = 'wav'
+
+COPY_CHUNK = 1 << 16
+
+
+def available():
+    return shutil.which('ffmpeg') is not None
+
+
+def pcm_path_for(audio_path):
+    return audio_path + PCM_SUFFIX
+
+
+def playback_path_for(audio_path, fmt=DEFAULT_PLAYBACK_FORMAT):
+    return audio_path + PLAYBACK_FORMATS[fmt][0]
+
+
+def is_fresh(path, audio_path):
+    return os.path.exists(path) and os.path.getmtime(path) >= os.path.getmtime(audio_path)
+
+
+def is_sidecar(path):
+    """True für erzeugte Wiedergabe-Dateien (nicht erneut indexieren/transkodieren)."""
+    return path.lower().endswith(tuple(suffix for suffix, _ in PLAYBACK_FORMATS.values()))
+
+
+def playable_path(audio_path):
+    """Schnell ladbare Wiedergabe-Datei zu `audio_path`, sonst `audio_path` selbst."""
+    if not audio_path or audio_path.startswith('http'):
+        return audio_path
+    for suffix, _ in PLAYBACK_FORMATS.values():
+        if is_fresh(audio_path + suffix, audio_path):
+            return audio_path + suffix
+    return audio_path
+
+
+def transcode_command(source, sample_rate, playback_path=None, fmt=DEFAULT_PLAYBACK_FORMAT):
+    """ffmpeg-Aufruf: Mono-s16le nach stdout und optional die Wiedergabe-Datei, in einem Durchgang."""
+    cmd = [
+        'ffmpeg', '-nostdin', '-loglevel', 'error', '-y',
+        '-i', source,
+        '-map', '0:a:0', '-f', 's16le', '-acodec', 'pcm_s16le',
+        '-ac', '1', '-ar', str(sample_rate), 'pipe:1',
+    ]
+    if playback_path:
+        cmd += ['-map', '0:a:0', '-vn'] + PLAYBACK_FORMATS[fmt][1] + [playback_path]
+    return cmd
+
+
+def transcode(audio_path, sample_rate=22050, playback_format=DEFAULT_PLAYBACK_FORMAT, cancel_event=None):
+    """
+    Erzeugt .pcm (und mit `playback_format` die Wiedergabe-Datei) zu `audio_path`.
+    Gibt (pcm_path, playback_path) zurück; None bei Abbruch oder Fehler.
+    """
+    pcm_path = pcm_path_for(audio_path)
+    playback_path = playback_path_for(audio_path, playback_format) if playback_format else None
+    pcm_tmp = pcm_path + '.tmp'
+    # ffmpeg erkennt das Ausgabeformat über -f, die Endung darf also .tmp sein
+    playback_tmp = playback_path + '.tmp' if playback_path else None
+
+    process = subprocess.Popen(
+        transcode_command(audio_path, sample_rate, playback_tmp, playback_format),
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE
+    )
+    frames = 0
+    try:
+        with open(pcm_tmp, 'wb') as f:
+            f.write(PCM_HEADER.pack(PCM_MAGIC, sample_rate, 1, 0))
+            while True:
+                if cancel_event is not None and cancel_event.is_set():
+                    raise InterruptedError(audio_path)
+                block = process.stdout.read(COPY_CHUNK)
+                if not block:
+                    break
+                f.write(block)
+                frames += len(block) // 2
+            process.wait()
+            if process.returncode != 0:
+                raise RuntimeError(process.stderr.read().decode('utf-8', 'replace').strip()[-300:])
+            # Header mit der tatsächlichen Länge überschreiben
+            f.seek(0)
+            f.write(PCM_HEADER.pack(PCM_MAGIC, sample_rate, 1, frames))
+        os.replace(pcm_tmp, pcm_path)
+        if playback_tmp:
+            os.replace(playback_tmp, playback_path)
+    except (InterruptedError, RuntimeError, OSError) as e:
+        if not isinstance(e, InterruptedError):
+            print(f"Transcode error ({os.path.basename(audio_path)}): {e}")
+        for path in (pcm_tmp, playback_tmp):
+            if path and os.path.exists(path):
+                os.remove(path)
+        return None
+    finally:
+        if process.poll() is None:
+            process.kill()
+            process.wait()
+        process.stdout.close()
+        process.stderr.close()
+
+    print(f"Transkodiert: {os.path.basename(audio_path)} ({frames / sample_rate:.1f}s)")
+    return pcm_path, playback_path
+
+
+class PCMFile:
+    """Memory-mapped Zugriff auf eine .pcm-Datei."""
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            head = f.read(PCM_HEADER.size)
+        if len(head) < PCM_HEADER.size or head[:4] != PCM_MAGIC:
+            raise ValueError(f"Keine PCM-Datei: {path}")
+        _, sample_rate, channels, frames = PCM_HEADER.unpack(head)
+        if channels != 1:
+            raise ValueError(f"Nur Mono wird unterstützt: {path}")
+        self.path = path
+        self.sample_rate = sample_rate
+        self.samples = np.memmap(path, dtype=np.int16, mode='r',
+                                 offset=PCM_HEADER.size, shape=(frames,)) if frames else np.zeros(0, np.int16)
+
+    @classmethod
+    def open_for(cls, audio_path, sample_rate=None):
+        """Öffnet die .pcm-Datei zu `audio_path` (passende Abtastrate) oder gibt None zurück."""
+        if not audio_path or audio_path.startswith('http'):
+            return None
+        path = pcm_path_for(audio_path)
+        if not is_fresh(path, audio_path):
+            return None
+        try:
+            pcm = cls(path)
+        except (OSError, ValueError) as e:
+            print(f"PCM error: {e}")
+            return None
+        if sample_rate is not None and pcm.sample_rate != sample_rate:
+            return None
+        return pcm
+
+    def __len__(self):
+        return len(self.samples)
+
+    @property
+    def duration(self):
+        return len(self.samples) / float(self.sample_rate)
+
+    def window(self, end, size):
+        """Die `size` Samples vor `end` als Slice (keine Kopie); None außerhalb der Datei."""
+        if end < size or end > len(self.samples):
+            return None
+        return self.samples[end - size:end]
+
+    def frames(self, window, hop):
+        """Alle Analyse-Fenster als 2-D-Ansicht (Zeile k endet bei k * hop + window), ohne Kopie."""
+        if len(self.samples) < window:
+            return np.zeros((0, window), dtype=np.int16)
+        return np.lib.stride_tricks.sliding_window_view(self.samples, window)[::hop]